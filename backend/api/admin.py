@@ -1,7 +1,12 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
-from .models import Evento, Recordatorio
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from . import busqueda
+from .models import Evento, Recordatorio, Notificacion, Eliminacion, Perfil, AvisoProximo
+from .sync import registrar_eventos_eliminados
 
 # Des-registrar el modelo de usuario base si ya está registrado
 if admin.site.is_registered(User):
@@ -28,6 +33,20 @@ class EventoAdmin(admin.ModelAdmin):
     date_hierarchy = 'FechaInicio'
     ordering = ('-FechaInicio',)
 
+    def get_search_results(self, request, queryset, search_term):
+        # El texto se busca en el índice de texto completo en vez de con LIKE '%...%'
+        if not busqueda.terminos(search_term) or not busqueda.disponible():
+            return super().get_search_results(request, queryset, search_term)
+        # Sin límite: el admin pagina el resultado completo
+        coincidencias = Q(id__in=RawSQL(*busqueda.subconsulta_ids(search_term)))
+        return queryset.filter(coincidencias | Q(Usuario__username__icontains=search_term.strip())), False
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        # La acción "eliminar seleccionados" borra un queryset: las lápidas van aparte
+        registrar_eventos_eliminados(queryset.values_list('id', 'Usuario_id'))
+        super().delete_queryset(request, queryset)
+
 @admin.register(Recordatorio)
 class RecordatorioAdmin(admin.ModelAdmin):
     """
@@ -42,3 +61,47 @@ class RecordatorioAdmin(admin.ModelAdmin):
         return obj.Evento.Titulo
     get_evento_titulo.short_description = 'Evento'
     get_evento_titulo.admin_order_field = 'Evento__Titulo'
+
+@admin.register(Notificacion)
+class NotificacionAdmin(admin.ModelAdmin):
+    """
+    Administración para el modelo Notificacion.
+    """
+    list_display = ('Usuario', 'Mensaje', 'Leida', 'CreadaEn')
+    list_filter = ('Leida', 'CreadaEn')
+    search_fields = ('Mensaje', 'Usuario__username')
+    ordering = ('-CreadaEn',)
+
+@admin.register(Eliminacion)
+class EliminacionAdmin(admin.ModelAdmin):
+    """
+    Administración para el modelo Eliminacion (lápidas de sincronización).
+    """
+    list_display = ('Modelo', 'ObjetoId', 'Usuario', 'EliminadoEn')
+    list_filter = ('Modelo', 'EliminadoEn')
+    search_fields = ('Usuario__username',)
+    ordering = ('-EliminadoEn',)
+
+@admin.register(Perfil)
+class PerfilAdmin(admin.ModelAdmin):
+    """
+    Administración para el modelo Perfil.
+    """
+    list_display = ('Usuario', 'ZonaHoraria')
+    search_fields = ('Usuario__username', 'Usuario__email')
+
+@admin.register(AvisoProximo)
+class AvisoProximoAdmin(admin.ModelAdmin):
+    """
+    Administración para el modelo AvisoProximo (solo lectura: se mantiene solo).
+    """
+    list_display = ('Titulo', 'Usuario', 'TipoAviso', 'FechaEnviado')
+    list_filter = ('TipoAviso', 'FechaEnviado')
+    search_fields = ('Titulo', 'Usuario__username')
+    ordering = ('FechaEnviado',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        from . import signals  # noqa: F401 (registra los receptores)
+        from .busqueda import comprobar_triggers
+
+        checks.register(comprobar_triggers, checks.Tags.database)
@@ -1,23 +1,43 @@
 from django.contrib.auth.backends import BaseBackend
 from django.contrib.auth.models import User
+from django.db.models import Value
+from django.db.models.functions import Lower
+
+
+def buscar_por_email(email):
+    """
+    Busca un usuario por correo sin distinguir mayúsculas.
+    La consulta (WHERE LOWER(email) = LOWER(%s)) usa el índice auth_user_email_lower_idx.
+    """
+    return (
+        User.objects.annotate(email_normalizado=Lower('email'))
+        .filter(email_normalizado=Lower(Value(email)))
+    )
+
 
 class EmailBackend(BaseBackend):
     """
     Autentica a un usuario usando su dirección de correo electrónico.
     """
     def authenticate(self, request, username=None, password=None, **kwargs):
-        try:
-            # Busca al usuario por su email, que llega en el campo 'username'
-            user = User.objects.get(email=username)
-            # Comprueba la contraseña
-            if user.check_password(password):
-                return user
-        except User.DoesNotExist:
-            # Si el usuario no existe, no hace nada
+        if not username or password is None:
             return None
+        # Busca al usuario por su email, que llega en el campo 'username'.
+        # El índice único garantiza como mucho una fila; [:2] detecta datos antiguos duplicados.
+        usuarios = list(buscar_por_email(username)[:2])
+        if len(usuarios) != 1:
+            # Si el usuario no existe (o el correo es ambiguo), se calcula igualmente un hash
+            # para que la respuesta tarde lo mismo y no revele qué correos están registrados
+            User().set_password(password)
+            return None
+        user = usuarios[0]
+        # Comprueba la contraseña
+        if user.check_password(password) and user.is_active:
+            return user
+        return None
 
     def get_user(self, user_id):
         try:
             return User.objects.get(pk=user_id)
         except User.DoesNotExist:
-            return None
\ No newline at end of file
+            return None
@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTStatelessUserAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import Perfil
+from .zonas import CLAIM_ZONA
+
+
+class LRUConTTL:
+    """
+    Caché LRU en memoria del proceso cuyas entradas caducan a los `ttl` segundos.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            valor, expira = entrada
+            if expira < time.monotonic():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = (valor, time.monotonic() + self.ttl)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maxsize:
+                self._datos.popitem(last=False)
+
+    def discard(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+
+usuarios_cache = LRUConTTL(
+    maxsize=getattr(settings, 'JWT_USER_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'JWT_USER_CACHE_TTL', 60),
+)
+
+
+def token_para_usuario(user):
+    """
+    RefreshToken del usuario con los claims que necesitan las lecturas sin BD
+    (el token de acceso los hereda).
+    """
+    refresh = RefreshToken.for_user(user)
+    refresh['username'] = user.username
+    refresh['email'] = user.email
+    # Sin perfil el claim queda vacío y se usa la zona por defecto
+    refresh[CLAIM_ZONA] = (
+        Perfil.objects.filter(Usuario_id=user.pk).values_list('ZonaHoraria', flat=True).first() or ''
+    )
+    return refresh
+
+
+def autenticar_peticion(request, parametro=None):
+    """
+    Autenticación JWT para vistas de Django que no pasan por DRF (las vistas asíncronas).
+    Lee el token de la cabecera Authorization o, si se indica, del parámetro de consulta
+    `parametro` (EventSource no puede enviar cabeceras). Devuelve (usuario, token)
+    construidos a partir de los claims, sin consultar la base de datos, o None.
+    """
+    autenticador = JWTStatelessUserAuthentication()
+    try:
+        resultado = autenticador.authenticate(request)
+        if resultado is None and parametro and request.GET.get(parametro):
+            token = autenticador.get_validated_token(request.GET[parametro])
+            resultado = autenticador.get_user(token), token
+    except AuthenticationFailed:
+        return None
+    return resultado
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    Autenticación JWT que sí carga el User de la base de datos (para las escrituras),
+    pero lo reutiliza durante JWT_USER_CACHE_TTL segundos en una LRU del proceso.
+    Las lecturas usan JWTStatelessUserAuthentication (settings.REST_FRAMEWORK), que
+    construye el usuario a partir de los claims del token sin consultar la base de datos.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = usuarios_cache.get(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            usuarios_cache.set(user_id, user)
+        return user
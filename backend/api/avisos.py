@@ -0,0 +1,44 @@
+"""
+Mantenimiento de la tabla materializada de avisos próximos (api.models.AvisoProximo).
+
+Las escrituras mantienen al día las filas de los recordatorios que tocan; este módulo
+hace el trabajo que depende solo del paso del tiempo (comando materializar_avisos):
+- extender_horizonte(): copia los PENDIENTES que al correr el horizonte entraron en él.
+  También lo llama el worker (enviar_recordatorios) cada hora.
+- podar_avisos(): saca de la tabla los avisos vencidos hace más que la gracia del
+  despachador sin que nadie los reclamara (dispatch.caducar_vencidos, que lo registra).
+"""
+from django.utils import timezone
+
+from .dispatch import caducar_vencidos, gracia
+from .models import HORIZONTE_AVISOS, AvisoProximo, Recordatorio, materializar_avisos
+
+TAMANO_LOTE = 1000
+
+
+def extender_horizonte(ahora=None):
+    """
+    Materializa los recordatorios PENDIENTES dentro del horizonte que aún no tienen fila.
+    Los vencidos hace más que la gracia no se materializan: ya no se enviarían.
+    """
+    ahora = ahora or timezone.now()
+    faltantes = Recordatorio.objects.filter(
+        Estado='PENDIENTE', FechaEnviado__gte=ahora - gracia(), FechaEnviado__lte=ahora + HORIZONTE_AVISOS,
+        aviso_proximo__isnull=True,
+    ).values_list('id', flat=True)
+    ids = list(faltantes)
+    total = 0
+    for inicio in range(0, len(ids), TAMANO_LOTE):
+        total += materializar_avisos(ids[inicio:inicio + TAMANO_LOTE], ahora)
+    return total
+
+
+def podar_avisos(ahora=None):
+    """Caduca los avisos vencidos hace más que la gracia; sus recordatorios pasan a FALLIDO."""
+    return caducar_vencidos(ahora)
+
+
+def proximos(usuario_id, limite, ahora=None):
+    """Avisos del usuario que vencen desde `ahora`: un rango sobre (Usuario, FechaEnviado)."""
+    ahora = ahora or timezone.now()
+    return AvisoProximo.objects.filter(Usuario_id=usuario_id, FechaEnviado__gte=ahora).order_by('FechaEnviado')[:limite]
@@ -0,0 +1,137 @@
+from django.db import transaction
+from django.utils import timezone
+
+from . import cache
+from .models import (
+    Evento, Recordatorio, materializar_avisos, materializar_avisos_de_eventos, recalcular_fechas_envio,
+)
+from .serializers import EventoLoteSerializer
+from .sync import registrar_eventos_eliminados
+
+# Máximo de elementos por petición al endpoint masivo
+MAX_ELEMENTOS_LOTE = 1000
+
+
+def _validar(items, instancias=None):
+    """
+    Valida cada elemento con EventoLoteSerializer.
+    Devuelve (validos, errores): validos es una lista de (indice, validated_data, instancia).
+    """
+    validos, errores = [], []
+    for indice, item in enumerate(items):
+        instancia = None
+        if instancias is not None:
+            pk = item.get('id') if isinstance(item, dict) else None
+            instancia = instancias.get(pk) if isinstance(pk, int) else None
+            if instancia is None:
+                errores.append({'index': indice, 'status': 'error', 'errors': {'id': ['Evento no encontrado.']}})
+                continue
+            if 'recordatorios' in item:
+                errores.append({'index': indice, 'status': 'error', 'errors': {
+                    'recordatorios': ['Solo se admiten al crear el evento.'],
+                }})
+                continue
+        serializer = EventoLoteSerializer(instancia, data=item, partial=instancia is not None)
+        if serializer.is_valid():
+            validos.append((indice, serializer.validated_data, instancia))
+        else:
+            errores.append({'index': indice, 'status': 'error', 'errors': serializer.errors})
+    return validos, errores
+
+
+def crear_eventos(usuario, items):
+    """
+    Crea eventos (y sus recordatorios anidados) con un bulk_create por modelo.
+    Debe llamarse dentro de una transacción (ver procesar_lote).
+    """
+    validos, resultados = _validar(items)
+    eventos, anidados = [], []
+    for indice, datos, _ in validos:
+        recordatorios = datos.pop('recordatorios', [])
+        evento = Evento(Usuario=usuario, **datos)
+        evento.preparar_recurrencia()
+        eventos.append(evento)
+        anidados.append((indice, evento, recordatorios))
+
+    Evento.objects.bulk_create(eventos, batch_size=500)
+    nuevos_recordatorios = []
+    for _, evento, recordatorios in anidados:
+        for datos in recordatorios:
+            recordatorio = Recordatorio(Evento=evento, **datos)
+            recordatorio.FechaEnviado = recordatorio.calcular_fecha_envio(evento.FechaInicio)
+            nuevos_recordatorios.append(recordatorio)
+    Recordatorio.objects.bulk_create(nuevos_recordatorios, batch_size=500)
+    materializar_avisos([recordatorio.pk for recordatorio in nuevos_recordatorios])
+
+    resultados += [
+        {'index': indice, 'status': 'created', 'id': evento.pk}
+        for indice, evento, _ in anidados
+    ]
+    return sorted(resultados, key=lambda r: r['index'])
+
+
+def actualizar_eventos(usuario, items):
+    """
+    Actualiza eventos del usuario con un único bulk_update. Los recordatorios de los
+    eventos cuya FechaInicio cambia se recalculan en bloque.
+    """
+    ids = [item['id'] for item in items if isinstance(item, dict) and isinstance(item.get('id'), int)]
+    instancias = Evento.objects.filter(Usuario=usuario).in_bulk(ids)
+    validos, resultados = _validar(items, instancias)
+
+    ahora = timezone.now()
+    campos, modificados, reprogramados = {'ActualizadoEn', 'Extenso', 'FinSerie', 'Frecuencia'}, [], []
+    for indice, datos, evento in validos:
+        fecha_inicio_anterior = evento.FechaInicio
+        for campo, valor in datos.items():
+            setattr(evento, campo, valor)
+        campos.update(datos)
+        evento.preparar_recurrencia()
+        evento.ActualizadoEn = ahora
+        modificados.append((indice, evento))
+        if evento.FechaInicio != fecha_inicio_anterior:
+            reprogramados.append(evento)
+
+    Evento.objects.bulk_update([evento for _, evento in modificados], sorted(campos), batch_size=500)
+    recalcular_fechas_envio(reprogramados)
+    if 'Titulo' in campos:
+        # Los reprogramados ya se materializaron al recalcular sus recordatorios
+        materializar_avisos_de_eventos({evento.pk for _, evento in modificados} - {evento.pk for evento in reprogramados})
+
+    resultados += [
+        {'index': indice, 'status': 'updated', 'id': evento.pk}
+        for indice, evento in modificados
+    ]
+    return sorted(resultados, key=lambda r: r['index'])
+
+
+def eliminar_eventos(usuario, ids):
+    """
+    Elimina en una sola consulta los eventos del usuario indicados por id.
+    """
+    existentes = set(
+        Evento.objects.filter(Usuario=usuario, id__in=ids).values_list('id', flat=True)
+    )
+    registrar_eventos_eliminados((pk, usuario.pk) for pk in existentes)
+    Evento.objects.filter(Usuario=usuario, id__in=existentes).delete()
+    return [
+        {'index': indice, 'status': 'deleted', 'id': pk} if pk in existentes else
+        {'index': indice, 'status': 'error', 'id': pk, 'errors': {'id': ['Evento no encontrado.']}}
+        for indice, pk in enumerate(ids)
+    ]
+
+
+@transaction.atomic
+def procesar_lote(usuario, crear=(), actualizar=(), eliminar=()):
+    """
+    Aplica creaciones, actualizaciones y eliminaciones en una sola transacción.
+    Los elementos inválidos se informan en el resultado y no se escriben.
+    """
+    resultados = {
+        'create': crear_eventos(usuario, crear) if crear else [],
+        'update': actualizar_eventos(usuario, actualizar) if actualizar else [],
+        'delete': eliminar_eventos(usuario, eliminar) if eliminar else [],
+    }
+    # bulk_create/bulk_update no emiten señales
+    transaction.on_commit(lambda: cache.invalidar(usuario.pk))
+    return resultados
@@ -0,0 +1,138 @@
+"""
+Búsqueda de texto completo sobre Titulo, Descripcion y Ubicacion de los eventos.
+
+El índice lo crea la migración 0012 según el motor:
+- SQLite: tabla FTS5 `api_evento_fts` mantenida por triggers (también cubre bulk_create
+  y .update(), que no disparan señales), ordenada por bm25(). Una migración que rehace
+  api_evento borra los triggers: comprobar_triggers() lo detecta (`manage.py check --database default`).
+- PostgreSQL: columna tsvector generada `busqueda` con índice GIN, ordenada por ts_rank().
+En otros motores se recurre a LIKE, sin ranking.
+
+Cada término de la consulta se busca como prefijo ("reun" encuentra "Reunión").
+"""
+import re
+
+from django.core import checks
+from django.db import connection, connections
+from django.db.models import Q
+
+from .models import Evento
+
+_PALABRA = re.compile(r'\w+')
+MAX_TERMINOS = 8
+LIMITE = 50
+
+# Pesos por columna (Titulo, Descripcion, Ubicacion): el título pesa más
+SQLITE_SQL = """
+    SELECT e.id FROM api_evento_fts f JOIN api_evento e ON e.id = f.rowid
+    WHERE api_evento_fts MATCH %s{filtro}
+    ORDER BY bm25(api_evento_fts, 10.0, 1.0, 5.0)
+    LIMIT %s
+"""
+POSTGRES_SQL = """
+    SELECT e.id FROM api_evento e, to_tsquery('simple', %s) q
+    WHERE e.busqueda @@ q{filtro}
+    ORDER BY ts_rank(e.busqueda, q) DESC
+    LIMIT %s
+"""
+# Sin orden ni límite, para usar como subconsulta (id__in=RawSQL(...))
+SQLITE_IDS_SQL = "SELECT rowid FROM api_evento_fts WHERE api_evento_fts MATCH %s"
+POSTGRES_IDS_SQL = "SELECT id FROM api_evento WHERE busqueda @@ to_tsquery('simple', %s)"
+
+TRIGGERS_SQLITE = ('api_evento_fts_ai', 'api_evento_fts_ad', 'api_evento_fts_au')
+
+
+def terminos(consulta):
+    """Palabras de la consulta, sin los operadores de FTS5/tsquery."""
+    return _PALABRA.findall(consulta or '')[:MAX_TERMINOS]
+
+
+def disponible():
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+def _expresion(palabras):
+    if connection.vendor == 'sqlite':
+        return ' '.join(f'"{palabra}"*' for palabra in palabras)
+    return ' & '.join(f'{palabra}:*' for palabra in palabras)
+
+
+def subconsulta_ids(consulta):
+    """
+    (sql, params) de los ids de todos los eventos que coinciden, sin ranking ni límite,
+    para filtrar un queryset en la base de datos. Requiere disponible() y términos.
+    """
+    sql = SQLITE_IDS_SQL if connection.vendor == 'sqlite' else POSTGRES_IDS_SQL
+    return sql, [_expresion(terminos(consulta))]
+
+
+def buscar_ids(consulta, usuario_id=None, limite=LIMITE):
+    """
+    Ids de los eventos que contienen todos los términos (como prefijo), del más
+    relevante al menos relevante. Con `usuario_id` solo se buscan sus eventos.
+    """
+    palabras = terminos(consulta)
+    if not palabras:
+        return []
+
+    if not disponible():
+        filtro = Q()
+        for palabra in palabras:
+            filtro &= (
+                Q(Titulo__icontains=palabra) | Q(Descripcion__icontains=palabra) |
+                Q(Ubicacion__icontains=palabra)
+            )
+        eventos = Evento.objects.filter(filtro)
+        if usuario_id is not None:
+            eventos = eventos.filter(Usuario_id=usuario_id)
+        return list(eventos.values_list('id', flat=True)[:limite])
+
+    sql = SQLITE_SQL if connection.vendor == 'sqlite' else POSTGRES_SQL
+    params = [_expresion(palabras)]
+    filtro = ''
+    if usuario_id is not None:
+        filtro = ' AND e."Usuario_id" = %s'
+        params.append(usuario_id)
+    params.append(limite)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql.format(filtro=filtro), params)
+        return [fila[0] for fila in cursor.fetchall()]
+
+
+def buscar_eventos(usuario_id, consulta, campos, limite=LIMITE):
+    """Filas .values(*campos) de los eventos encontrados, en orden de relevancia."""
+    ids = buscar_ids(consulta, usuario_id, limite)
+    if not ids:
+        return []
+    filas = {fila['id']: fila for fila in Evento.objects.filter(id__in=ids).values(*campos)}
+    return [filas[pk] for pk in ids if pk in filas]
+
+
+def comprobar_triggers(app_configs=None, databases=None, **kwargs):
+    """
+    Check de sistema: en SQLite el índice FTS5 existe pero le falta algún trigger (una
+    migración rehízo api_evento sin recrearlos) y la búsqueda devolvería datos viejos.
+    """
+    errores = []
+    for alias in databases or ():
+        conexion = connections[alias]
+        if conexion.vendor != 'sqlite':
+            continue
+        with conexion.cursor() as cursor:
+            cursor.execute(
+                "SELECT type, name FROM sqlite_master WHERE name = 'api_evento_fts' OR "
+                "(type = 'trigger' AND tbl_name = 'api_evento')"
+            )
+            objetos = {nombre: tipo for tipo, nombre in cursor.fetchall()}
+        if 'api_evento_fts' not in objetos:
+            continue
+        faltantes = [nombre for nombre in TRIGGERS_SQLITE if objetos.get(nombre) != 'trigger']
+        if faltantes:
+            errores.append(checks.Error(
+                f"Faltan los triggers del índice de búsqueda en '{alias}': {', '.join(faltantes)}.",
+                hint="Vuelva a crearlos con SQLITE_TRIGGERS de api/migrations/0012_evento_busqueda.py "
+                     "(ver 0014_evento_extenso).",
+                id='api.E001',
+            ))
+    return errores
@@ -0,0 +1,73 @@
+"""
+Caché por usuario de los listados de eventos ya serializados.
+
+Las claves llevan un número de versión por usuario; cualquier escritura sobre sus
+eventos o recordatorios incrementa la versión (ver api.signals), así que las entradas
+viejas dejan de leerse sin tener que borrarlas una a una y expiran solas.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+
+PREFIJO = 'eventos'
+
+
+def _cache():
+    return caches[getattr(settings, 'EVENTOS_CACHE_ALIAS', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'EVENTOS_CACHE_TIMEOUT', 300)
+
+
+def _incrementar(clave):
+    cache = _cache()
+    # add() es atómico: solo crea el contador si no existe
+    if cache.add(clave, 1, timeout=None):
+        return 1
+    try:
+        return cache.incr(clave)
+    except ValueError:
+        # El contador expiró entre add() e incr()
+        cache.set(clave, 1, timeout=None)
+        return 1
+
+
+def version(usuario_id):
+    return _cache().get(f'{PREFIJO}:v:{usuario_id}', 0)
+
+
+def invalidar(usuario_id):
+    """Invalida todos los listados cacheados del usuario."""
+    _incrementar(f'{PREFIJO}:v:{usuario_id}')
+
+
+def obtener(usuario_id, variante, calcular):
+    """
+    Devuelve el listado cacheado para (usuario, versión, variante) o lo calcula con
+    `calcular()` y lo guarda. `variante` distingue ventana, cursor, etc.
+    """
+    resumen = hashlib.md5(variante.encode(), usedforsecurity=False).hexdigest()
+    clave = f'{PREFIJO}:{usuario_id}:{version(usuario_id)}:{resumen}'
+    cache = _cache()
+    datos = cache.get(clave)
+    if datos is not None:
+        _incrementar(f'{PREFIJO}:stats:hits')
+        return datos
+    _incrementar(f'{PREFIJO}:stats:misses')
+    datos = calcular()
+    cache.set(clave, datos, timeout=_timeout())
+    return datos
+
+
+def estadisticas():
+    cache = _cache()
+    hits = cache.get(f'{PREFIJO}:stats:hits', 0)
+    misses = cache.get(f'{PREFIJO}:stats:misses', 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else None,
+    }
@@ -0,0 +1,67 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+
+from .models import Evento, Recordatorio
+
+
+VERSION = {'ultimo': Max('ActualizadoEn'), 'total': Count('id')}
+
+
+def version_eventos(usuario):
+    """(max ActualizadoEn, cantidad) de los eventos del usuario; una consulta sobre índices."""
+    datos = Evento.objects.filter(Usuario_id=usuario.pk).aggregate(**VERSION)
+    return datos['ultimo'], datos['total']
+
+
+def version_recordatorios(usuario):
+    """(max ActualizadoEn, cantidad) de los recordatorios de los eventos del usuario."""
+    datos = Recordatorio.objects.filter(Evento__Usuario_id=usuario.pk).aggregate(**VERSION)
+    return datos['ultimo'], datos['total']
+
+
+async def aversion_eventos(usuario):
+    """Versión asíncrona de version_eventos (ORM asíncrono)."""
+    datos = await Evento.objects.filter(Usuario_id=usuario.pk).aaggregate(**VERSION)
+    return datos['ultimo'], datos['total']
+
+
+async def aversion_recordatorios(usuario):
+    """Versión asíncrona de version_recordatorios (ORM asíncrono)."""
+    datos = await Recordatorio.objects.filter(Evento__Usuario_id=usuario.pk).aaggregate(**VERSION)
+    return datos['ultimo'], datos['total']
+
+
+class Condicional:
+    """
+    Validador HTTP (ETag) de un listado a partir de su versión.
+
+    El ETag incluye la ruta completa (ventana, cursor, etc.) y la zona horaria activa
+    porque la respuesta depende de ambas. No se emite Last-Modified: MAX(ActualizadoEn)
+    no cambia al borrar una fila que no era la última, y un cliente que solo enviara
+    If-Modified-Since recibiría 304 con el listado viejo (la cantidad del ETag sí cambia). Uso:
+
+        condicional = Condicional(request, version_eventos(request.user))
+        if condicional.no_modificado:
+            return condicional.no_modificado
+        ...
+        return condicional.marcar(Response(data))
+    """
+
+    def __init__(self, request, version):
+        ultimo, total = version
+        clave = (
+            f"{request.user.pk}:{ultimo.isoformat() if ultimo else '-'}:{total}:"
+            f"{timezone.get_current_timezone_name()}:{request.get_full_path()}"
+        )
+        self.etag = quote_etag(hashlib.md5(clave.encode(), usedforsecurity=False).hexdigest())
+        self.no_modificado = get_conditional_response(request, etag=self.etag)
+
+    def marcar(self, response):
+        response['ETag'] = self.etag
+        # El navegador puede guardar la respuesta, pero debe revalidarla siempre
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
@@ -0,0 +1,54 @@
+from collections import Counter
+from datetime import datetime
+
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .disponibilidad import CAMPOS_OCUPACION, filtrar_por_ventana
+from .models import Evento
+from .recurrence import expandir_filas
+
+
+def conteo_por_dia(usuario_id, anio, tz):
+    """
+    Cantidad de eventos que empiezan cada día del año, con los días en la zona `tz`.
+
+    Los eventos simples se cuentan con un único GROUP BY sobre la fecha truncada en la
+    base de datos (rango sobre el índice Usuario + FechaInicio). Las series recurrentes
+    no se pueden agrupar en SQL: se expanden sus ocurrencias del año en Python.
+    """
+    inicio = datetime(anio, 1, 1, tzinfo=tz)
+    fin = datetime(anio + 1, 1, 1, tzinfo=tz)
+    eventos = Evento.objects.filter(Usuario_id=usuario_id)
+
+    conteo = Counter(dict(
+        eventos
+        .filter(Frecuencia__isnull=True, FechaInicio__gte=inicio, FechaInicio__lt=fin)
+        .annotate(dia=TruncDate('FechaInicio', tzinfo=tz))
+        .values('dia')
+        .annotate(total=Count('id'))
+        .order_by('dia')
+        .values_list('dia', 'total')
+    ))
+
+    series = filtrar_por_ventana(eventos.filter(Frecuencia__isnull=False), inicio, fin)
+    for fila in expandir_filas(series.values(*CAMPOS_OCUPACION), inicio, fin, tz):
+        # La ventana incluye ocurrencias que empezaron antes y siguen en curso
+        if fila['FechaInicio'] >= inicio:
+            conteo[timezone.localtime(fila['FechaInicio'], tz).date()] += 1
+    return conteo
+
+
+def densidad(usuario_id, anio, tz):
+    """Respuesta del endpoint de densidad: conteos por día y por mes (derivados de los días)."""
+    dias = conteo_por_dia(usuario_id, anio, tz)
+    meses = Counter()
+    for dia, total in dias.items():
+        meses[dia.strftime('%Y-%m')] += total
+    return {
+        'anio': anio,
+        'zona': str(tz),
+        'dias': {dia.isoformat(): dias[dia] for dia in sorted(dias)},
+        'meses': dict(sorted(meses.items())),
+    }
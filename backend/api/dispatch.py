@@ -0,0 +1,145 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import AvisoProximo, Notificacion, Recordatorio, materializar_avisos
+from .zonas import zona
+
+logger = logging.getLogger(__name__)
+
+# Un aviso en PROCESANDO durante más de este tiempo se considera abandonado (worker caído)
+TIEMPO_RECLAMO = timedelta(minutes=10)
+
+
+def gracia():
+    """
+    Retraso máximo con el que todavía se envía un aviso (settings.RECORDATORIOS_GRACIA_HORAS).
+    Los más viejos no se envían: caducar_vencidos() los marca como FALLIDO.
+    """
+    return timedelta(hours=getattr(settings, 'RECORDATORIOS_GRACIA_HORAS', 24))
+
+
+def reclamar_lote(lote=100, ahora=None):
+    """
+    Reclama hasta `lote` recordatorios vencidos y los pasa a PROCESANDO.
+
+    La cola se lee de AvisoProximo (un rango sobre FechaEnviado, sin joins) y las filas
+    reclamadas se borran en la misma transacción. Donde la base de datos lo soporta se usa
+    SELECT ... FOR UPDATE SKIP LOCKED, así varios workers reclaman lotes distintos sin
+    esperarse. En cualquier caso el UPDATE es condicional (Estado='PENDIENTE') y ReclamadoEn
+    actúa como marca del lote, de modo que un aviso solo puede quedar reclamado por un worker.
+    """
+    ahora = ahora or timezone.now()
+    with transaction.atomic():
+        vencidos = AvisoProximo.objects.filter(
+            FechaEnviado__gte=ahora - gracia(), FechaEnviado__lte=ahora
+        ).order_by('FechaEnviado')
+        if connection.features.has_select_for_update_skip_locked:
+            vencidos = vencidos.select_for_update(skip_locked=True)
+        ids = list(vencidos.values_list('Recordatorio_id', flat=True)[:lote])
+        if not ids:
+            return []
+        Recordatorio.objects.filter(id__in=ids, Estado='PENDIENTE').update(
+            Estado='PROCESANDO', ReclamadoEn=ahora, ActualizadoEn=ahora
+        )
+        AvisoProximo.objects.filter(Recordatorio_id__in=ids).delete()
+
+    return list(
+        Recordatorio.objects
+        .filter(id__in=ids, Estado='PROCESANDO', ReclamadoEn=ahora)
+        .select_related('Evento__Usuario__perfil')
+    )
+
+
+def liberar_abandonados(ahora=None):
+    """Devuelve a PENDIENTE (y a la cola) los avisos reclamados por un worker que no terminó."""
+    ahora = ahora or timezone.now()
+    with transaction.atomic():
+        abandonados = Recordatorio.objects.filter(Estado='PROCESANDO', ReclamadoEn__lt=ahora - TIEMPO_RECLAMO)
+        ids = list(abandonados.values_list('id', flat=True))
+        if not ids:
+            return 0
+        liberados = Recordatorio.objects.filter(id__in=ids, Estado='PROCESANDO').update(
+            Estado='PENDIENTE', ReclamadoEn=None, ActualizadoEn=ahora
+        )
+        materializar_avisos(ids, ahora)
+    return liberados
+
+
+def caducar_vencidos(ahora=None):
+    """
+    Marca como FALLIDO, sin enviarlos, los avisos PENDIENTES vencidos hace más que la
+    gracia (p. ej. eventos de hace años al poner en marcha el worker, o tras una caída
+    larga) y saca sus filas de la cola. Lo registra como advertencia en el log.
+    """
+    ahora = ahora or timezone.now()
+    limite = ahora - gracia()
+    with transaction.atomic():
+        ids = list(
+            Recordatorio.objects.filter(Estado='PENDIENTE', FechaEnviado__lt=limite).values_list('id', flat=True)
+        )
+        if not ids:
+            return 0
+        Recordatorio.objects.filter(id__in=ids, Estado='PENDIENTE').update(Estado='FALLIDO', ActualizadoEn=ahora)
+        AvisoProximo.objects.filter(Recordatorio_id__in=ids).delete()
+    logger.warning("%d recordatorios vencidos antes de %s se marcaron FALLIDO sin enviarse.", len(ids), limite)
+    return len(ids)
+
+
+def _zona_del_usuario(usuario):
+    # Sin perfil, el acceso inverso lanza RelatedObjectDoesNotExist (un AttributeError)
+    perfil = getattr(usuario, 'perfil', None)
+    return zona(perfil.ZonaHoraria if perfil else None)
+
+
+def _mensaje(recordatorio):
+    evento = recordatorio.Evento
+    # La hora del aviso se muestra en la zona del destinatario, no en la del servidor
+    inicio = timezone.localtime(evento.FechaInicio, _zona_del_usuario(evento.Usuario)).strftime('%Y-%m-%d %H:%M')
+    return f"Recordatorio: {evento.Titulo} comienza el {inicio}"
+
+
+def enviar(recordatorio):
+    """Despacha un recordatorio por su canal. Lanza una excepción si el envío falla."""
+    usuario = recordatorio.Evento.Usuario
+    mensaje = _mensaje(recordatorio)
+    if recordatorio.TipoAviso == 'EMAIL':
+        if not usuario.email:
+            raise ValueError(f"El usuario {usuario.pk} no tiene correo.")
+        send_mail(
+            subject=mensaje,
+            message=mensaje,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            recipient_list=[usuario.email],
+        )
+    elif recordatorio.TipoAviso == 'NOTIFICACION_APP':
+        Notificacion.objects.create(Usuario=usuario, Recordatorio=recordatorio, Mensaje=mensaje)
+    else:
+        raise ValueError(f"Tipo de aviso desconocido: {recordatorio.TipoAviso}")
+
+
+def procesar_pendientes(lote=100, ahora=None):
+    """
+    Reclama un lote, lo despacha y marca cada aviso como ENVIADO o FALLIDO.
+    Devuelve (enviados, fallidos).
+    """
+    enviados, fallidos = [], []
+    for recordatorio in reclamar_lote(lote, ahora):
+        try:
+            enviar(recordatorio)
+        except Exception:
+            logger.exception("No se pudo enviar el recordatorio %s", recordatorio.pk)
+            fallidos.append(recordatorio.pk)
+        else:
+            enviados.append(recordatorio.pk)
+
+    terminado = timezone.now()
+    if enviados:
+        Recordatorio.objects.filter(id__in=enviados).update(Estado='ENVIADO', ActualizadoEn=terminado)
+    if fallidos:
+        Recordatorio.objects.filter(id__in=fallidos).update(Estado='FALLIDO', ActualizadoEn=terminado)
+    return len(enviados), len(fallidos)
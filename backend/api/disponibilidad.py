@@ -0,0 +1,140 @@
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+from itertools import islice
+
+from django.db.models import Q
+
+from .models import DURACION_CORTA, Evento
+from .recurrence import expandir, expandir_filas
+
+# Campos necesarios para expandir una serie; el resto del evento no interesa aquí
+CAMPOS_OCUPACION = (
+    'FechaInicio', 'FechaFin', 'Frecuencia', 'Intervalo',
+    'RepetirHasta', 'RepetirVeces', 'Excepciones',
+)
+
+# Ventana máxima de una consulta (acota la expansión de las series sin fin)
+MAX_VENTANA = timedelta(days=366)
+# Tope de ocurrencias al comprobar conflictos de una serie nueva
+MAX_OCURRENCIAS_CONFLICTO = 500
+
+
+def filtrar_por_ventana(eventos, inicio=None, fin=None):
+    """
+    Restringe los eventos a los que se solapan con la ventana [inicio, fin).
+    Un evento sin FechaFin se trata como un instante en su FechaInicio. Con `inicio`
+    devuelve un queryset nuevo (sobre el manager del modelo) con los filtros de `eventos`.
+
+    Los eventos cortos (no Extenso) empiezan como mucho DURACION_CORTA antes de la
+    ventana, así que se leen con un rango acotado de (Usuario, FechaInicio) y el costo no
+    crece con el historial. Los extensos (series y eventos largos, pocos por usuario) van
+    por su propio índice; de las series se incluyen las que pueden tener alguna ocurrencia
+    en la ventana (FinSerie nulo o posterior al inicio) y la expansión exacta se hace en Python.
+    """
+    if inicio is None:
+        return eventos.filter(FechaInicio__lt=fin) if fin is not None else eventos
+
+    hasta = Q(FechaInicio__lt=fin) if fin is not None else Q()
+    cortos = eventos.filter(
+        hasta, Q(FechaFin__gt=inicio) | Q(FechaFin__isnull=True, FechaInicio__gte=inicio),
+        FechaInicio__gte=inicio - DURACION_CORTA,
+    )
+    # Extenso__in en vez de Extenso=True: Django escribe el booleano solo ("Extenso"),
+    # que SQLite no puede buscar en el índice; "Extenso" IN (1) sí
+    extensos = eventos.filter(
+        hasta,
+        Q(Frecuencia__isnull=True, FechaFin__gt=inicio) |
+        Q(Frecuencia__isnull=False) & (Q(FinSerie__isnull=True) | Q(FinSerie__gt=inicio)),
+        Extenso__in=[True],
+    )
+    # Un OR en un solo WHERE no usa ninguno de los dos índices: cada rama va en su subconsulta.
+    # La consulta externa no repite los filtros de `eventos` (ya están en las ramas): con
+    # Usuario_id, SQLite recorrería el índice del usuario entero en vez de buscar por id.
+    ids = cortos.order_by().values('id').union(extensos.order_by().values('id'), all=True)
+    return eventos.model.objects.filter(id__in=ids)
+
+
+def intervalos_ocupados(usuario_id, inicio, fin):
+    """
+    Intervalos (inicio, fin) en los que el usuario tiene algún evento dentro de
+    [inicio, fin), recortados a la ventana. Los eventos cancelados y los que no
+    tienen FechaFin (instantes) no ocupan tiempo.
+    """
+    eventos = filtrar_por_ventana(
+        Evento.objects.filter(Usuario_id=usuario_id, FechaFin__isnull=False).exclude(Estado='CANCELADO'),
+        inicio, fin,
+    )
+    for fila in expandir_filas(eventos.values(*CAMPOS_OCUPACION), inicio, fin):
+        if fila['FechaFin'] > fila['FechaInicio']:
+            yield max(fila['FechaInicio'], inicio), min(fila['FechaFin'], fin)
+
+
+def fusionar(intervalos):
+    """Une los intervalos que se solapan o se tocan. Devuelve bloques ordenados y disjuntos."""
+    bloques = []
+    for inicio, fin in sorted(intervalos):
+        if bloques and inicio <= bloques[-1][1]:
+            if fin > bloques[-1][1]:
+                bloques[-1][1] = fin
+        else:
+            bloques.append([inicio, fin])
+    return [tuple(bloque) for bloque in bloques]
+
+
+class IndiceOcupacion:
+    """
+    Índice en memoria de los bloques ocupados de un usuario para responder muchas
+    consultas de solapamiento con una sola lectura de la base de datos.
+
+    Como los bloques están fusionados (ordenados y disjuntos), tanto los inicios como
+    los fines quedan ordenados y cada consulta es una búsqueda binaria: O(log n + k),
+    lo mismo que un árbol de intervalos sin tener que construirlo.
+    """
+
+    def __init__(self, intervalos):
+        self.bloques = fusionar(intervalos)
+        self._inicios = [inicio for inicio, _ in self.bloques]
+        self._fines = [fin for _, fin in self.bloques]
+
+    def solapados(self, inicio, fin=None):
+        """Bloques que se solapan con [inicio, fin). Sin fin, el candidato es un instante."""
+        fin = fin or inicio
+        desde = bisect_right(self._fines, inicio)
+        hasta = bisect_left(self._inicios, fin) if fin > inicio else bisect_right(self._inicios, inicio)
+        return self.bloques[desde:hasta]
+
+
+def bloques_ocupados(usuario_id, inicio, fin):
+    """Bloques ocupados fusionados del usuario dentro de [inicio, fin)."""
+    return fusionar(intervalos_ocupados(usuario_id, inicio, fin))
+
+
+def conflictos(usuario_id, candidatos):
+    """
+    Para cada candidato (inicio, fin) devuelve la lista de bloques ocupados con los que
+    se solapa. Se hace una única consulta que cubre a todos los candidatos.
+    """
+    if not candidatos:
+        return []
+    inicio = min(candidato[0] for candidato in candidatos)
+    fin = max(candidato[1] or candidato[0] for candidato in candidatos)
+    # La ventana es semiabierta: se amplía un instante para incluir candidatos puntuales
+    indice = IndiceOcupacion(intervalos_ocupados(usuario_id, inicio, fin + timedelta(microseconds=1)))
+    return [indice.solapados(*candidato) for candidato in candidatos]
+
+
+def conflictos_de_evento(usuario_id, datos):
+    """
+    Bloques ocupados con los que chocaría un evento nuevo (datos validados del serializador).
+    Las series se comprueban ocurrencia a ocurrencia durante MAX_VENTANA.
+    """
+    inicio, fin = datos['FechaInicio'], datos.get('FechaFin')
+    if datos.get('Frecuencia'):
+        candidatos = list(islice(expandir(
+            inicio, fin, datos['Frecuencia'], datos.get('Intervalo', 1),
+            datos.get('RepetirHasta'), datos.get('RepetirVeces'), datos.get('Excepciones'),
+            ventana_fin=inicio + MAX_VENTANA,
+        ), MAX_OCURRENCIAS_CONFLICTO))
+    else:
+        candidatos = [(inicio, fin)]
+    return fusionar(bloque for bloques in conflictos(usuario_id, candidatos) for bloque in bloques)
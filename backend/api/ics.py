@@ -0,0 +1,308 @@
+"""
+Importación y exportación de calendarios iCalendar (RFC 5545).
+
+La exportación es un generador de líneas pensado para StreamingHttpResponse y la
+importación procesa el archivo línea a línea, insertando por lotes; en ninguno de los
+dos casos se carga el calendario completo en memoria. Cada lote se confirma en su propia
+transacción para no retener el bloqueo de escritura de SQLite durante todo el archivo.
+"""
+import re
+from datetime import datetime, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import cache
+from .models import Evento, Recordatorio, UNIDAD_TIEMPO_DELTA, materializar_avisos
+from .recurrence import MAX_INTERVALO
+
+TAMANO_LOTE = 500
+
+FRECUENCIA_A_RRULE = {'DIARIA': 'DAILY', 'SEMANAL': 'WEEKLY', 'MENSUAL': 'MONTHLY', 'ANUAL': 'YEARLY'}
+RRULE_A_FRECUENCIA = {valor: clave for clave, valor in FRECUENCIA_A_RRULE.items()}
+
+TIPO_AVISO_A_ACTION = {'EMAIL': 'EMAIL', 'NOTIFICACION_APP': 'DISPLAY'}
+ACTION_A_TIPO_AVISO = {'EMAIL': 'EMAIL', 'DISPLAY': 'NOTIFICACION_APP', 'AUDIO': 'NOTIFICACION_APP'}
+
+UNIDAD_A_TRIGGER = {'MINUTOS': '-PT{}M', 'HORAS': '-PT{}H', 'DIAS': '-P{}D'}
+
+_DURACION_RE = re.compile(r'^(?P<signo>[+-])?P(?:(?P<semanas>\d+)W)?(?:(?P<dias>\d+)D)?'
+                          r'(?:T(?:(?P<horas>\d+)H)?(?:(?P<minutos>\d+)M)?(?:(?P<segundos>\d+)S)?)?$')
+
+
+# --- Exportación ---
+
+def _escapar(texto):
+    return (texto.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def _plegar(linea):
+    """Pliega una línea de contenido en trozos de como máximo 75 octetos (RFC 5545 §3.1)."""
+    datos = linea.encode('utf-8')
+    if len(datos) <= 75:
+        return linea + '\r\n'
+    partes, limite = [], 75
+    while datos:
+        corte = min(limite, len(datos))
+        # No partir un carácter UTF-8 multibyte
+        while corte < len(datos) and (datos[corte] & 0xC0) == 0x80:
+            corte -= 1
+        partes.append(datos[:corte].decode('utf-8'))
+        datos = datos[corte:]
+        limite = 74  # las líneas de continuación empiezan con un espacio
+    return '\r\n '.join(partes) + '\r\n'
+
+
+def _fecha_utc(fecha):
+    return fecha.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _vevent(evento):
+    lineas = [
+        'BEGIN:VEVENT',
+        f'UID:evento-{evento.pk}@calender',
+        f'DTSTAMP:{_fecha_utc(evento.ActualizadoEn)}',
+        f'DTSTART:{_fecha_utc(evento.FechaInicio)}',
+    ]
+    if evento.FechaFin:
+        lineas.append(f'DTEND:{_fecha_utc(evento.FechaFin)}')
+    lineas.append(f'SUMMARY:{_escapar(evento.Titulo)}')
+    if evento.Descripcion:
+        lineas.append(f'DESCRIPTION:{_escapar(evento.Descripcion)}')
+    if evento.Ubicacion:
+        lineas.append(f'LOCATION:{_escapar(evento.Ubicacion)}')
+    if evento.Estado == 'CANCELADO':
+        lineas.append('STATUS:CANCELLED')
+    if evento.es_recurrente:
+        regla = [f'FREQ={FRECUENCIA_A_RRULE[evento.Frecuencia]}']
+        if evento.Intervalo and evento.Intervalo > 1:
+            regla.append(f'INTERVAL={evento.Intervalo}')
+        if evento.RepetirHasta:
+            regla.append(f'UNTIL={_fecha_utc(evento.RepetirHasta)}')
+        if evento.RepetirVeces is not None:
+            regla.append(f'COUNT={evento.RepetirVeces}')
+        lineas.append('RRULE:' + ';'.join(regla))
+        for excepcion in evento.Excepciones or ():
+            fecha = parse_datetime(excepcion)
+            if fecha is not None:
+                if timezone.is_naive(fecha):
+                    fecha = timezone.make_aware(fecha)
+                lineas.append(f'EXDATE:{_fecha_utc(fecha)}')
+    for recordatorio in evento.recordatorios.all():
+        lineas += [
+            'BEGIN:VALARM',
+            f'ACTION:{TIPO_AVISO_A_ACTION[recordatorio.TipoAviso]}',
+            f'TRIGGER:{UNIDAD_A_TRIGGER[recordatorio.UnidadTiempo].format(recordatorio.TiempoAntes)}',
+            f'DESCRIPTION:{_escapar(evento.Titulo)}',
+        ]
+        if recordatorio.TipoAviso == 'EMAIL':
+            lineas.append(f'SUMMARY:{_escapar(evento.Titulo)}')
+        lineas.append('END:VALARM')
+    lineas.append('END:VEVENT')
+    return ''.join(_plegar(linea) for linea in lineas)
+
+
+def exportar(usuario, chunk_size=TAMANO_LOTE):
+    """
+    Genera el calendario del usuario como texto iCalendar, evento a evento.
+    Los eventos se leen con .iterator(chunk_size) y sus recordatorios se
+    precargan por bloque, así que la memoria no depende del número de eventos.
+    """
+    yield 'BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//Calender//ES\r\nCALSCALE:GREGORIAN\r\n'
+    eventos = (
+        Evento.objects.filter(Usuario_id=usuario.pk)
+        .order_by('FechaInicio', 'id')
+        .prefetch_related('recordatorios')
+        .iterator(chunk_size=chunk_size)
+    )
+    for evento in eventos:
+        yield _vevent(evento)
+    yield 'END:VCALENDAR\r\n'
+
+
+# --- Importación ---
+
+def _desplegar(lineas):
+    """Une las líneas de continuación (las que empiezan con espacio o tabulador)."""
+    actual = None
+    for linea in lineas:
+        if isinstance(linea, bytes):
+            linea = linea.decode('utf-8', errors='replace')
+        linea = linea.rstrip('\r\n')
+        if linea[:1] in (' ', '\t') and actual is not None:
+            actual += linea[1:]
+            continue
+        if actual is not None:
+            yield actual
+        actual = linea
+    if actual:
+        yield actual
+
+
+def _separar(linea):
+    """Divide 'NOMBRE;PARAM=V:valor' en (NOMBRE, {PARAM: V}, valor)."""
+    cabecera, _, valor = linea.partition(':')
+    nombre, *params = cabecera.split(';')
+    parametros = {}
+    for param in params:
+        clave, _, v = param.partition('=')
+        parametros[clave.upper()] = v.strip('"')
+    return nombre.upper(), parametros, valor
+
+
+def _desescapar(texto):
+    return re.sub(r'\\([\\;,nN])', lambda m: '\n' if m.group(1) in 'nN' else m.group(1), texto)
+
+
+def _parse_fecha_ics(valor, tzid=None):
+    valor = valor.strip()
+    try:
+        if len(valor) == 8:
+            fecha = datetime.strptime(valor, '%Y%m%d')
+        elif valor.endswith('Z'):
+            return datetime.strptime(valor, '%Y%m%dT%H%M%SZ').replace(tzinfo=dt_timezone.utc)
+        else:
+            fecha = datetime.strptime(valor, '%Y%m%dT%H%M%S')
+    except ValueError:
+        return None
+    if tzid:
+        try:
+            return fecha.replace(tzinfo=ZoneInfo(tzid))
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return timezone.make_aware(fecha)
+
+
+def _parse_trigger(valor):
+    """Convierte un TRIGGER relativo ('-PT15M') en (TiempoAntes, UnidadTiempo)."""
+    coincidencia = _DURACION_RE.match(valor.strip())
+    if not coincidencia or coincidencia.group('signo') == '+':
+        return None
+    partes = {k: int(v or 0) for k, v in coincidencia.groupdict().items() if k != 'signo'}
+    minutos = (partes['semanas'] * 7 * 1440 + partes['dias'] * 1440
+               + partes['horas'] * 60 + partes['minutos'] + partes['segundos'] // 60)
+    for unidad in ('DIAS', 'HORAS'):
+        paso = UNIDAD_TIEMPO_DELTA[unidad] // timedelta(minutes=1)
+        if minutos and minutos % paso == 0:
+            return minutos // paso, unidad
+    return minutos, 'MINUTOS'
+
+
+def leer_eventos(lineas):
+    """
+    Generador que recorre un flujo de líneas iCalendar y produce un dict por VEVENT
+    (campos de Evento + lista 'recordatorios'). Los VEVENT inválidos producen
+    {'error': ...} para que el llamador pueda informarlo.
+    """
+    evento = alarma = None
+    for linea in _desplegar(lineas):
+        nombre, params, valor = _separar(linea)
+        if nombre == 'BEGIN' and valor.upper() == 'VEVENT':
+            evento = {'recordatorios': [], 'Excepciones': []}
+        elif evento is None:
+            continue
+        elif nombre == 'BEGIN' and valor.upper() == 'VALARM':
+            alarma = {}
+        elif nombre == 'END' and valor.upper() == 'VALARM':
+            if alarma and alarma.get('trigger'):
+                evento['recordatorios'].append(alarma)
+            alarma = None
+        elif alarma is not None:
+            if nombre == 'TRIGGER' and params.get('VALUE', '').upper() != 'DATE-TIME':
+                alarma['trigger'] = _parse_trigger(valor)
+            elif nombre == 'ACTION':
+                alarma['TipoAviso'] = ACTION_A_TIPO_AVISO.get(valor.upper(), 'NOTIFICACION_APP')
+        elif nombre == 'END' and valor.upper() == 'VEVENT':
+            if not evento.get('FechaInicio'):
+                yield {'error': f"VEVENT sin DTSTART válido ({evento.get('Titulo', 'sin título')})"}
+            elif evento.get('RepetirVeces') == 0:
+                yield {'error': f"RRULE con COUNT=0 ({evento.get('Titulo', 'sin título')})"}
+            else:
+                evento.setdefault('Titulo', 'Sin título')
+                yield evento
+            evento = None
+        elif nombre == 'SUMMARY':
+            evento['Titulo'] = _desescapar(valor)[:255]
+        elif nombre == 'DESCRIPTION':
+            evento['Descripcion'] = _desescapar(valor)
+        elif nombre == 'LOCATION':
+            evento['Ubicacion'] = _desescapar(valor)[:255]
+        elif nombre == 'DTSTART':
+            evento['FechaInicio'] = _parse_fecha_ics(valor, params.get('TZID'))
+        elif nombre == 'DTEND':
+            evento['FechaFin'] = _parse_fecha_ics(valor, params.get('TZID'))
+        elif nombre == 'STATUS' and valor.upper() == 'CANCELLED':
+            evento['Estado'] = 'CANCELADO'
+        elif nombre == 'EXDATE':
+            for fecha in valor.split(','):
+                fecha = _parse_fecha_ics(fecha, params.get('TZID'))
+                if fecha:
+                    evento['Excepciones'].append(fecha.isoformat())
+        elif nombre == 'RRULE':
+            # Solo se soportan FREQ, INTERVAL, UNTIL y COUNT
+            regla = dict(parte.partition('=')[::2] for parte in valor.upper().split(';'))
+            if regla.get('FREQ') in RRULE_A_FRECUENCIA:
+                evento['Frecuencia'] = RRULE_A_FRECUENCIA[regla['FREQ']]
+                if regla.get('INTERVAL', '').isdigit():
+                    evento['Intervalo'] = min(max(1, int(regla['INTERVAL'])), MAX_INTERVALO)
+                if regla.get('COUNT', '').isdigit():
+                    evento['RepetirVeces'] = int(regla['COUNT'])
+                elif regla.get('UNTIL'):
+                    evento['RepetirHasta'] = _parse_fecha_ics(regla['UNTIL'])
+
+
+@transaction.atomic
+def _guardar_lote(usuario, lote):
+    eventos = []
+    for datos in lote:
+        evento = Evento(Usuario=usuario, **{k: v for k, v in datos.items() if k != 'recordatorios'})
+        evento.preparar_recurrencia()
+        eventos.append(evento)
+    Evento.objects.bulk_create(eventos)
+
+    recordatorios, vistos = [], set()
+    for evento, datos in zip(eventos, lote):
+        for alarma in datos['recordatorios']:
+            tiempo, unidad = alarma['trigger']
+            tipo = alarma.get('TipoAviso', 'NOTIFICACION_APP')
+            if (evento.pk, tipo, tiempo, unidad) in vistos:
+                continue
+            vistos.add((evento.pk, tipo, tiempo, unidad))
+            recordatorio = Recordatorio(Evento=evento, TipoAviso=tipo, TiempoAntes=tiempo, UnidadTiempo=unidad)
+            recordatorio.FechaEnviado = recordatorio.calcular_fecha_envio(evento.FechaInicio)
+            recordatorios.append(recordatorio)
+    Recordatorio.objects.bulk_create(recordatorios)
+    materializar_avisos([recordatorio.pk for recordatorio in recordatorios])
+    # bulk_create no emite señales
+    transaction.on_commit(lambda: cache.invalidar(usuario.pk))
+    return len(eventos), len(recordatorios)
+
+
+def importar(usuario, lineas, tamano_lote=TAMANO_LOTE):
+    """
+    Importa los VEVENT de `lineas` (cualquier iterable, p. ej. un UploadedFile) para
+    el usuario, insertando con bulk_create cada `tamano_lote` eventos.
+    Cada lote es atómico por separado: si la importación falla a mitad del archivo,
+    los lotes anteriores quedan guardados.
+    Devuelve un resumen con los totales y los errores encontrados.
+    """
+    resumen = {'eventos': 0, 'recordatorios': 0, 'errores': []}
+    lote = []
+    for datos in leer_eventos(lineas):
+        if 'error' in datos:
+            resumen['errores'].append(datos['error'])
+            continue
+        lote.append(datos)
+        if len(lote) >= tamano_lote:
+            eventos, recordatorios = _guardar_lote(usuario, lote)
+            resumen['eventos'] += eventos
+            resumen['recordatorios'] += recordatorios
+            lote = []
+    if lote:
+        eventos, recordatorios = _guardar_lote(usuario, lote)
+        resumen['eventos'] += eventos
+        resumen['recordatorios'] += recordatorios
+    return resumen
@@ -0,0 +1,162 @@
+import json
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from api import cache, views
+from api.authentication import token_para_usuario
+from api.models import Evento, Recordatorio
+
+from .generar_datos import CONTRASENA, PREFIJO
+
+
+def _percentil(ordenados, p):
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide latencia (p50/p95/p99), consultas SQL y memoria pico de event_list, reminders_list, "
+        "create_event y login sobre los datos de generar_datos, y guarda el resultado en JSON "
+        "para comparar entre commits (--comparar)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', default=f'{PREFIJO}0',
+                            help="Usuario (username) cuyos datos se consultan.")
+        parser.add_argument('--repeticiones', type=int, default=50, help="Peticiones medidas por endpoint.")
+        parser.add_argument('--salida', help="Archivo JSON donde guardar los resultados.")
+        parser.add_argument('--comparar', help="Resultados anteriores (JSON) contra los que comparar.")
+
+    def handle(self, *args, **options):
+        try:
+            self.usuario = User.objects.get(username=options['usuario'])
+        except User.DoesNotExist:
+            raise CommandError(f"No existe el usuario {options['usuario']}; ejecute antes generar_datos.")
+        self.factory = APIRequestFactory()
+        self.auth = f'Bearer {token_para_usuario(self.usuario).access_token}'
+        self.logins = list(
+            User.objects.filter(username__startswith=PREFIJO).values_list('email', flat=True)[:500]
+        )
+
+        hoy = timezone.now()
+        mes = {'start': hoy.date().replace(day=1).isoformat(), 'end': (hoy + timedelta(days=31)).date().isoformat()}
+        casos = {
+            'event_list': lambda i: self._get(views.event_list, '/api/events/'),
+            # Sin caché de listados: mide la consulta y la serialización
+            'event_list_frio': lambda i: self._get(views.event_list, '/api/events/', frio=True),
+            'event_list_mes': lambda i: self._get(views.event_list, '/api/events/', mes, frio=True),
+            'reminders_list': lambda i: self._get(views.reminders_list, '/api/reminders/'),
+            'create_event': self._crear,
+            'login': self._login,
+        }
+
+        resultados = {}
+        try:
+            for nombre, caso in casos.items():
+                resultados[nombre] = self._medir(caso, options['repeticiones'])
+                self.stderr.write(f"{nombre}: p50={resultados[nombre]['p50_ms']} ms")
+        finally:
+            Evento.objects.filter(Usuario=self.usuario, Titulo__startswith='Benchmark ').delete()
+
+        informe = {
+            'commit': _commit(),
+            'fecha': timezone.now().isoformat(),
+            'motor': connection.vendor,
+            'usuario': options['usuario'],
+            'eventos': Evento.objects.filter(Usuario=self.usuario).count(),
+            'recordatorios': Recordatorio.objects.filter(Evento__Usuario=self.usuario).count(),
+            'repeticiones': options['repeticiones'],
+            'resultados': resultados,
+        }
+        salida = json.dumps(informe, indent=2)
+        if options['salida']:
+            Path(options['salida']).write_text(salida)
+        self.stdout.write(salida)
+        if options['comparar']:
+            self._comparar(json.loads(Path(options['comparar']).read_text()), informe)
+
+    def _medir(self, caso, repeticiones):
+        # Calentamiento (caché, conexiones, imports) fuera de la medición
+        caso(-1)
+        tiempos, errores = [], 0
+        with CaptureQueriesContext(connection) as consultas:
+            for i in range(repeticiones):
+                inicio = time.perf_counter()
+                estado = caso(i)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+                errores += estado >= 400
+        # La memoria se mide en una pasada aparte: tracemalloc ralentiza la ejecución
+        tracemalloc.start()
+        caso(repeticiones)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        tiempos.sort()
+        return {
+            'p50_ms': round(statistics.median(tiempos), 3),
+            'p95_ms': round(_percentil(tiempos, 0.95), 3),
+            'p99_ms': round(_percentil(tiempos, 0.99), 3),
+            'media_ms': round(statistics.fmean(tiempos), 3),
+            'consultas': round(len(consultas) / repeticiones, 2),
+            'memoria_pico_kb': round(pico / 1024, 1),
+            'errores': errores,
+        }
+
+    def _get(self, vista, ruta, params=None, frio=False):
+        if frio:
+            cache.invalidar(self.usuario.pk)
+        request = self.factory.get(ruta, params or {}, HTTP_AUTHORIZATION=self.auth)
+        response = vista(request)
+        response.render()
+        return response.status_code
+
+    def _crear(self, i):
+        request = self.factory.post('/api/events/create/', {
+            'Titulo': f'Benchmark {i}',
+            'FechaInicio': (timezone.now() + timedelta(days=1, minutes=i)).isoformat(),
+        }, format='json', HTTP_AUTHORIZATION=self.auth)
+        return views.create_event(request).status_code
+
+    def _login(self, i):
+        # Un correo y una IP distintos por petición para no activar el throttling del login
+        email = self.logins[i % len(self.logins)] if self.logins else self.usuario.email
+        request = self.factory.post(
+            '/api/login/', {'email': email, 'password': CONTRASENA}, format='json',
+            REMOTE_ADDR=f'10.0.{(i // 250) % 250}.{i % 250 + 1}',
+        )
+        return views.login(request).status_code
+
+    def _comparar(self, anterior, actual):
+        self.stdout.write(f"\nComparación {anterior.get('commit')} -> {actual['commit']} (p50 / consultas):")
+        for nombre, datos in actual['resultados'].items():
+            previo = anterior.get('resultados', {}).get(nombre)
+            if previo is None:
+                self.stdout.write(f"  {nombre}: sin datos previos")
+                continue
+            cambio = (datos['p50_ms'] - previo['p50_ms']) / previo['p50_ms'] * 100 if previo['p50_ms'] else 0
+            self.stdout.write(
+                f"  {nombre}: {previo['p50_ms']} -> {datos['p50_ms']} ms ({cambio:+.1f}%), "
+                f"{previo['consultas']} -> {datos['consultas']} consultas"
+            )
@@ -0,0 +1,104 @@
+import json
+import statistics
+import threading
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from api.authentication import token_para_usuario
+from api.views import create_event
+
+USUARIO = 'bench-create-event'
+
+# Valores por defecto de SQLite, para comparar con settings.SQLITE_PRAGMAS
+SQLITE_SIN_AJUSTES = {'init_command': 'PRAGMA journal_mode=DELETE;PRAGMA synchronous=FULL', 'timeout': 5}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el rendimiento de create_event con escritores concurrentes (un hilo y una conexión "
+        "por cliente, pasando por la vista DRF completa). Con --sin-ajustes se usa SQLite sin WAL "
+        "ni busy_timeout largo para comparar. Crea un usuario de prueba y lo borra al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=8, help="Clientes concurrentes.")
+        parser.add_argument('--peticiones', type=int, default=100, help="Peticiones por cliente.")
+        parser.add_argument('--sin-ajustes', action='store_true',
+                            help="SQLite con journal_mode=DELETE y synchronous=FULL (línea base).")
+        parser.add_argument('--conservar', action='store_true', help="No borrar el usuario de prueba.")
+
+    def _sin_ajustes(self):
+        if connection.vendor != 'sqlite':
+            self.stderr.write("--sin-ajustes solo tiene efecto con SQLite.")
+            return
+        opciones = connections.settings['default'].setdefault('OPTIONS', {})
+        opciones.pop('transaction_mode', None)
+        opciones.update(SQLITE_SIN_AJUSTES)
+        # Las conexiones nuevas (una por hilo) se abren con las opciones cambiadas
+        connection.close()
+
+    def _cliente(self, request_factory, token, peticiones, tiempos, errores):
+        inicio = timezone.now() + timedelta(days=1)
+        try:
+            for i in range(peticiones):
+                request = request_factory.post('/api/events/create/', {
+                    'Titulo': f'Carga {i}',
+                    'FechaInicio': (inicio + timedelta(minutes=i)).isoformat(),
+                }, format='json', HTTP_AUTHORIZATION=f'Bearer {token}')
+                antes = time.perf_counter()
+                response = create_event(request)
+                tiempos.append((time.perf_counter() - antes) * 1000)
+                if response.status_code != 201:
+                    errores.append(response.status_code)
+        except Exception as exc:
+            errores.append(repr(exc))
+        finally:
+            connections.close_all()
+
+    def handle(self, *args, **options):
+        if options['sin_ajustes']:
+            self._sin_ajustes()
+        usuario, _ = User.objects.get_or_create(
+            username=USUARIO, defaults={'email': f'{USUARIO}@example.com', 'password': '!'}
+        )
+        token = str(token_para_usuario(usuario).access_token)
+        request_factory = APIRequestFactory()
+        tiempos, errores = [], []
+        hilos = [
+            threading.Thread(target=self._cliente, args=(request_factory, token, options['peticiones'], tiempos, errores))
+            for _ in range(options['hilos'])
+        ]
+
+        try:
+            inicio = time.perf_counter()
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+            segundos = time.perf_counter() - inicio
+        finally:
+            if not options['conservar']:
+                usuario.delete()
+
+        tiempos.sort()
+        total = options['hilos'] * options['peticiones']
+        resultado = {
+            'motor': connection.vendor,
+            'ajustes': not options['sin_ajustes'],
+            'hilos': options['hilos'],
+            'peticiones': total,
+            'errores': len(errores),
+            'segundos': round(segundos, 3),
+            'por_segundo': round((total - len(errores)) / segundos, 1),
+            'p50_ms': round(statistics.median(tiempos), 3) if tiempos else None,
+            'p95_ms': round(tiempos[int(len(tiempos) * 0.95) - 1], 3) if tiempos else None,
+        }
+        if errores:
+            self.stderr.write(f"Primeros errores: {errores[:5]}")
+        self.stdout.write(json.dumps(resultado, indent=2))
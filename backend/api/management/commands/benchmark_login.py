@@ -0,0 +1,59 @@
+import json
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+
+from api.auth_backend import buscar_por_email
+
+PREFIJO = 'bench-login-'
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la latencia de la búsqueda por correo del login con distintas cantidades de usuarios. "
+        "Crea usuarios de prueba (sin contraseña utilizable) y los borra al terminar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escalas', default='1000,10000,100000,1000000',
+                            help="Cantidades de usuarios separadas por comas.")
+        parser.add_argument('--consultas', type=int, default=200, help="Búsquedas medidas por escala.")
+        parser.add_argument('--conservar', action='store_true', help="No borrar los usuarios de prueba.")
+
+    def _crear_hasta(self, total, existentes):
+        lote = []
+        for i in range(existentes, total):
+            lote.append(User(username=f'{PREFIJO}{i}', email=f'{PREFIJO}{i}@example.com', password='!'))
+            if len(lote) >= 5000:
+                User.objects.bulk_create(lote)
+                lote = []
+        User.objects.bulk_create(lote)
+
+    def handle(self, *args, **options):
+        escalas = sorted(int(valor) for valor in options['escalas'].split(','))
+        resultados, existentes = [], 0
+        try:
+            for escala in escalas:
+                self._crear_hasta(escala, existentes)
+                existentes = escala
+                tiempos = []
+                for _ in range(options['consultas']):
+                    # Mezcla mayúsculas para ejercitar la comparación sin distinguirlas
+                    email = f'{PREFIJO}{random.randrange(escala)}@EXAMPLE.com'
+                    inicio = time.perf_counter()
+                    buscar_por_email(email).first()
+                    tiempos.append((time.perf_counter() - inicio) * 1000)
+                tiempos.sort()
+                resultados.append({
+                    'usuarios': escala,
+                    'p50_ms': round(statistics.median(tiempos), 3),
+                    'p95_ms': round(tiempos[int(len(tiempos) * 0.95) - 1], 3),
+                })
+                self.stderr.write(f"{escala} usuarios: p50={resultados[-1]['p50_ms']} ms")
+        finally:
+            if not options['conservar']:
+                User.objects.filter(username__startswith=PREFIJO).delete()
+        self.stdout.write(json.dumps(resultados, indent=2))
@@ -0,0 +1,65 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from api.avisos import extender_horizonte
+from api.dispatch import caducar_vencidos, liberar_abandonados, procesar_pendientes
+
+logger = logging.getLogger(__name__)
+
+# Cada cuánto (segundos) el worker corre el horizonte de la cola por su cuenta
+INTERVALO_HORIZONTE = 3600
+
+
+class Command(BaseCommand):
+    help = "Envía los recordatorios vencidos (EMAIL y NOTIFICACION_APP). Puede ejecutarse en varios procesos a la vez."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=100, help="Recordatorios reclamados por consulta.")
+        parser.add_argument('--intervalo', type=float, default=30, help="Segundos de espera cuando no hay trabajo.")
+        parser.add_argument('--una-vez', action='store_true', help="Procesa lo pendiente y termina.")
+
+    def handle(self, *args, **options):
+        # La cola se lee de AvisoProximo: se completa al arrancar y luego cada hora, así un
+        # worker que corre semanas no depende de que materializar_avisos esté en el cron
+        self.siguiente_horizonte = 0
+        try:
+            while True:
+                try:
+                    self._iteracion(options['lote'])
+                except Exception:
+                    if options['una_vez']:
+                        raise
+                    # Un error de la base de datos (p. ej. "database is locked") no debe
+                    # terminar el worker: se registra y se reintenta tras el intervalo
+                    logger.exception("Falló una vuelta del despacho de recordatorios; se reintenta.")
+                    close_old_connections()
+
+                if options['una_vez']:
+                    return
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            self.stdout.write("Worker detenido.")
+
+    def _iteracion(self, lote):
+        if time.monotonic() >= self.siguiente_horizonte:
+            agregados = extender_horizonte()
+            if agregados:
+                self.stdout.write(f"{agregados} recordatorios agregados a la cola.")
+            self.siguiente_horizonte = time.monotonic() + INTERVALO_HORIZONTE
+        liberados = liberar_abandonados()
+        if liberados:
+            self.stdout.write(f"{liberados} recordatorios abandonados vuelven a la cola.")
+        caducados = caducar_vencidos()
+        if caducados:
+            self.stdout.write(f"{caducados} recordatorios demasiado atrasados no se enviarán.")
+
+        # Se vacía la cola lote a lote antes de dormir
+        while True:
+            enviados, fallidos = procesar_pendientes(lote)
+            if enviados or fallidos:
+                self.stdout.write(f"Enviados: {enviados}, fallidos: {fallidos}")
+            if enviados + fallidos < lote:
+                break
@@ -0,0 +1,137 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import Evento, Perfil, Recordatorio, materializar_avisos
+
+PREFIJO = 'sintetico-'
+CONTRASENA = 'sintetico123'
+
+TITULOS = (
+    'Reunión de equipo', 'Llamada con cliente', 'Revisión de código', 'Almuerzo', 'Dentista',
+    'Clase de inglés', 'Entrenamiento', 'Planificación semanal', 'Cumpleaños', 'Entrega de proyecto',
+    'Cita médica', 'Pago de servicios', 'Demo del producto', 'Viaje', 'Estudio',
+)
+UBICACIONES = ('Oficina', 'Sala 2', 'Casa', 'Zoom', 'Centro', 'Universidad', None, None)
+DESCRIPCIONES = (
+    'Preparar la agenda y los materiales.', 'Confirmar asistencia antes del mediodía.',
+    'Llevar la documentación pendiente.', 'Revisar los puntos abiertos de la semana anterior.', None, None,
+)
+ZONAS = ('America/Managua', 'America/Mexico_City', 'America/Bogota', 'Europe/Madrid', 'UTC')
+# Combinaciones distintas (la unicidad de Recordatorio impide repetirlas en un evento)
+AVISOS = (
+    ('NOTIFICACION_APP', 10, 'MINUTOS'), ('EMAIL', 15, 'MINUTOS'), ('EMAIL', 1, 'HORAS'),
+    ('NOTIFICACION_APP', 1, 'DIAS'), ('EMAIL', 2, 'DIAS'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera usuarios, eventos y recordatorios sintéticos con bulk_create, por lotes, para "
+        f"medir el rendimiento a distintas escalas. Los usuarios se llaman {PREFIJO}<n> y su "
+        f"contraseña es '{CONTRASENA}'."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=100)
+        parser.add_argument('--eventos', type=int, default=100, help="Eventos por usuario.")
+        parser.add_argument('--recordatorios', type=int, default=1,
+                            help=f"Recordatorios por evento (máx. {len(AVISOS)}).")
+        parser.add_argument('--series', type=float, default=0.05,
+                            help="Fracción de eventos que son series recurrentes.")
+        parser.add_argument('--lote', type=int, default=5000, help="Filas por bulk_create.")
+        parser.add_argument('--semilla', type=int, default=1)
+        parser.add_argument('--borrar', action='store_true',
+                            help="Borra los datos sintéticos existentes y termina.")
+
+    def handle(self, *args, **options):
+        if options['borrar']:
+            borrados, _ = User.objects.filter(username__startswith=PREFIJO).delete()
+            self.stdout.write(f"Borradas {borrados} filas.")
+            return
+
+        self.aleatorio = random.Random(options['semilla'])
+        self.lote = options['lote']
+        self.recordatorios = min(options['recordatorios'], len(AVISOS))
+        self.series = options['series']
+        inicio = time.perf_counter()
+
+        usuarios = self._crear_usuarios(options['usuarios'])
+        totales = {'usuarios': len(usuarios), 'eventos': 0, 'recordatorios': 0}
+        pendientes = []
+        for usuario in usuarios:
+            for evento in self._eventos(usuario, options['eventos']):
+                pendientes.append(evento)
+                if len(pendientes) >= self.lote:
+                    self._guardar(pendientes, totales)
+                    pendientes = []
+        self._guardar(pendientes, totales)
+
+        totales['segundos'] = round(time.perf_counter() - inicio, 1)
+        self.stdout.write(", ".join(f"{clave}={valor}" for clave, valor in totales.items()))
+
+    def _crear_usuarios(self, cantidad):
+        existentes = User.objects.filter(username__startswith=PREFIJO).count()
+        # Un solo hash para todos: calcular uno por usuario dominaría el tiempo total
+        contrasena = make_password(CONTRASENA)
+        nuevos = [
+            User(username=f'{PREFIJO}{i}', email=f'{PREFIJO}{i}@example.com', password=contrasena)
+            for i in range(existentes, existentes + cantidad)
+        ]
+        usuarios = User.objects.bulk_create(nuevos, batch_size=self.lote)
+        Perfil.objects.bulk_create(
+            [Perfil(Usuario=usuario, ZonaHoraria=self.aleatorio.choice(ZONAS)) for usuario in usuarios],
+            batch_size=self.lote,
+        )
+        return usuarios
+
+    def _eventos(self, usuario, cantidad):
+        """Genera los eventos de un usuario de uno en uno (se guardan por lotes)."""
+        ahora = timezone.now().replace(minute=0, second=0, microsecond=0)
+        for _ in range(cantidad):
+            # Un año hacia atrás y uno hacia adelante, en horario de 7:00 a 20:00
+            inicio = ahora + timedelta(days=self.aleatorio.randint(-365, 365), hours=self.aleatorio.randint(-6, 6))
+            inicio = inicio.replace(hour=self.aleatorio.randint(7, 20), minute=self.aleatorio.choice((0, 15, 30, 45)))
+            evento = Evento(
+                Usuario=usuario,
+                Titulo=self.aleatorio.choice(TITULOS),
+                Descripcion=self.aleatorio.choice(DESCRIPCIONES),
+                Ubicacion=self.aleatorio.choice(UBICACIONES),
+                FechaInicio=inicio,
+                FechaFin=inicio + timedelta(minutes=self.aleatorio.choice((30, 60, 60, 90, 120, 180))),
+                Estado=self.aleatorio.choices(('ACTIVO', 'CANCELADO', 'FINALIZADO'), (90, 5, 5))[0],
+            )
+            if self.aleatorio.random() < self.series:
+                evento.Frecuencia = self.aleatorio.choice(('DIARIA', 'SEMANAL', 'SEMANAL', 'MENSUAL'))
+                evento.RepetirVeces = self.aleatorio.choice((None, 10, 52))
+            # bulk_create no llama a save(): FinSerie y Extenso se calculan a mano
+            evento.preparar_recurrencia()
+            yield evento
+
+    def _guardar(self, eventos, totales):
+        if not eventos:
+            return
+        with transaction.atomic():
+            eventos = Evento.objects.bulk_create(eventos, batch_size=self.lote)
+            ahora = timezone.now()
+            recordatorios = []
+            for evento in eventos:
+                for tipo, tiempo, unidad in self.aleatorio.sample(AVISOS, self.recordatorios):
+                    recordatorio = Recordatorio(Evento=evento, TipoAviso=tipo, TiempoAntes=tiempo, UnidadTiempo=unidad)
+                    recordatorio.FechaEnviado = recordatorio.calcular_fecha_envio(evento.FechaInicio)
+                    # Los vencidos ya se habrían enviado: si quedaran PENDIENTES, el worker
+                    # los tomaría como atrasados al arrancar sobre estos datos
+                    if recordatorio.FechaEnviado <= ahora:
+                        recordatorio.Estado = 'ENVIADO'
+                    recordatorios.append(recordatorio)
+            Recordatorio.objects.bulk_create(recordatorios, batch_size=self.lote)
+            materializar_avisos([recordatorio.pk for recordatorio in recordatorios if recordatorio.Estado == 'PENDIENTE'])
+        totales['eventos'] += len(eventos)
+        totales['recordatorios'] += len(recordatorios)
+        self.stderr.write(f"{totales['eventos']} eventos...")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from api.avisos import extender_horizonte, podar_avisos
+
+
+class Command(BaseCommand):
+    help = (
+        "Corre el horizonte de la tabla de avisos próximos: agrega los recordatorios pendientes "
+        "que entraron en él y poda los avisos vencidos que nadie despachó. Ejecutar a diario (cron)."
+    )
+
+    def handle(self, *args, **options):
+        podados = podar_avisos()
+        agregados = extender_horizonte()
+        self.stdout.write(f"Avisos agregados: {agregados}, podados: {podados}")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.sync import purgar_eliminaciones
+
+
+class Command(BaseCommand):
+    help = "Borra las lápidas de sincronización más antiguas que el periodo de retención."
+
+    def handle(self, *args, **options):
+        borradas = purgar_eliminaciones()
+        self.stdout.write(f"Lápidas eliminadas: {borradas}")
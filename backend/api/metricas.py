@@ -0,0 +1,238 @@
+"""
+Instrumentación de peticiones: tiempo por vista, consultas SQL (cantidad y tiempo),
+tiempo de renderizado de la respuesta y tamaño.
+
+- Cada respuesta lleva una cabecera Server-Timing (visible en las DevTools del navegador).
+- /api/metrics/ expone los acumulados en formato de texto de Prometheus. Son por proceso:
+  con varios workers, Prometheus debe consultar cada uno (o sumar por instancia).
+- Si una misma consulta (misma forma, distintos parámetros) se repite muchas veces en una
+  petición se registra un aviso de posible N+1 en el log 'api.metricas'.
+
+Se activa con settings.METRICAS_ACTIVAS. Desactivado, el middleware se retira de la
+cadena al arrancar (MiddlewareNotUsed) y no añade ningún coste. Bajo ASGI el middleware
+corre en modo asíncrono y cuenta también las consultas del ORM asíncrono (api/async/...).
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import HttpResponse, HttpResponseNotFound
+
+logger = logging.getLogger(__name__)
+
+# Límites (segundos) del histograma de duración de las peticiones
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_LISTA_PARAMETROS = re.compile(r'\((?:%s, )+%s\)')
+_NUMERO = re.compile(r'\b\d+\b')
+
+
+def forma_sql(sql):
+    """Normaliza una consulta para agrupar las que solo difieren en parámetros o en el largo de un IN."""
+    return _NUMERO.sub('N', _LISTA_PARAMETROS.sub('(%s)', sql))
+
+
+def _valor(numero):
+    return f'{numero:.6f}' if isinstance(numero, float) else str(numero)
+
+
+class Registro:
+    """Acumulados por vista, protegidos con un lock (los workers pueden tener varios hilos)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.peticiones = Counter()
+        self.duracion = defaultdict(lambda: [0] * (len(BUCKETS) + 1))
+        self.sumas = defaultdict(Counter)
+
+    def registrar(self, vista, metodo, estado, segundos, consultas, segundos_sql, segundos_render, tamano):
+        with self._lock:
+            self.peticiones[(vista, metodo, estado)] += 1
+            cubetas = self.duracion[vista]
+            for i, limite in enumerate(BUCKETS):
+                if segundos <= limite:
+                    cubetas[i] += 1
+                    break
+            else:
+                cubetas[-1] += 1
+            sumas = self.sumas[vista]
+            sumas['segundos'] += segundos
+            sumas['consultas'] += consultas
+            sumas['segundos_sql'] += segundos_sql
+            sumas['segundos_render'] += segundos_render
+            sumas['bytes'] += tamano or 0
+
+    def limpiar(self):
+        with self._lock:
+            self.peticiones.clear()
+            self.duracion.clear()
+            self.sumas.clear()
+
+    def prometheus(self):
+        """Texto en el formato de exposición de Prometheus (versión 0.0.4)."""
+        with self._lock:
+            lineas = [
+                '# HELP calender_http_requests_total Peticiones atendidas.',
+                '# TYPE calender_http_requests_total counter',
+            ]
+            for (vista, metodo, estado), total in sorted(self.peticiones.items()):
+                lineas.append(
+                    f'calender_http_requests_total{{vista="{vista}",metodo="{metodo}",estado="{estado}"}} {total}'
+                )
+
+            lineas += [
+                '# HELP calender_http_request_duration_seconds Duración de las peticiones.',
+                '# TYPE calender_http_request_duration_seconds histogram',
+            ]
+            for vista, cubetas in sorted(self.duracion.items()):
+                acumulado = 0
+                for limite, cantidad in zip(BUCKETS + ('+Inf',), cubetas):
+                    acumulado += cantidad
+                    lineas.append(
+                        f'calender_http_request_duration_seconds_bucket{{vista="{vista}",le="{limite}"}} {acumulado}'
+                    )
+                lineas.append(f'calender_http_request_duration_seconds_sum{{vista="{vista}"}} {self.sumas[vista]["segundos"]:.6f}')
+                lineas.append(f'calender_http_request_duration_seconds_count{{vista="{vista}"}} {acumulado}')
+
+            for clave, nombre, ayuda in (
+                ('consultas', 'calender_db_queries_total', 'Consultas SQL ejecutadas.'),
+                ('segundos_sql', 'calender_db_query_duration_seconds_total', 'Tiempo en consultas SQL.'),
+                ('segundos_render', 'calender_render_duration_seconds_total', 'Tiempo renderizando respuestas.'),
+                ('bytes', 'calender_http_response_bytes_total', 'Bytes de respuesta (sin contar streaming).'),
+            ):
+                lineas += [f'# HELP {nombre} {ayuda}', f'# TYPE {nombre} counter']
+                for vista, sumas in sorted(self.sumas.items()):
+                    lineas.append(f'{nombre}{{vista="{vista}"}} {_valor(sumas[clave])}')
+            return '\n'.join(lineas) + '\n'
+
+
+registro = Registro()
+
+
+class _Consultas:
+    """execute_wrapper que cuenta y cronometra las consultas de la petición."""
+
+    def __init__(self):
+        self.cantidad = 0
+        self.segundos = 0.0
+        self.formas = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.segundos += time.perf_counter() - inicio
+            self.cantidad += 1
+            self.formas[sql] += 1
+
+
+def _instalar(consultas):
+    connection.execute_wrappers.append(consultas)
+
+
+def _retirar(consultas):
+    connection.execute_wrappers.remove(consultas)
+
+
+class MetricasMiddleware:
+    """
+    Va primero en MIDDLEWARE para medir la petición completa.
+    El tiempo de renderizado es el de SimpleTemplateResponse.render() (la codificación
+    JSON de las respuestas de DRF), que Django ejecuta después de la vista.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICAS_ACTIVAS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.umbral_n_mas_1 = getattr(settings, 'METRICAS_UMBRAL_N_MAS_1', 5)
+        self.asincrono = iscoroutinefunction(get_response)
+        if self.asincrono:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.asincrono:
+            return self.__acall__(request)
+        inicio = time.perf_counter()
+        consultas = _Consultas()
+        request._metricas_render = 0.0
+        with connection.execute_wrapper(consultas):
+            response = self.get_response(request)
+        return self._registrar(request, response, inicio, consultas)
+
+    async def __acall__(self, request):
+        inicio = time.perf_counter()
+        consultas = _Consultas()
+        request._metricas_render = 0.0
+        # Las conexiones son por hilo y el ORM (también el asíncrono) corre en el hilo de
+        # sync_to_async de la petición: el wrapper se instala en esa conexión, no en la del loop
+        await sync_to_async(_instalar)(consultas)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(_retirar)(consultas)
+        return self._registrar(request, response, inicio, consultas)
+
+    def _registrar(self, request, response, inicio, consultas):
+        segundos = time.perf_counter() - inicio
+
+        coincidencia = getattr(request, 'resolver_match', None)
+        vista = (coincidencia.view_name if coincidencia else None) or 'sin_ruta'
+        tamano = None if response.streaming else len(response.content)
+        registro.registrar(
+            vista, request.method, response.status_code, segundos,
+            consultas.cantidad, consultas.segundos, request._metricas_render, tamano,
+        )
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={consultas.segundos * 1000:.2f};desc="{consultas.cantidad} consultas"',
+            f'render;dur={request._metricas_render * 1000:.2f}',
+            f'total;dur={segundos * 1000:.2f}',
+        ))
+        self._detectar_n_mas_1(vista, consultas)
+        return response
+
+    def process_template_response(self, request, response):
+        # Django renderiza justo después de este hook; el callback marca el final
+        inicio = time.perf_counter()
+
+        def fin(_response):
+            request._metricas_render += time.perf_counter() - inicio
+
+        response.add_post_render_callback(fin)
+        return response
+
+    def _detectar_n_mas_1(self, vista, consultas):
+        if consultas.cantidad < self.umbral_n_mas_1:
+            return
+        formas = Counter()
+        for sql, veces in consultas.formas.items():
+            formas[forma_sql(sql)] += veces
+        sql, veces = formas.most_common(1)[0]
+        if veces >= self.umbral_n_mas_1:
+            logger.warning("Posible N+1 en %s: %d consultas con la misma forma: %s", vista, veces, sql[:300])
+
+
+def metrics(request):
+    """
+    Acumulados en formato Prometheus. Si settings.METRICAS_TOKEN está definido se exige
+    la cabecera `Authorization: Bearer <token>`; si no, solo los ve un usuario staff con
+    sesión iniciada (los nombres de vista y los tiempos no son públicos).
+    """
+    if not getattr(settings, 'METRICAS_ACTIVAS', False):
+        return HttpResponseNotFound()
+    token = getattr(settings, 'METRICAS_TOKEN', None)
+    if token:
+        if request.headers.get('Authorization') != f'Bearer {token}':
+            return HttpResponse(status=401)
+    elif not request.user.is_staff:
+        return HttpResponse(status=403)
+    return HttpResponse(registro.prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
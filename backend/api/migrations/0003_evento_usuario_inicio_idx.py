@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_alter_evento_usuario_delete_usuario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['Usuario', 'FechaInicio'], name='evento_usuario_inicio_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_evento_usuario_inicio_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evento',
+            name='Excepciones',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='evento',
+            name='FinSerie',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='evento',
+            name='Frecuencia',
+            field=models.CharField(blank=True, choices=[('DIARIA', 'Diaria'), ('SEMANAL', 'Semanal'), ('MENSUAL', 'Mensual'), ('ANUAL', 'Anual')], max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='evento',
+            name='Intervalo',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='evento',
+            name='RepetirHasta',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='evento',
+            name='RepetirVeces',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_evento_recurrencia'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notificacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('Mensaje', models.CharField(max_length=500)),
+                ('Leida', models.BooleanField(default=False)),
+                ('CreadaEn', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Notificación',
+                'verbose_name_plural': 'Notificaciones',
+                'ordering': ['-CreadaEn'],
+            },
+        ),
+        migrations.AddField(
+            model_name='recordatorio',
+            name='ReclamadoEn',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='recordatorio',
+            name='Estado',
+            field=models.CharField(choices=[('PENDIENTE', 'Pendiente de Envío'), ('PROCESANDO', 'Reclamado por un worker'), ('ENVIADO', 'Enviado Exitosamente'), ('FALLIDO', 'Fallo en el Envío')], default='PENDIENTE', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='recordatorio',
+            index=models.Index(fields=['Estado', 'FechaEnviado'], name='recordatorio_cola_idx'),
+        ),
+        migrations.AddField(
+            model_name='notificacion',
+            name='Recordatorio',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notificaciones', to='api.recordatorio'),
+        ),
+        migrations.AddField(
+            model_name='notificacion',
+            name='Usuario',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notificaciones', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='notificacion',
+            index=models.Index(fields=['Usuario', 'Leida', 'CreadaEn'], name='notificacion_usuario_idx'),
+        ),
+    ]
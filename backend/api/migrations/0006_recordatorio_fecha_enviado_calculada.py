@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_recordatorio_cola_notificacion'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recordatorio',
+            name='FechaEnviado',
+            field=models.DateTimeField(blank=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_recordatorio_fecha_enviado_calculada'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recordatorio',
+            name='ActualizadoEn',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['Usuario', 'ActualizadoEn'], name='evento_usuario_actualizado_idx'),
+        ),
+    ]
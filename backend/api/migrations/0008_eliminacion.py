@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_versiones_listados'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Eliminacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('Modelo', models.CharField(choices=[('EVENTO', 'Evento'), ('RECORDATORIO', 'Recordatorio')], max_length=20)),
+                ('ObjetoId', models.BigIntegerField()),
+                ('EliminadoEn', models.DateTimeField(auto_now_add=True)),
+                ('Usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eliminaciones', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Eliminación',
+                'verbose_name_plural': 'Eliminaciones',
+                'ordering': ['EliminadoEn'],
+                'indexes': [models.Index(fields=['Usuario', 'EliminadoEn'], name='eliminacion_usuario_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Índices sobre LOWER(auth_user.email) para el login por correo (api.auth_backend.EmailBackend).
+
+    - auth_user_email_lower_uniq: impide registrar dos cuentas con el mismo correo (sin
+      distinguir mayúsculas). Es parcial para tolerar usuarios sin correo (ej: createsuperuser).
+    - auth_user_email_lower_idx: la búsqueda del login (WHERE LOWER(email) = ...); el índice
+      parcial no sirve para esa consulta porque no incluye la condición email <> ''.
+
+    Si ya existen correos duplicados la migración falla y hay que resolverlos antes.
+    """
+
+    dependencies = [
+        ('api', '0008_eliminacion'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="CREATE UNIQUE INDEX auth_user_email_lower_uniq ON auth_user (LOWER(email)) WHERE email <> '';",
+            reverse_sql="DROP INDEX auth_user_email_lower_uniq;",
+        ),
+        migrations.RunSQL(
+            sql="CREATE INDEX auth_user_email_lower_idx ON auth_user (LOWER(email));",
+            reverse_sql="DROP INDEX auth_user_email_lower_idx;",
+        ),
+    ]
@@ -0,0 +1,98 @@
+from django.db import migrations
+
+# --- SQLite: tabla FTS5 de contenido externo (no duplica el texto) mantenida por triggers ---
+# Las migraciones que rehacen api_evento en SQLite (p. ej. AddField de una columna NOT NULL)
+# borran los triggers y deben volver a crearlos con SQLITE_TRIGGERS (ver 0014). Si alguna
+# lo olvida, el check api.E001 (api.busqueda.comprobar_triggers) avisa al migrar.
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER api_evento_fts_ai AFTER INSERT ON api_evento BEGIN
+        INSERT INTO api_evento_fts(rowid, Titulo, Descripcion, Ubicacion)
+        VALUES (new.id, new.Titulo, new.Descripcion, new.Ubicacion);
+    END
+    """,
+    """
+    CREATE TRIGGER api_evento_fts_ad AFTER DELETE ON api_evento BEGIN
+        INSERT INTO api_evento_fts(api_evento_fts, rowid, Titulo, Descripcion, Ubicacion)
+        VALUES ('delete', old.id, old.Titulo, old.Descripcion, old.Ubicacion);
+    END
+    """,
+    """
+    CREATE TRIGGER api_evento_fts_au AFTER UPDATE OF Titulo, Descripcion, Ubicacion ON api_evento BEGIN
+        INSERT INTO api_evento_fts(api_evento_fts, rowid, Titulo, Descripcion, Ubicacion)
+        VALUES ('delete', old.id, old.Titulo, old.Descripcion, old.Ubicacion);
+        INSERT INTO api_evento_fts(rowid, Titulo, Descripcion, Ubicacion)
+        VALUES (new.id, new.Titulo, new.Descripcion, new.Ubicacion);
+    END
+    """,
+]
+SQLITE_CREAR = [
+    """
+    CREATE VIRTUAL TABLE api_evento_fts USING fts5(
+        Titulo, Descripcion, Ubicacion,
+        content='api_evento', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    *SQLITE_TRIGGERS,
+    # Indexa los eventos que ya existían
+    "INSERT INTO api_evento_fts(api_evento_fts) VALUES ('rebuild')",
+]
+SQLITE_BORRAR = [
+    "DROP TRIGGER IF EXISTS api_evento_fts_ai",
+    "DROP TRIGGER IF EXISTS api_evento_fts_ad",
+    "DROP TRIGGER IF EXISTS api_evento_fts_au",
+    "DROP TABLE IF EXISTS api_evento_fts",
+]
+
+# --- PostgreSQL: columna tsvector generada (se mantiene sola) con índice GIN ---
+POSTGRES_CREAR = [
+    """
+    ALTER TABLE api_evento ADD COLUMN busqueda tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce("Titulo", '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce("Ubicacion", '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce("Descripcion", '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX evento_busqueda_idx ON api_evento USING GIN (busqueda)",
+]
+POSTGRES_BORRAR = [
+    "DROP INDEX IF EXISTS evento_busqueda_idx",
+    "ALTER TABLE api_evento DROP COLUMN IF EXISTS busqueda",
+]
+
+SENTENCIAS = {
+    'sqlite': (SQLITE_CREAR, SQLITE_BORRAR),
+    'postgresql': (POSTGRES_CREAR, POSTGRES_BORRAR),
+}
+
+
+def _ejecutar(schema_editor, indice):
+    # Otros motores no tienen índice de texto: api.busqueda usa LIKE como respaldo
+    sentencias = SENTENCIAS.get(schema_editor.connection.vendor)
+    for sql in sentencias[indice] if sentencias else ():
+        schema_editor.execute(sql)
+
+
+def crear(apps, schema_editor):
+    _ejecutar(schema_editor, 0)
+
+
+def borrar(apps, schema_editor):
+    _ejecutar(schema_editor, 1)
+
+
+class Migration(migrations.Migration):
+    """
+    Índice de texto completo sobre Titulo, Descripcion y Ubicacion de los eventos
+    (ver api.busqueda). Depende del motor, así que no está descrito en el modelo.
+    """
+
+    dependencies = [
+        ('api', '0011_perfil'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear, borrar),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:39
+
+import django.db.models.deletion
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+# Copia de api.models.HORIZONTE_AVISOS al crear la tabla
+HORIZONTE = timedelta(days=30)
+
+
+def materializar_pendientes(apps, schema_editor):
+    Recordatorio = apps.get_model('api', 'Recordatorio')
+    AvisoProximo = apps.get_model('api', 'AvisoProximo')
+    pendientes = Recordatorio.objects.filter(
+        Estado='PENDIENTE', FechaEnviado__lte=timezone.now() + HORIZONTE
+    ).values_list('id', 'Evento__Usuario_id', 'Evento_id', 'FechaEnviado', 'TipoAviso', 'Evento__Titulo', 'Evento__FechaInicio')
+    AvisoProximo.objects.bulk_create(
+        (
+            AvisoProximo(
+                Recordatorio_id=pk, Usuario_id=usuario_id, Evento_id=evento_id, FechaEnviado=fecha_enviado,
+                TipoAviso=tipo, Titulo=titulo, FechaInicio=fecha_inicio,
+            )
+            for pk, usuario_id, evento_id, fecha_enviado, tipo, titulo, fecha_inicio in pendientes.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_evento_busqueda'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvisoProximo',
+            fields=[
+                ('Recordatorio', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='aviso_proximo', serialize=False, to='api.recordatorio')),
+                ('FechaEnviado', models.DateTimeField()),
+                ('TipoAviso', models.CharField(choices=[('EMAIL', 'Correo Electrónico'), ('NOTIFICACION_APP', 'Notificación en la Aplicación')], max_length=50)),
+                ('Titulo', models.CharField(max_length=255)),
+                ('FechaInicio', models.DateTimeField()),
+                ('Evento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='avisos_proximos', to='api.evento')),
+                ('Usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='avisos_proximos', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Aviso próximo',
+                'verbose_name_plural': 'Avisos próximos',
+                'ordering': ['FechaEnviado'],
+                'indexes': [models.Index(fields=['Usuario', 'FechaEnviado'], name='aviso_usuario_fecha_idx'), models.Index(fields=['FechaEnviado'], name='aviso_fecha_idx')],
+            },
+        ),
+        migrations.RunPython(materializar_pendientes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:49
+
+from django.conf import settings
+from datetime import timedelta
+from importlib import import_module
+
+from django.db import migrations, models
+from django.db.models import F, Q
+
+# Copia de api.models.DURACION_CORTA al crear el campo
+DURACION_CORTA = timedelta(days=1)
+
+
+def marcar_extensos(apps, schema_editor):
+    Evento = apps.get_model('api', 'Evento')
+    Evento.objects.filter(
+        Q(Frecuencia__isnull=False) | Q(FechaFin__gt=F('FechaInicio') + DURACION_CORTA)
+    ).update(Extenso=True)
+
+
+def restaurar_triggers_busqueda(apps, schema_editor):
+    # En SQLite AddField rehace api_evento y se pierden los triggers FTS5 de la 0012
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in import_module('api.migrations.0012_evento_busqueda').SQLITE_TRIGGERS:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_aviso_proximo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='evento',
+            name='Extenso',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='evento',
+            index=models.Index(fields=['Usuario', 'Extenso', 'FechaInicio'], name='evento_usuario_extenso_idx'),
+        ),
+        migrations.RunPython(restaurar_triggers_busqueda, migrations.RunPython.noop),
+        migrations.RunPython(marcar_extensos, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,9 @@
-from django.db import models
+from datetime import timedelta
+
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
+from .recurrence import expandir, fin_de_serie
 
 # --- Opciones para campos con valores fijos (ENUM) ---
 
@@ -20,12 +24,34 @@ ESTADO_CHOICES = (
     ('FINALIZADO', 'Finalizado'),
 )
 
+FRECUENCIA_CHOICES = (
+    ('DIARIA', 'Diaria'),
+    ('SEMANAL', 'Semanal'),
+    ('MENSUAL', 'Mensual'),
+    ('ANUAL', 'Anual'),
+)
+
 ESTADO_RECORDATORIO_CHOICES = (
     ('PENDIENTE', 'Pendiente de Envío'),
+    ('PROCESANDO', 'Reclamado por un worker'),
     ('ENVIADO', 'Enviado Exitosamente'),
     ('FALLIDO', 'Fallo en el Envío'),
 )
 
+UNIDAD_TIEMPO_DELTA = {
+    'MINUTOS': timedelta(minutes=1),
+    'HORAS': timedelta(hours=1),
+    'DIAS': timedelta(days=1),
+}
+
+# Los eventos que duran más que esto (y las series) se marcan Extenso: así los demás se
+# buscan por ventana con un rango acotado de FechaInicio (ver disponibilidad.filtrar_por_ventana)
+DURACION_CORTA = timedelta(days=1)
+
+# Los recordatorios PENDIENTES que vencen antes de ahora + HORIZONTE_AVISOS se copian a
+# AvisoProximo; el comando materializar_avisos va corriendo el horizonte.
+HORIZONTE_AVISOS = timedelta(days=30)
+
 # -----------------------------------------------------------
 
 # class Usuario(models.Model):
@@ -55,9 +81,33 @@ ESTADO_RECORDATORIO_CHOICES = (
 
 # -----------------------------------------------------------
 
+class Perfil(models.Model):
+    """
+    Datos del usuario que no están en auth.User (recupera la ZonaHoraria del modelo
+    Usuario de arriba). Un usuario sin perfil usa la zona por defecto (settings.TIME_ZONE).
+    """
+    Usuario = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='perfil'
+    )
+    # Nombre IANA, ej: 'America/Managua'. Viaja en el token (claim 'tz') para las lecturas.
+    ZonaHoraria = models.CharField(max_length=50, default='UTC')
+
+    class Meta:
+        verbose_name = "Perfil"
+        verbose_name_plural = "Perfiles"
+
+    def __str__(self):
+        return f"{self.Usuario} ({self.ZonaHoraria})"
+
+# -----------------------------------------------------------
+
 class Evento(models.Model):
     """
-    Representa un evento o cita único (no repetitivo) creado por un usuario.
+    Representa un evento o cita creado por un usuario.
+    Si tiene Frecuencia, la fila es una serie recurrente (estilo RRULE) y sus
+    ocurrencias se generan bajo demanda con api.recurrence.expandir().
     """
     # EventoID (PK) - Automático
     
@@ -75,6 +125,17 @@ class Evento(models.Model):
     Color = models.CharField(max_length=10, null=True, blank=True) # Ej: #FF5733
     Estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='ACTIVO')
     Ubicacion = models.CharField(max_length=255, null=True, blank=True)
+
+    # Recurrencia: FREQ / INTERVAL / UNTIL / COUNT / EXDATE
+    Frecuencia = models.CharField(max_length=10, choices=FRECUENCIA_CHOICES, null=True, blank=True)
+    Intervalo = models.PositiveIntegerField(default=1)
+    RepetirHasta = models.DateTimeField(null=True, blank=True)
+    RepetirVeces = models.PositiveIntegerField(null=True, blank=True)
+    Excepciones = models.JSONField(default=list, blank=True) # Inicios de ocurrencias omitidas (ISO 8601)
+    # FinSerie: cota del fin de la última ocurrencia (null = la serie no termina). Se calcula al guardar.
+    FinSerie = models.DateTimeField(null=True, blank=True, editable=False)
+    # Extenso: serie o evento de más de DURACION_CORTA. Se calcula al guardar.
+    Extenso = models.BooleanField(default=False, editable=False)
     
     # CreadoEn / ActualizadoEn
     CreadoEn = models.DateTimeField(auto_now_add=True)
@@ -84,6 +145,69 @@ class Evento(models.Model):
         verbose_name = "Evento"
         verbose_name_plural = "Eventos"
         ordering = ['FechaInicio']
+        indexes = [
+            # Las vistas de mes/día consultan siempre por usuario y rango de fechas
+            models.Index(fields=['Usuario', 'FechaInicio'], name='evento_usuario_inicio_idx'),
+            # Ventanas: los eventos extensos (pocos por usuario) se buscan aparte
+            models.Index(fields=['Usuario', 'Extenso', 'FechaInicio'], name='evento_usuario_extenso_idx'),
+            # Versión del listado (MAX(ActualizadoEn)) para las peticiones condicionales
+            models.Index(fields=['Usuario', 'ActualizadoEn'], name='evento_usuario_actualizado_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Guardamos la FechaInicio cargada para detectar reprogramaciones al guardar
+        instance._fecha_inicio_original = instance.__dict__.get('FechaInicio')
+        return instance
+
+    @property
+    def es_recurrente(self):
+        return bool(self.Frecuencia)
+
+    def save(self, *args, **kwargs):
+        creado = self.pk is None
+        reprogramado = (
+            self.pk is not None
+            and getattr(self, '_fecha_inicio_original', self.FechaInicio) != self.FechaInicio
+        )
+        self._guardar(*args, **kwargs)
+        self._fecha_inicio_original = self.FechaInicio
+        if reprogramado:
+            recalcular_fechas_envio([self])
+        elif not creado:
+            # La copia del título en los avisos próximos (FechaInicio no cambió)
+            AvisoProximo.objects.filter(Evento_id=self.pk).update(Titulo=self.Titulo)
+
+    def _guardar(self, *args, **kwargs):
+        self.preparar_recurrencia()
+        super().save(*args, **kwargs)
+
+    def preparar_recurrencia(self):
+        """
+        Normaliza Frecuencia y calcula FinSerie y Extenso. save() lo llama siempre; las
+        escrituras masivas (bulk_create/bulk_update) deben llamarlo a mano.
+        """
+        self.Frecuencia = self.Frecuencia or None
+        if self.es_recurrente:
+            self.FinSerie = fin_de_serie(
+                self.FechaInicio, self.FechaFin, self.Frecuencia,
+                self.Intervalo, self.RepetirHasta, self.RepetirVeces,
+            )
+        else:
+            self.FinSerie = None
+        self.Extenso = self.es_recurrente or (
+            self.FechaFin is not None and self.FechaFin - self.FechaInicio > DURACION_CORTA
+        )
+
+    def ocurrencias(self, inicio, fin):
+        """Ocurrencias (inicio, fin) de este evento que se solapan con [inicio, fin)."""
+        if not self.es_recurrente:
+            return iter([(self.FechaInicio, self.FechaFin)])
+        return expandir(
+            self.FechaInicio, self.FechaFin, self.Frecuencia, self.Intervalo,
+            self.RepetirHasta, self.RepetirVeces, self.Excepciones, inicio, fin,
+        )
 
     def __str__(self):
         return f"{self.Titulo} ({self.FechaInicio.strftime('%Y-%m-%d')})"
@@ -111,8 +235,15 @@ class Recordatorio(models.Model):
     # Estado: Indica si ya fue procesado el envío
     Estado = models.CharField(max_length=20, choices=ESTADO_RECORDATORIO_CHOICES, default='PENDIENTE')
     
-    # FechaEnviado: La fecha y hora exacta en que el sistema DEBE enviar el aviso (programación)
-    FechaEnviado = models.DateTimeField()
+    # FechaEnviado: La fecha y hora exacta en que el sistema DEBE enviar el aviso (programación).
+    # Se calcula al guardar a partir de Evento.FechaInicio, TiempoAntes y UnidadTiempo.
+    FechaEnviado = models.DateTimeField(blank=True)
+
+    # ReclamadoEn: momento en que un worker reclamó el aviso (sirve también como marca del lote)
+    ReclamadoEn = models.DateTimeField(null=True, blank=True, editable=False)
+
+    # ActualizadoEn: las escrituras con .update()/bulk_update deben asignarlo a mano
+    ActualizadoEn = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Recordatorio"
@@ -120,6 +251,193 @@ class Recordatorio(models.Model):
         # Asegura que no se creen múltiples recordatorios iguales (ej: email 15 min antes) para el mismo evento
         unique_together = ('Evento', 'TipoAviso', 'TiempoAntes', 'UnidadTiempo')
         ordering = ['FechaEnviado']
+        indexes = [
+            # Cola de envío: el worker busca Estado='PENDIENTE' AND FechaEnviado <= ahora
+            models.Index(fields=['Estado', 'FechaEnviado'], name='recordatorio_cola_idx'),
+        ]
+
+    def calcular_fecha_envio(self, fecha_inicio=None):
+        if fecha_inicio is None:
+            fecha_inicio = self.Evento.FechaInicio
+        return fecha_inicio - self.TiempoAntes * UNIDAD_TIEMPO_DELTA[self.UnidadTiempo]
+
+    def save(self, *args, **kwargs):
+        self.FechaEnviado = self.calcular_fecha_envio()
+        super().save(*args, **kwargs)
+        materializar_avisos([self.pk])
+
+    def __str__(self):
+        return f"Aviso de {self.Evento.Titulo} - Programado para: {self.FechaEnviado}"
+
+
+def recalcular_fechas_envio(eventos):
+    """
+    Recalcula FechaEnviado de todos los recordatorios de `eventos` con una sola
+    consulta de lectura y un único bulk_update, en vez de un save() por fila.
+    Los avisos ya procesados cuya nueva fecha queda en el futuro vuelven a PENDIENTE.
+    """
+    inicios = {evento.pk: evento.FechaInicio for evento in eventos}
+    if not inicios:
+        return 0
+    ahora = timezone.now()
+    recordatorios = list(
+        Recordatorio.objects.filter(Evento_id__in=inicios)
+        .only('id', 'Evento_id', 'TiempoAntes', 'UnidadTiempo', 'Estado', 'ActualizadoEn')
+    )
+    for recordatorio in recordatorios:
+        recordatorio.FechaEnviado = recordatorio.calcular_fecha_envio(inicios[recordatorio.Evento_id])
+        if recordatorio.Estado in ('ENVIADO', 'FALLIDO') and recordatorio.FechaEnviado > ahora:
+            recordatorio.Estado = 'PENDIENTE'
+        recordatorio.ActualizadoEn = ahora
+    Recordatorio.objects.bulk_update(recordatorios, ['FechaEnviado', 'Estado', 'ActualizadoEn'], batch_size=500)
+    materializar_avisos([recordatorio.pk for recordatorio in recordatorios])
+    return len(recordatorios)
+
+# -----------------------------------------------------------
+
+class AvisoProximo(models.Model):
+    """
+    Copia desnormalizada de un Recordatorio PENDIENTE que vence antes del horizonte
+    (HORIZONTE_AVISOS), con el usuario, el título y el inicio del evento copiados.
+    Los avisos próximos de un usuario y la cola del despachador se leen con un rango
+    sobre un índice de esta tabla, sin joins con Evento ni con User.
+
+    Se mantiene en cada escritura con materializar_avisos(): Recordatorio.save() y
+    recalcular_fechas_envio() lo hacen solos; las escrituras masivas deben llamarlo a mano.
+    Al reclamar un aviso el despachador borra su fila.
+    """
+    Recordatorio = models.OneToOneField(
+        Recordatorio,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='aviso_proximo'
+    )
+    Usuario = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='avisos_proximos'
+    )
+    Evento = models.ForeignKey(
+        Evento,
+        on_delete=models.CASCADE,
+        related_name='avisos_proximos'
+    )
+    FechaEnviado = models.DateTimeField()
+    TipoAviso = models.CharField(max_length=50, choices=TIPO_AVISO_CHOICES)
+    # Copias de Evento (se actualizan al guardar el evento)
+    Titulo = models.CharField(max_length=255)
+    FechaInicio = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Aviso próximo"
+        verbose_name_plural = "Avisos próximos"
+        ordering = ['FechaEnviado']
+        indexes = [
+            # Avisos próximos de un usuario: Usuario = x AND FechaEnviado >= ahora
+            models.Index(fields=['Usuario', 'FechaEnviado'], name='aviso_usuario_fecha_idx'),
+            # Cola del despachador: FechaEnviado <= ahora
+            models.Index(fields=['FechaEnviado'], name='aviso_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.Titulo} - {self.TipoAviso} el {self.FechaEnviado}"
+
+
+def materializar_avisos(recordatorio_ids, ahora=None):
+    """
+    Rehace las filas de AvisoProximo de esos recordatorios a partir del estado actual:
+    una lectura con join, un DELETE y un bulk_create. Los que dejaron de estar
+    PENDIENTES o vencen después del horizonte quedan sin fila.
+    """
+    ids = list(recordatorio_ids)
+    if not ids:
+        return 0
+    ahora = ahora or timezone.now()
+    filas = Recordatorio.objects.filter(
+        id__in=ids, Estado='PENDIENTE', FechaEnviado__lte=ahora + HORIZONTE_AVISOS
+    ).values_list('id', 'Evento__Usuario_id', 'Evento_id', 'FechaEnviado', 'TipoAviso', 'Evento__Titulo', 'Evento__FechaInicio')
+    avisos = [
+        AvisoProximo(
+            Recordatorio_id=pk, Usuario_id=usuario_id, Evento_id=evento_id, FechaEnviado=fecha_enviado,
+            TipoAviso=tipo, Titulo=titulo, FechaInicio=fecha_inicio,
+        )
+        for pk, usuario_id, evento_id, fecha_enviado, tipo, titulo, fecha_inicio in filas
+    ]
+    with transaction.atomic():
+        AvisoProximo.objects.filter(Recordatorio_id__in=ids).delete()
+        # ignore_conflicts: otra escritura concurrente pudo materializar la misma fila
+        AvisoProximo.objects.bulk_create(avisos, batch_size=500, ignore_conflicts=True)
+    return len(avisos)
+
+
+def materializar_avisos_de_eventos(evento_ids, ahora=None):
+    """materializar_avisos() para todos los recordatorios de esos eventos."""
+    return materializar_avisos(
+        Recordatorio.objects.filter(Evento_id__in=evento_ids).values_list('id', flat=True), ahora
+    )
+
+# -----------------------------------------------------------
+
+class Notificacion(models.Model):
+    """
+    Aviso dentro de la aplicación generado al despachar un Recordatorio de tipo NOTIFICACION_APP.
+    """
+    Usuario = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notificaciones'
+    )
+    Recordatorio = models.ForeignKey(
+        Recordatorio,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='notificaciones'
+    )
+    Mensaje = models.CharField(max_length=500)
+    Leida = models.BooleanField(default=False)
+    CreadaEn = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Notificación"
+        verbose_name_plural = "Notificaciones"
+        ordering = ['-CreadaEn']
+        indexes = [
+            models.Index(fields=['Usuario', 'Leida', 'CreadaEn'], name='notificacion_usuario_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.Usuario} - {self.Mensaje}"
+
+# -----------------------------------------------------------
+
+MODELO_ELIMINADO_CHOICES = (
+    ('EVENTO', 'Evento'),
+    ('RECORDATORIO', 'Recordatorio'),
+)
+
+
+class Eliminacion(models.Model):
+    """
+    Lápida (tombstone) de un Evento o Recordatorio borrado, para que la sincronización
+    incremental pueda informar las eliminaciones. Se crea desde api.signals.
+    """
+    Usuario = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='eliminaciones'
+    )
+    Modelo = models.CharField(max_length=20, choices=MODELO_ELIMINADO_CHOICES)
+    ObjetoId = models.BigIntegerField()
+    EliminadoEn = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Eliminación"
+        verbose_name_plural = "Eliminaciones"
+        ordering = ['EliminadoEn']
+        indexes = [
+            models.Index(fields=['Usuario', 'EliminadoEn'], name='eliminacion_usuario_idx'),
+        ]
 
     def __str__(self):
-        return f"Aviso de {self.Evento.Titulo} - Programado para: {self.FechaEnviado}"
\ No newline at end of file
+        return f"{self.Modelo} {self.ObjetoId} eliminado el {self.EliminadoEn}"
@@ -0,0 +1,131 @@
+"""
+Difusión de notificaciones en la aplicación (Server-Sent Events).
+
+api.dispatch crea una Notificacion cuando vence un recordatorio NOTIFICACION_APP
+(normalmente en otro proceso: el comando enviar_recordatorios). En cada proceso ASGI
+una única tarea consulta las notificaciones nuevas cada SSE_INTERVALO segundos y las
+reparte en memoria entre las conexiones abiertas de cada usuario, así que mil clientes
+conectados cuestan una consulta por intervalo y no mil.
+"""
+import asyncio
+import json
+import logging
+import weakref
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Max
+
+from .models import Notificacion
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_NOTIFICACION = ('id', 'Usuario_id', 'Recordatorio_id', 'Mensaje', 'CreadaEn')
+
+
+def _intervalo():
+    return getattr(settings, 'SSE_INTERVALO', 2)
+
+
+def _latido():
+    return getattr(settings, 'SSE_LATIDO', 15)
+
+
+class Difusor:
+    """
+    Reparte las notificaciones nuevas entre las colas suscritas de cada usuario.
+    La tarea de consulta solo corre mientras hay al menos un suscriptor; un fallo de
+    la base de datos se registra y se reintenta en el siguiente intervalo.
+    """
+
+    def __init__(self):
+        self._colas = defaultdict(set)
+        self._ultimo_id = None
+        self._tarea = None
+        # suscribir() espera a la base de datos antes de crear la tarea: sin el cerrojo,
+        # dos primeros suscriptores simultáneos arrancarían dos tareas de consulta
+        self._bloqueo = asyncio.Lock()
+
+    async def suscribir(self, usuario_id):
+        cola = asyncio.Queue()
+        self._colas[usuario_id].add(cola)
+        async with self._bloqueo:
+            if self._tarea is None or self._tarea.done():
+                if self._ultimo_id is None:
+                    datos = await Notificacion.objects.aaggregate(ultimo=Max('id'))
+                    self._ultimo_id = datos['ultimo'] or 0
+                self._tarea = asyncio.create_task(self._consultar())
+        return cola
+
+    def cancelar(self, usuario_id, cola):
+        colas = self._colas.get(usuario_id)
+        if colas is not None:
+            colas.discard(cola)
+            if not colas:
+                del self._colas[usuario_id]
+
+    async def _consultar(self):
+        while self._colas:
+            await asyncio.sleep(_intervalo())
+            try:
+                await self._repartir_nuevas()
+            except Exception:
+                # Si la tarea muriera, los clientes conectados no recibirían nada más
+                logger.exception("Falló la consulta de notificaciones nuevas; se reintenta.")
+
+    async def _repartir_nuevas(self):
+        nuevas = Notificacion.objects.filter(id__gt=self._ultimo_id).order_by('id')
+        async for notificacion in nuevas.values(*CAMPOS_NOTIFICACION):
+            self._ultimo_id = notificacion['id']
+            for cola in self._colas.get(notificacion['Usuario_id'], ()):
+                cola.put_nowait(notificacion)
+
+
+# Una instancia por event loop (un proceso ASGI tiene un único loop)
+_difusores = weakref.WeakKeyDictionary()
+
+
+def difusor():
+    loop = asyncio.get_running_loop()
+    if loop not in _difusores:
+        _difusores[loop] = Difusor()
+    return _difusores[loop]
+
+
+def _evento_sse(notificacion):
+    datos = {
+        'id': notificacion['id'],
+        'Recordatorio': notificacion['Recordatorio_id'],
+        'Mensaje': notificacion['Mensaje'],
+        'CreadaEn': notificacion['CreadaEn'].isoformat(),
+    }
+    return f"id: {notificacion['id']}\nevent: notificacion\ndata: {json.dumps(datos)}\n\n"
+
+
+async def flujo(usuario_id, ultimo_id=None):
+    """
+    Generador asíncrono del flujo SSE de un usuario. Con `ultimo_id` (cabecera
+    Last-Event-ID al reconectar) primero se envían las notificaciones perdidas.
+    """
+    repartidor = difusor()
+    cola = await repartidor.suscribir(usuario_id)
+    try:
+        yield f"retry: {_intervalo() * 1000}\n\n"
+        enviado = ultimo_id or 0
+        if ultimo_id is not None:
+            pendientes = Notificacion.objects.filter(Usuario_id=usuario_id, id__gt=ultimo_id).order_by('id')
+            async for notificacion in pendientes.values(*CAMPOS_NOTIFICACION):
+                enviado = notificacion['id']
+                yield _evento_sse(notificacion)
+        while True:
+            try:
+                notificacion = await asyncio.wait_for(cola.get(), timeout=_latido())
+            except asyncio.TimeoutError:
+                # Comentario SSE: mantiene viva la conexión a través de proxies
+                yield ": ping\n\n"
+                continue
+            if notificacion['id'] > enviado:
+                enviado = notificacion['id']
+                yield _evento_sse(notificacion)
+    finally:
+        repartidor.cancelar(usuario_id, cola)
@@ -0,0 +1,117 @@
+import base64
+import json
+from bisect import bisect_right
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+
+class KeysetPagination:
+    """
+    Paginación por cursor (keyset) sobre el orden natural del modelo + 'id'.
+
+    En vez de OFFSET, cada página continúa a partir de la última fila vista
+    (campo_orden, id), así que una página profunda cuesta lo mismo que la primera.
+    La paginación solo se activa si el cliente envía `page_size` o `cursor`,
+    de modo que los clientes actuales siguen recibiendo la lista completa.
+    """
+    page_size = 100
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def __init__(self, campo_orden):
+        self.campo_orden = campo_orden
+        self.next_cursor = None
+
+    def _get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def encode_cursor(self, fila):
+        # Acepta tanto instancias del modelo como filas de .values()
+        if isinstance(fila, dict):
+            valor, pk = fila[self.campo_orden], fila['id']
+        else:
+            valor, pk = getattr(fila, self.campo_orden), fila.pk
+        payload = json.dumps([valor.isoformat(), pk]).encode()
+        return base64.urlsafe_b64encode(payload).decode()
+
+    def decode_cursor(self, token):
+        try:
+            valor, pk = json.loads(base64.urlsafe_b64decode(token.encode()))
+            fecha = parse_datetime(valor)
+            # Los cursores propios siempre llevan zona; una fecha naive no se puede
+            # comparar con las filas en memoria (paginate_rows)
+            if fecha is None or timezone.is_naive(fecha):
+                raise ValueError
+            return fecha, int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def after_cursor(self, queryset, valor, pk):
+        """Filas posteriores a (valor, pk) en el orden (campo_orden, id)."""
+        # El campo >= valor redundante convierte el OR en un rango sobre el índice
+        # (Usuario, campo); sin él SQLite recorre todas las filas del usuario
+        return queryset.filter(
+            Q(**{f'{self.campo_orden}__gte': valor}),
+            Q(**{f'{self.campo_orden}__gt': valor}) | Q(**{self.campo_orden: valor, 'id__gt': pk}),
+        )
+
+    def _solicitada(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def _recortar(self, filas, size):
+        # `filas` trae una fila extra si existe una página siguiente
+        if len(filas) > size:
+            filas = filas[:size]
+            self.next_cursor = self.encode_cursor(filas[-1])
+        return filas
+
+    def paginate_queryset(self, queryset, request):
+        """
+        Devuelve la lista de filas de la página actual, o None si el cliente
+        no pidió paginación.
+        """
+        if not self._solicitada(request):
+            return None
+
+        queryset = queryset.order_by(self.campo_orden, 'id')
+        token = request.query_params.get(self.cursor_query_param)
+        if token:
+            queryset = self.after_cursor(queryset, *self.decode_cursor(token))
+
+        size = self._get_page_size(request)
+        return self._recortar(list(queryset[:size + 1]), size)
+
+    def paginate_rows(self, filas, request):
+        """
+        Como paginate_queryset, pero sobre filas en memoria (dicts) ya ordenadas por
+        (campo_orden, id), p. ej. las ocurrencias expandidas de las series.
+        """
+        if not self._solicitada(request):
+            return None
+
+        desde = 0
+        token = request.query_params.get(self.cursor_query_param)
+        if token:
+            desde = bisect_right(
+                filas, self.decode_cursor(token), key=lambda fila: (fila[self.campo_orden], fila['id'])
+            )
+        size = self._get_page_size(request)
+        return self._recortar(filas[desde:desde + size + 1], size)
+
+    def get_paginated_response(self, data, **extra):
+        return Response({
+            **extra,
+            'next': self.next_cursor,
+            'results': data,
+        })
@@ -0,0 +1,151 @@
+import calendar
+from datetime import timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+# Mayor Intervalo admitido (API e importación ICS); con más, la aritmética de fechas
+# se sale de datetime y una serie así no tiene uso práctico
+MAX_INTERVALO = 1000
+
+
+def _sumar_meses(fecha, meses):
+    """
+    Suma meses a una fecha. Si el día no existe en el mes destino (ej: 31 de abril)
+    se ajusta al último día de ese mes.
+    """
+    total = fecha.month - 1 + meses
+    anio, mes = fecha.year + total // 12, total % 12 + 1
+    dia = min(fecha.day, calendar.monthrange(anio, mes)[1])
+    return fecha.replace(year=anio, month=mes, day=dia)
+
+
+def ocurrencia(inicio, frecuencia, intervalo, k):
+    """Devuelve el inicio de la k-ésima ocurrencia (k=0 es el propio inicio de la serie)."""
+    if frecuencia == 'DIARIA':
+        return inicio + timedelta(days=k * intervalo)
+    if frecuencia == 'SEMANAL':
+        return inicio + timedelta(weeks=k * intervalo)
+    if frecuencia == 'MENSUAL':
+        return _sumar_meses(inicio, k * intervalo)
+    if frecuencia == 'ANUAL':
+        return _sumar_meses(inicio, 12 * k * intervalo)
+    raise ValueError(f"Frecuencia desconocida: {frecuencia}")
+
+
+def _primer_indice(inicio, frecuencia, intervalo, desde):
+    """
+    Índice k a partir del cual empezar a generar para llegar a `desde` sin recorrer
+    las ocurrencias anteriores. Nunca se pasa de la primera ocurrencia >= desde.
+    Devuelve None si un solo paso ya se sale de datetime: no hay más ocurrencias.
+    """
+    if desde <= inicio:
+        return 0
+    if frecuencia in ('DIARIA', 'SEMANAL'):
+        try:
+            paso = timedelta(days=intervalo * (7 if frecuencia == 'SEMANAL' else 1))
+        except OverflowError:
+            return None
+        # Se retrocede un paso por si el cambio de horario desplaza la hora local
+        return max(0, (desde - inicio) // paso - 1)
+    meses = (desde.year - inicio.year) * 12 + desde.month - inicio.month
+    paso = intervalo * (12 if frecuencia == 'ANUAL' else 1)
+    return max(0, meses // paso - 1)
+
+
+def _parse_excepciones(excepciones):
+    fechas = set()
+    for valor in excepciones or ():
+        fecha = parse_datetime(valor) if isinstance(valor, str) else valor
+        if fecha is not None:
+            if timezone.is_naive(fecha):
+                fecha = timezone.make_aware(fecha)
+            fechas.add(fecha)
+    return fechas
+
+
+def expandir(inicio, fin, frecuencia, intervalo=1, hasta=None, veces=None,
+             excepciones=None, ventana_inicio=None, ventana_fin=None, tz=None):
+    """
+    Generador de ocurrencias (inicio, fin) de una serie que se solapan con la ventana
+    [ventana_inicio, ventana_fin). Salta directamente a la primera ocurrencia relevante,
+    así que el coste es proporcional a las ocurrencias visibles y no a la edad de la serie.
+
+    La aritmética se hace en hora local (`tz` o la zona actual) para que una reunión
+    semanal conserve su hora aunque cambie el horario de verano.
+    """
+    if not frecuencia:
+        raise ValueError("La serie no tiene frecuencia.")
+    if veces is None and hasta is None and ventana_fin is None:
+        raise ValueError("Una serie sin fin necesita `ventana_fin` para poder expandirse.")
+
+    intervalo = intervalo or 1
+    duracion = fin - inicio if fin is not None else None
+    omitidas = _parse_excepciones(excepciones)
+    local = timezone.localtime(inicio, tz)
+
+    k = 0
+    if ventana_inicio is not None:
+        k = _primer_indice(local, frecuencia, intervalo, ventana_inicio - (duracion or timedelta(0)))
+        if k is None:
+            return
+
+    while True:
+        if veces is not None and k >= veces:
+            return
+        try:
+            actual = ocurrencia(local, frecuencia, intervalo, k)
+            fin_actual = actual + duracion if duracion is not None else None
+        except (OverflowError, ValueError):
+            # La siguiente ocurrencia cae después del año 9999: la serie no da más
+            return
+        if hasta is not None and actual > hasta:
+            return
+        if ventana_fin is not None and actual >= ventana_fin:
+            return
+        k += 1
+
+        if actual in omitidas:
+            continue
+        if ventana_inicio is not None:
+            if duracion and fin_actual <= ventana_inicio:
+                continue
+            if not duracion and actual < ventana_inicio:
+                continue
+        yield actual, fin_actual
+
+
+def fin_de_serie(inicio, fin, frecuencia, intervalo=1, hasta=None, veces=None):
+    """
+    Cota superior del fin de la última ocurrencia, o None si la serie no termina.
+    Se guarda en Evento.FinSerie para filtrar series por ventana en la base de datos.
+    """
+    duracion = fin - inicio if fin is not None else timedelta(0)
+    limites = []
+    if veces is not None:
+        local = timezone.localtime(inicio)
+        try:
+            limites.append(ocurrencia(local, frecuencia, intervalo or 1, max(veces - 1, 0)) + duracion)
+        except (OverflowError, ValueError):
+            # La última ocurrencia no se puede representar: a efectos prácticos no termina
+            pass
+    if hasta is not None:
+        limites.append(hasta + duracion)
+    return min(limites) if limites else None
+
+
+def expandir_filas(filas, ventana_inicio, ventana_fin, tz=None):
+    """
+    Sustituye cada fila recurrente (dict de .values()) por una fila por ocurrencia
+    dentro de la ventana. Las filas no recurrentes se devuelven tal cual.
+    """
+    for fila in filas:
+        if not fila.get('Frecuencia'):
+            yield fila
+            continue
+        for inicio, fin in expandir(
+            fila['FechaInicio'], fila['FechaFin'], fila['Frecuencia'], fila['Intervalo'],
+            fila['RepetirHasta'], fila['RepetirVeces'], fila['Excepciones'],
+            ventana_inicio, ventana_fin, tz,
+        ):
+            yield {**fila, 'FechaInicio': inicio, 'FechaFin': fin}
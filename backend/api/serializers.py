@@ -1,6 +1,14 @@
+from functools import lru_cache
+
 from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from rest_framework import serializers
-from .models import Recordatorio, Evento
+from .auth_backend import buscar_por_email
+from .models import Recordatorio, Evento, Perfil
+from .recurrence import MAX_INTERVALO
+from .zonas import zonas_validas
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -9,23 +17,101 @@ class UserSerializer(serializers.ModelSerializer):
 
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
+    # El correo es obligatorio y único (sin distinguir mayúsculas): es la credencial del login
+    email = serializers.EmailField()
 
     class Meta:
         model = User
         fields = ('id', 'username', 'email', 'password')
         extra_kwargs = {'password': {'write_only': True}}
 
+    def validate_email(self, value):
+        value = value.strip()
+        if buscar_por_email(value).exists():
+            raise serializers.ValidationError("Ya existe una cuenta con este correo.")
+        return value
+
     def create(self, validated_data):
         password = validated_data.pop('password')
         user = User(**validated_data)
         user.set_password(password)
-        user.save()
+        try:
+            # El índice único atrapa el caso de dos registros simultáneos con el mismo correo
+            with transaction.atomic():
+                user.save()
+        except IntegrityError:
+            raise serializers.ValidationError({'email': ["Ya existe una cuenta con este correo."]})
         return user
 
+class PerfilSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Perfil
+        fields = ('ZonaHoraria',)
+
+    def validate_ZonaHoraria(self, value):
+        if value not in zonas_validas():
+            raise serializers.ValidationError("Zona horaria desconocida (use un nombre IANA, ej: America/Managua).")
+        return value
+
 class RecordatorioSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recordatorio
         fields = '__all__'
+        # FechaEnviado se deriva del evento; el cliente no la envía
+        read_only_fields = ['FechaEnviado', 'Estado']
+
+# --- Ruta de lectura ligera para los listados ---
+# Los listados trabajan sobre filas de .values() y construyen los diccionarios a mano:
+# sin instancias del modelo, sin serializador anidado por fila y sin la maquinaria
+# de DRF campo por campo. El usuario se referencia por su id.
+
+EVENTO_LIST_FIELDS = (
+    'id', 'Usuario', 'Titulo', 'Descripcion', 'FechaInicio', 'FechaFin',
+    'Color', 'Estado', 'Ubicacion', 'Frecuencia', 'Intervalo', 'RepetirHasta',
+    'RepetirVeces', 'Excepciones', 'CreadoEn', 'ActualizadoEn',
+)
+EVENTO_DATE_FIELDS = ('FechaInicio', 'FechaFin', 'RepetirHasta', 'CreadoEn', 'ActualizadoEn')
+
+RECORDATORIO_LIST_FIELDS = (
+    'id', 'Evento', 'TipoAviso', 'TiempoAntes', 'UnidadTiempo', 'Estado', 'FechaEnviado',
+)
+RECORDATORIO_DATE_FIELDS = ('FechaEnviado',)
+
+AVISO_PROXIMO_LIST_FIELDS = ('Recordatorio', 'Evento', 'Titulo', 'FechaInicio', 'TipoAviso', 'FechaEnviado')
+AVISO_PROXIMO_DATE_FIELDS = ('FechaInicio', 'FechaEnviado')
+
+@lru_cache(maxsize=None)
+def _datetime_field(tz):
+    return serializers.DateTimeField(default_timezone=tz)
+
+
+def _serialize_rows(rows, date_fields):
+    # La zona activa (la del usuario, ver api.zonas) se resuelve una vez por respuesta
+    to_representation = _datetime_field(timezone.get_current_timezone()).to_representation
+    data = []
+    for row in rows:
+        for campo in date_fields:
+            valor = row[campo]
+            if valor is not None:
+                row[campo] = to_representation(valor)
+        data.append(row)
+    return data
+
+
+def serialize_evento_rows(rows):
+    """Serializa filas de Evento obtenidas con .values(*EVENTO_LIST_FIELDS)."""
+    return _serialize_rows(rows, EVENTO_DATE_FIELDS)
+
+
+def serialize_recordatorio_rows(rows):
+    """Serializa filas de Recordatorio obtenidas con .values(*RECORDATORIO_LIST_FIELDS)."""
+    return _serialize_rows(rows, RECORDATORIO_DATE_FIELDS)
+
+
+def serialize_aviso_proximo_rows(rows):
+    """Serializa filas de AvisoProximo obtenidas con .values(*AVISO_PROXIMO_LIST_FIELDS)."""
+    return _serialize_rows(rows, AVISO_PROXIMO_DATE_FIELDS)
+
 
 class EventoSerializer(serializers.ModelSerializer):
     """
@@ -40,8 +126,64 @@ class EventoSerializer(serializers.ModelSerializer):
         # Definimos todos los campos que el serializador manejará.
         fields = [
             'id', 'Usuario', 'Titulo', 'Descripcion', 'FechaInicio', 'FechaFin', 
-            'Color', 'Estado', 'Ubicacion', 'CreadoEn', 'ActualizadoEn'
+            'Color', 'Estado', 'Ubicacion', 'Frecuencia', 'Intervalo', 'RepetirHasta',
+            'RepetirVeces', 'Excepciones', 'CreadoEn', 'ActualizadoEn'
         ]
         # IMPORTANTE: Quitamos 'Usuario' de aquí.
         # Esto permite que el método .save(Usuario=...) de la vista funcione.
         read_only_fields = ['id', 'CreadoEn', 'ActualizadoEn']
+        extra_kwargs = {
+            'Intervalo': {'min_value': 1, 'max_value': MAX_INTERVALO},
+            'RepetirVeces': {'min_value': 1},
+        }
+
+    def validate_Excepciones(self, value):
+        if not isinstance(value, list):
+            raise serializers.ValidationError("Debe ser una lista de fechas ISO 8601.")
+        for fecha in value:
+            if not isinstance(fecha, str) or parse_datetime(fecha) is None:
+                raise serializers.ValidationError(f"Fecha inválida: {fecha}")
+        return value
+
+    def _valor(self, attrs, campo):
+        # En una actualización parcial los campos que no llegan conservan el valor guardado
+        if campo in attrs or self.instance is None:
+            return attrs.get(campo)
+        return getattr(self.instance, campo)
+
+    def validate(self, attrs):
+        hasta = self._valor(attrs, 'RepetirHasta')
+        veces = self._valor(attrs, 'RepetirVeces')
+        if hasta is not None and veces is not None:
+            raise serializers.ValidationError("Use RepetirHasta o RepetirVeces, no ambos.")
+        if (hasta is not None or veces is not None) and not self._valor(attrs, 'Frecuencia'):
+            raise serializers.ValidationError("RepetirHasta/RepetirVeces requieren una Frecuencia.")
+        inicio = self._valor(attrs, 'FechaInicio')
+        if hasta is not None and inicio is not None and hasta < inicio:
+            raise serializers.ValidationError("RepetirHasta debe ser posterior a FechaInicio.")
+        return attrs
+
+
+class RecordatorioAnidadoSerializer(serializers.ModelSerializer):
+    """
+    Recordatorio enviado dentro de un evento (el Evento se asigna al guardar).
+    """
+    class Meta:
+        model = Recordatorio
+        fields = ('TipoAviso', 'TiempoAntes', 'UnidadTiempo')
+
+
+class EventoLoteSerializer(EventoSerializer):
+    """
+    Valida un evento del endpoint masivo, con sus recordatorios opcionales.
+    """
+    recordatorios = RecordatorioAnidadoSerializer(many=True, required=False)
+
+    class Meta(EventoSerializer.Meta):
+        fields = EventoSerializer.Meta.fields + ['recordatorios']
+
+    def validate_recordatorios(self, value):
+        claves = [(r['TipoAviso'], r['TiempoAntes'], r['UnidadTiempo']) for r in value]
+        if len(claves) != len(set(claves)):
+            raise serializers.ValidationError("Hay recordatorios repetidos para el mismo evento.")
+        return value
@@ -0,0 +1,69 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from django.contrib.auth.models import User
+
+from . import cache
+from .authentication import usuarios_cache
+from .models import Eliminacion, Evento, Recordatorio
+
+
+@receiver(post_delete, sender=Evento)
+def registrar_evento_eliminado(sender, instance, origin=None, **kwargs):
+    # Solo los borrados de a uno: los de querysets (endpoint masivo, admin) escriben sus
+    # lápidas con sync.registrar_eventos_eliminados en un INSERT, y si se borra la cuenta
+    # entera no hay a quién sincronizar (y la lápida apuntaría a ella)
+    if not isinstance(origin, Evento):
+        return
+    Eliminacion.objects.create(Usuario_id=instance.Usuario_id, Modelo='EVENTO', ObjetoId=instance.pk)
+
+
+@receiver(post_delete, sender=Recordatorio)
+def registrar_recordatorio_eliminado(sender, instance, origin=None, **kwargs):
+    # Si el borrado viene en cascada desde un Evento, su lápida ya lo cubre
+    if getattr(origin, 'model', type(origin)) is not Recordatorio:
+        return
+    usuario_id = (
+        Evento.objects.filter(pk=instance.Evento_id).values_list('Usuario_id', flat=True).first()
+    )
+    if usuario_id is not None:
+        Eliminacion.objects.create(Usuario_id=usuario_id, Modelo='RECORDATORIO', ObjetoId=instance.pk)
+
+
+# --- Invalidación de la caché de listados ---
+# Se invalida al confirmar la transacción: si se hiciera antes, otra petición podría
+# volver a cachear los datos viejos con la versión nueva.
+# Las escrituras masivas (bulk_create, bulk_update, .update()) no emiten señales:
+# quien las hace debe llamar a cache.invalidar() directamente.
+
+@receiver(post_save, sender=Evento)
+@receiver(post_delete, sender=Evento)
+def invalidar_cache_evento(sender, instance, **kwargs):
+    usuario_id = instance.Usuario_id
+    transaction.on_commit(lambda: cache.invalidar(usuario_id))
+
+
+@receiver(post_save, sender=Recordatorio)
+@receiver(post_delete, sender=Recordatorio)
+def invalidar_cache_recordatorio(sender, instance, origin=None, **kwargs):
+    # En un borrado en cascada desde un Evento (origin es el evento o su queryset) la
+    # señal del evento ya invalida, y buscar aquí su usuario sería una consulta por fila
+    if origin is not None and getattr(origin, 'model', type(origin)) is not Recordatorio:
+        return
+    evento = instance._state.fields_cache.get('Evento')
+    if evento is not None:
+        usuario_id = evento.Usuario_id
+    else:
+        usuario_id = (
+            Evento.objects.filter(pk=instance.Evento_id).values_list('Usuario_id', flat=True).first()
+        )
+    if usuario_id is not None:
+        transaction.on_commit(lambda: cache.invalidar(usuario_id))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def olvidar_usuario_cacheado(sender, instance, **kwargs):
+    # Solo afecta a la LRU de este proceso; en los demás caduca por TTL
+    usuarios_cache.discard(instance.pk)
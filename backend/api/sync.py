@@ -0,0 +1,80 @@
+import base64
+from datetime import timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Eliminacion, Evento, Recordatorio
+from .serializers import (
+    EVENTO_LIST_FIELDS,
+    RECORDATORIO_LIST_FIELDS,
+    serialize_evento_rows,
+    serialize_recordatorio_rows,
+)
+
+# Margen que se resta al token para no perder escrituras concurrentes que se
+# confirmaron después de leer; el cliente debe aplicar los cambios como upserts.
+MARGEN_SYNC = timedelta(seconds=5)
+
+# Las lápidas más antiguas se purgan; un token anterior obliga a una sincronización completa
+RETENCION_ELIMINACIONES = timedelta(days=30)
+
+
+def crear_token(momento):
+    return base64.urlsafe_b64encode(momento.isoformat().encode()).decode()
+
+
+def leer_token(token):
+    """Devuelve el datetime del token o None si no es válido."""
+    try:
+        momento = parse_datetime(base64.urlsafe_b64decode(token.encode()).decode())
+    except (TypeError, ValueError):
+        return None
+    if momento is None or timezone.is_naive(momento):
+        return None
+    return momento
+
+
+def cambios_desde(usuario, desde=None):
+    """
+    Eventos y recordatorios creados o modificados después de `desde`, más los ids
+    eliminados. Sin `desde` (o si es más antiguo que la retención de lápidas) se
+    devuelve todo y `completo` es True: el cliente debe reemplazar su copia local.
+    """
+    ahora = timezone.now()
+    completo = desde is None or desde < ahora - RETENCION_ELIMINACIONES
+
+    eventos = Evento.objects.filter(Usuario_id=usuario.pk)
+    recordatorios = Recordatorio.objects.filter(Evento__Usuario_id=usuario.pk)
+    eliminados = {'eventos': [], 'recordatorios': []}
+    if not completo:
+        eventos = eventos.filter(ActualizadoEn__gt=desde)
+        recordatorios = recordatorios.filter(ActualizadoEn__gt=desde)
+        lapidas = Eliminacion.objects.filter(Usuario_id=usuario.pk, EliminadoEn__gt=desde)
+        for modelo, objeto_id in lapidas.values_list('Modelo', 'ObjetoId'):
+            eliminados['eventos' if modelo == 'EVENTO' else 'recordatorios'].append(objeto_id)
+
+    return {
+        'token': crear_token(ahora - MARGEN_SYNC),
+        'completo': completo,
+        'eventos': serialize_evento_rows(eventos.values(*EVENTO_LIST_FIELDS)),
+        'recordatorios': serialize_recordatorio_rows(recordatorios.values(*RECORDATORIO_LIST_FIELDS)),
+        'eliminados': eliminados,
+    }
+
+
+def registrar_eventos_eliminados(pares):
+    """
+    Lápidas, en un solo INSERT, de los eventos (id, Usuario_id) que se van a borrar con
+    un queryset. La señal post_delete solo las escribe para los borrados de a uno.
+    """
+    Eliminacion.objects.bulk_create([
+        Eliminacion(Usuario_id=usuario_id, Modelo='EVENTO', ObjetoId=pk) for pk, usuario_id in pares
+    ])
+
+
+def purgar_eliminaciones(ahora=None):
+    """Borra las lápidas que ya superaron el periodo de retención."""
+    ahora = ahora or timezone.now()
+    borradas, _ = Eliminacion.objects.filter(EliminadoEn__lt=ahora - RETENCION_ELIMINACIONES).delete()
+    return borradas
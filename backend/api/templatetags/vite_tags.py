@@ -2,46 +2,100 @@ from django import template
 from django.templatetags.static import static
 from django.conf import settings
 import glob
+import json
 import os
+import time
 
 register = template.Library()
 
+# Resultado de la última lectura del manifest/glob, reutilizado entre renders.
+# Se invalida cuando cambia el mtime del directorio dist (un nuevo build lo reescribe),
+# que solo se comprueba cada SPA_RECHECK_SECONDS segundos.
+_cache = {'clave': None, 'assets': {}, 'revisado': None}
 
-def _search_asset(pattern):
-    """Search for the first file matching pattern in likely build locations.
 
-    pattern: glob pattern like 'index-*.js' or 'index-*.css'
-    Returns the filename (not full path) or None.
-    """
+def _dist_dirs():
     candidates = [
-        settings.BASE_DIR / 'staticfiles_collected' / 'dist' / 'assets',
-        settings.BASE_DIR / 'static' / 'dist' / 'assets',
+        settings.BASE_DIR / 'staticfiles_collected' / 'dist',
+        settings.BASE_DIR / 'static' / 'dist',
     ]
     # FRONTEND_DIR may point to frontend/Calender
-    try:
-        if getattr(settings, 'FRONTEND_DIR', None):
-            candidates.append(settings.FRONTEND_DIR / 'dist' / 'assets')
-    except Exception:
-        pass
+    if getattr(settings, 'FRONTEND_DIR', None):
+        candidates.append(settings.FRONTEND_DIR / 'dist')
+    return [str(d) for d in candidates]
 
-    for d in candidates:
+
+def _read_manifest(dist_dir):
+    """Return {'js': ..., 'css': ...} from Vite's manifest.json, or None if unavailable."""
+    for path in (os.path.join(dist_dir, '.vite', 'manifest.json'), os.path.join(dist_dir, 'manifest.json')):
         try:
-            dstr = str(d)
-            if not os.path.isdir(dstr):
-                continue
-            matches = glob.glob(os.path.join(dstr, pattern))
-            if matches:
-                return os.path.basename(matches[0])
-        except Exception:
+            with open(path, encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
             continue
-
+        entry = manifest.get('index.html') or next(
+            (chunk for chunk in manifest.values() if chunk.get('isEntry')), None
+        )
+        if not entry:
+            return None
+        css = entry.get('css') or [None]
+        return {
+            'js': os.path.basename(entry['file']) if entry.get('file') else None,
+            'css': os.path.basename(css[0]) if css[0] else None,
+        }
     return None
 
 
+def _search_asset(dist_dir, pattern):
+    """Search for the first file matching pattern in the dist assets folder.
+
+    pattern: glob pattern like 'index-*.js' or 'index-*.css'
+    Returns the filename (not full path) or None.
+    """
+    matches = glob.glob(os.path.join(dist_dir, 'assets', pattern))
+    return os.path.basename(matches[0]) if matches else None
+
+
+def _load_assets():
+    for dist_dir in _dist_dirs():
+        if not os.path.isdir(dist_dir):
+            continue
+        assets = _read_manifest(dist_dir)
+        if assets is None:
+            assets = {
+                'js': _search_asset(dist_dir, 'index-*.js'),
+                'css': _search_asset(dist_dir, 'index-*.css'),
+            }
+        if assets['js'] or assets['css']:
+            return assets
+    return {'js': None, 'css': None}
+
+
+def _assets():
+    """Return the cached {'js', 'css'} filenames, reloading them only after a new build."""
+    ahora = time.monotonic()
+    intervalo = getattr(settings, 'SPA_RECHECK_SECONDS', 60)
+    if _cache['revisado'] is not None and ahora - _cache['revisado'] < intervalo:
+        return _cache['assets']
+    _cache['revisado'] = ahora
+
+    clave = []
+    for dist_dir in _dist_dirs():
+        try:
+            clave.append(os.path.getmtime(dist_dir))
+        except OSError:
+            clave.append(None)
+    clave = tuple(clave)
+    if _cache['clave'] != clave:
+        _cache['assets'] = _load_assets()
+        _cache['clave'] = clave
+    return _cache['assets']
+
+
 @register.simple_tag
 def vite_asset_js():
     """Return static URL for the built JS file (index-*.js) or empty string."""
-    filename = _search_asset('index-*.js')
+    filename = _assets()['js']
     if not filename:
         return ''
     return static(f'dist/assets/{filename}')
@@ -50,7 +104,7 @@ def vite_asset_js():
 @register.simple_tag
 def vite_asset_css():
     """Return static URL for the built CSS file (index-*.css) or empty string."""
-    filename = _search_asset('index-*.css')
+    filename = _assets()['css']
     if not filename:
         return ''
     return static(f'dist/assets/{filename}')
@@ -1,3 +1,1257 @@
-from django.test import TestCase
+import asyncio
+import base64
+import gzip
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+from zoneinfo import ZoneInfo
+from datetime import datetime, timedelta, timezone as dt_timezone
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from backend import spa
+
+from .admin import EventoAdmin
+from .auth_backend import EmailBackend
+from .authentication import token_para_usuario
+from .disponibilidad import filtrar_por_ventana
+from .pagination import KeysetPagination
+from .throttling import LoginEmailThrottle
+from .recurrence import MAX_INTERVALO, expandir, fin_de_serie
+from .templatetags import vite_tags
+from . import avisos, busqueda, dispatch, ics, metricas, notificaciones, sync
+from .models import AvisoProximo, Eliminacion, Evento, Notificacion, Recordatorio
+
+
+class ApiTestCase(TestCase):
+    """
+    Base para las pruebas de la API: un usuario autenticado con JWT.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('ana', 'ana@example.com', 'secreta123')
+        self.client = APIClient()
+        self.access = str(token_para_usuario(self.user).access_token)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+
+    def _crear_eventos(self, cantidad):
+        inicio = datetime(2025, 1, 1, 9, tzinfo=dt_timezone.utc)
+        for i in range(cantidad):
+            evento = Evento.objects.create(
+                Usuario=self.user, Titulo=f'Evento {i}', FechaInicio=inicio + timedelta(hours=i)
+            )
+            Recordatorio.objects.create(
+                Evento=evento, TipoAviso='EMAIL', TiempoAntes=15,
+                UnidadTiempo='MINUTOS',
+            )
+
+
+class ListadoQueryCountTests(ApiTestCase):
+    """
+    Los listados deben ejecutar un número fijo de consultas sin importar cuántas filas devuelvan.
+    """
+
+    def _contar_consultas(self, url):
+        with self.assertNumQueries(2):
+            # Versión del listado (ETag) + el listado; el usuario sale del token
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_event_list_consultas_constantes(self):
+        self._crear_eventos(1)
+        self.assertEqual(len(self._contar_consultas('/api/events/')), 1)
+        self._crear_eventos(40)
+        self.assertEqual(len(self._contar_consultas('/api/events/')), 41)
+
+    def test_reminders_list_consultas_constantes(self):
+        self._crear_eventos(1)
+        self.assertEqual(len(self._contar_consultas('/api/reminders/')), 1)
+        self._crear_eventos(40)
+        self.assertEqual(len(self._contar_consultas('/api/reminders/')), 41)
+
+    def test_event_list_usuario_plano(self):
+        self._crear_eventos(3)
+        data = self.client.get('/api/events/').json()
+        self.assertTrue(all(evento['Usuario'] == self.user.id for evento in data))
+        pagina = self.client.get('/api/events/', {'page_size': 2}).json()
+        self.assertEqual(pagina['usuario']['email'], 'ana@example.com')
+        self.assertEqual(len(pagina['results']), 2)
+        self.assertIsNotNone(pagina['next'])
+
+    def test_cursor_recorre_todo_con_un_rango(self):
+        self._crear_eventos(5)
+        # Dos eventos a la misma hora: el desempate es por id
+        Evento.objects.create(Usuario=self.user, Titulo='Empate', FechaInicio=datetime(2025, 1, 1, 10, tzinfo=dt_timezone.utc))
+        vistos, cursor = [], None
+        while True:
+            pagina = self.client.get('/api/events/', {'page_size': 2, **({'cursor': cursor} if cursor else {})}).json()
+            vistos += [evento['id'] for evento in pagina['results']]
+            cursor = pagina['next']
+            if cursor is None:
+                break
+        self.assertEqual(vistos, list(Evento.objects.order_by('FechaInicio', 'id').values_list('id', flat=True)))
+
+        if connection.vendor == 'sqlite':
+            # Una página profunda es un rango sobre el índice, no un recorrido desde el principio
+            primero = Evento.objects.first()
+            siguientes = KeysetPagination('FechaInicio').after_cursor(
+                Evento.objects.filter(Usuario=self.user), primero.FechaInicio, primero.pk
+            )
+            self.assertIn('(Usuario_id=? AND FechaInicio>?)', siguientes.explain())
+
+
+def _utc(*args):
+    return datetime(*args, tzinfo=dt_timezone.utc)
+
+
+class RecurrenciaTests(SimpleTestCase):
+    """
+    Expansión de series (api.recurrence): COUNT/UNTIL, EXDATE, fin de mes y bordes de la ventana.
+    """
+
+    def _inicios(self, *args, **kwargs):
+        return [inicio for inicio, _ in expandir(*args, tz=dt_timezone.utc, **kwargs)]
+
+    def test_count_until_y_excepciones(self):
+        inicio, fin = _utc(2025, 1, 1, 9), _utc(2025, 1, 1, 10)
+        self.assertEqual(len(self._inicios(inicio, fin, 'DIARIA', veces=3)), 3)
+        # UNTIL incluye la ocurrencia que empieza justo en el límite
+        self.assertEqual(self._inicios(inicio, fin, 'SEMANAL', hasta=_utc(2025, 1, 15, 9)),
+                         [_utc(2025, 1, 1, 9), _utc(2025, 1, 8, 9), _utc(2025, 1, 15, 9)])
+        self.assertEqual(
+            self._inicios(inicio, fin, 'DIARIA', veces=3, excepciones=['2025-01-02T09:00:00Z']),
+            [_utc(2025, 1, 1, 9), _utc(2025, 1, 3, 9)],
+        )
+        with self.assertRaises(ValueError):
+            list(expandir(inicio, fin, 'DIARIA'))
+
+    def test_fin_de_mes(self):
+        # Se cuenta siempre desde el inicio: después de febrero se vuelve al día 31
+        self.assertEqual(self._inicios(_utc(2025, 1, 31, 9), None, 'MENSUAL', veces=4), [
+            _utc(2025, 1, 31, 9), _utc(2025, 2, 28, 9), _utc(2025, 3, 31, 9), _utc(2025, 4, 30, 9),
+        ])
+        self.assertEqual(self._inicios(_utc(2024, 2, 29), None, 'ANUAL', veces=2),
+                         [_utc(2024, 2, 29), _utc(2025, 2, 28)])
+
+    def test_bordes_de_la_ventana(self):
+        inicio, fin = _utc(2000, 1, 1, 9), _utc(2000, 1, 1, 10)
+        # Una ocurrencia que termina justo al abrir la ventana no se solapa; la que
+        # empieza justo al cerrarla tampoco
+        self.assertEqual(
+            self._inicios(inicio, fin, 'DIARIA', ventana_inicio=_utc(2025, 1, 3, 10), ventana_fin=_utc(2025, 1, 5, 9)),
+            [_utc(2025, 1, 4, 9)],
+        )
+        # Un instante (sin fin) cuenta si empieza dentro de la ventana
+        self.assertEqual(
+            self._inicios(inicio, None, 'DIARIA', ventana_inicio=_utc(2025, 1, 3, 9), ventana_fin=_utc(2025, 1, 4, 9)),
+            [_utc(2025, 1, 3, 9)],
+        )
+
+    def test_fin_de_serie(self):
+        inicio, fin = _utc(2025, 1, 1, 9), _utc(2025, 1, 1, 10)
+        self.assertEqual(fin_de_serie(inicio, fin, 'DIARIA', veces=3), _utc(2025, 1, 3, 10))
+        self.assertEqual(fin_de_serie(inicio, fin, 'DIARIA', hasta=_utc(2025, 2, 1, 9)), _utc(2025, 2, 1, 10))
+        self.assertEqual(fin_de_serie(inicio, fin, 'DIARIA', veces=3, hasta=_utc(2025, 2, 1, 9)), _utc(2025, 1, 3, 10))
+        self.assertIsNone(fin_de_serie(inicio, fin, 'SEMANAL'))
+
+    def test_fechas_fuera_de_rango(self):
+        inicio = _utc(9999, 10, 31, 9)
+        self.assertEqual(len(self._inicios(inicio, None, 'MENSUAL', ventana_fin=datetime.max.replace(tzinfo=dt_timezone.utc))), 3)
+        self.assertIsNone(fin_de_serie(inicio, None, 'MENSUAL', veces=100))
+
+    def test_intervalo_enorme(self):
+        inicio, fin = _utc(2025, 1, 1, 9), _utc(2025, 1, 1, 10)
+        for frecuencia in ('DIARIA', 'SEMANAL', 'MENSUAL', 'ANUAL'):
+            with self.subTest(frecuencia=frecuencia):
+                self.assertEqual(self._inicios(
+                    inicio, fin, frecuencia, intervalo=200000000,
+                    ventana_inicio=_utc(2025, 3, 1), ventana_fin=_utc(2025, 4, 1),
+                ), [])
+
+
+class ListadoSeriesTests(ApiTestCase):
+    """
+    Con `end` el listado expande las series: la ventana está acotada y se pagina por ocurrencia.
+    """
+
+    def setUp(self):
+        super().setUp()
+        Evento.objects.create(Usuario=self.user, Titulo='Mensual', FechaInicio=_utc(2025, 1, 1, 9), Frecuencia='MENSUAL')
+        Evento.objects.create(Usuario=self.user, Titulo='Diaria', FechaInicio=_utc(2025, 1, 1, 8),
+                              FechaFin=_utc(2025, 1, 1, 8, 30), Frecuencia='DIARIA')
+        Evento.objects.create(Usuario=self.user, Titulo='Suelto', FechaInicio=_utc(2025, 1, 10, 12))
+
+    def test_ventana_acotada(self):
+        for params in ({'start': '2025-01-01', 'end': '9999-12-31'}, {'end': '2025-02-01'}):
+            self.assertEqual(self.client.get('/api/events/', params).status_code, 400)
+
+    def test_paginacion_por_ocurrencia(self):
+        ventana = {'start': '2025-01-01T00:00:00Z', 'end': '2025-02-01T00:00:00Z'}
+        completo = self.client.get('/api/events/', ventana).json()
+        self.assertEqual(len(completo), 31 + 1 + 1)
+
+        vistos, cursor = [], None
+        while True:
+            pagina = self.client.get('/api/events/', {**ventana, 'page_size': 5, **({'cursor': cursor} if cursor else {})}).json()
+            vistos += [(evento['FechaInicio'], evento['id']) for evento in pagina['results']]
+            cursor = pagina['next']
+            if cursor is None:
+                break
+        self.assertEqual(vistos, [(evento['FechaInicio'], evento['id']) for evento in completo])
+        self.assertEqual(vistos, sorted(vistos))
+
+    def test_cursor_sin_zona(self):
+        cursor = base64.urlsafe_b64encode(json.dumps(['2025-01-01T00:00:00', 1]).encode()).decode()
+        ventana = {'start': '2025-01-01T00:00:00Z', 'end': '2025-02-01T00:00:00Z'}
+        for params in (ventana, {}):
+            with self.subTest(params=params):
+                respuesta = self.client.get('/api/events/', {**params, 'page_size': 5, 'cursor': cursor})
+                self.assertEqual(respuesta.status_code, 404)
+
+    def test_intervalo_enorme(self):
+        datos = {'Titulo': 'Cada 4 millones de años', 'FechaInicio': '2025-01-01T09:00:00Z',
+                 'Frecuencia': 'SEMANAL', 'Intervalo': 200000000}
+        respuesta = self.client.post('/api/events/create/', datos, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('Intervalo', respuesta.json())
+
+        texto = ('BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\nSUMMARY:Importada\r\nDTSTART:20250101T090000Z\r\n'
+                 'RRULE:FREQ=WEEKLY;INTERVAL=200000000\r\nEND:VEVENT\r\nEND:VCALENDAR\r\n')
+        ics.importar(self.user, texto.splitlines(keepends=True))
+        self.assertEqual(Evento.objects.get(Titulo='Importada').Intervalo, MAX_INTERVALO)
+
+        # Las filas que ya estén guardadas con un intervalo así no rompen los listados
+        Evento.objects.create(Usuario=self.user, Titulo='Vieja', FechaInicio=_utc(2024, 1, 1, 9),
+                              Frecuencia='SEMANAL', Intervalo=200000000)
+        ventana = {'start': '2025-03-01T00:00:00Z', 'end': '2025-04-01T00:00:00Z'}
+        self.assertEqual(self.client.get('/api/events/', ventana).status_code, 200)
+        self.assertEqual(self.client.get('/api/freebusy/', ventana).status_code, 200)
+
+
+class PeticionCondicionalTests(ApiTestCase):
+    """
+    Los listados responden 304 cuando el ETag del cliente sigue vigente.
+    """
+
+    def test_event_list_304(self):
+        self._crear_eventos(2)
+        response = self.client.get('/api/events/')
+        etag = response['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/events/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        Evento.objects.filter(Usuario=self.user).first().save()
+        response = self.client.get('/api/events/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_reminders_list_etag_cambia_con_eliminacion(self):
+        self._crear_eventos(2)
+        etag = self.client.get('/api/reminders/')['ETag']
+        Recordatorio.objects.filter(Evento__Usuario=self.user).first().delete()
+        response = self.client.get('/api/reminders/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since_no_oculta_eliminaciones(self):
+        self._crear_eventos(3)
+        response = self.client.get('/api/events/')
+        self.assertNotIn('Last-Modified', response)
+        # Se borra un evento que no es el último modificado
+        Evento.objects.filter(Usuario=self.user).order_by('ActualizadoEn').first().delete()
+        response = self.client.get('/api/events/', HTTP_IF_MODIFIED_SINCE='Wed, 21 Oct 2099 07:28:00 GMT')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+
+
+class CacheListadoEventosTests(ApiTestCase):
+    """
+    El listado de eventos se sirve desde caché hasta que una escritura lo invalida.
+    """
+
+    def test_acierto_e_invalidacion(self):
+        self._crear_eventos(3)
+        self.assertEqual(len(self.client.get('/api/events/').json()), 3)
+        with self.assertNumQueries(1):
+            # Solo la versión del listado; el listado sale de la caché
+            self.assertEqual(len(self.client.get('/api/events/').json()), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Evento.objects.filter(Usuario=self.user).first().delete()
+        self.assertEqual(len(self.client.get('/api/events/').json()), 2)
+
+    def test_borrado_en_cascada_no_consulta_por_recordatorio(self):
+        def consultas_al_borrar(cantidad):
+            Evento.objects.all().delete()
+            self._crear_eventos(cantidad)
+            with CaptureQueriesContext(connection) as consultas:
+                Evento.objects.filter(Usuario=self.user).delete()
+            return len(consultas)
+
+        self.assertEqual(consultas_al_borrar(3), consultas_al_borrar(30))
+
+    def test_endpoint_masivo_invalida(self):
+        self._crear_eventos(1)
+        self.client.get('/api/events/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/events/bulk/', {
+                'create': [{'Titulo': 'Nuevo', 'FechaInicio': '2025-02-01T10:00:00Z'}],
+            }, format='json')
+        self.assertEqual(len(self.client.get('/api/events/').json()), 2)
+
+
+class EventosMasivosTests(ApiTestCase):
+    """
+    Endpoint masivo: errores por elemento, actualizaciones parciales e ids inválidos.
+    """
+
+    def _lote(self, **operaciones):
+        return self.client.post('/api/events/bulk/', operaciones, format='json')
+
+    def test_errores_por_elemento(self):
+        data = self._lote(create=[
+            {'Titulo': 'Bien', 'FechaInicio': '2025-02-01T10:00:00Z',
+             'recordatorios': [{'TipoAviso': 'EMAIL', 'TiempoAntes': 10, 'UnidadTiempo': 'MINUTOS'}]},
+            {'FechaInicio': '2025-02-01T10:00:00Z'},
+        ]).json()['create']
+        self.assertEqual([r['status'] for r in data], ['created', 'error'])
+        self.assertIn('Titulo', data[1]['errors'])
+        self.assertEqual(Recordatorio.objects.filter(Evento_id=data[0]['id']).count(), 1)
+
+    def test_actualizacion_parcial_usa_los_valores_guardados(self):
+        serie = Evento.objects.create(Usuario=self.user, Titulo='Serie', FechaInicio=_utc(2025, 1, 1, 9),
+                                      Frecuencia='DIARIA', RepetirVeces=10)
+        data = self._lote(update=[
+            {'id': serie.pk, 'RepetirVeces': 3},
+            {'id': serie.pk, 'RepetirHasta': '2025-02-01T00:00:00Z'},
+            {'id': serie.pk, 'Titulo': 'Otro', 'recordatorios': []},
+        ]).json()['update']
+        self.assertEqual([r['status'] for r in data], ['updated', 'error', 'error'])
+        self.assertIn('no ambos', str(data[1]['errors']))
+        self.assertIn('recordatorios', data[2]['errors'])
+        serie.refresh_from_db()
+        self.assertEqual((serie.RepetirVeces, serie.RepetirHasta, serie.Titulo), (3, None, 'Serie'))
+        self.assertEqual(serie.FinSerie, _utc(2025, 1, 3, 9))
+
+    def test_ids_invalidos(self):
+        for item in ({'id': [1]}, {'id': '1'}, 5):
+            self.assertEqual(self._lote(update=[item]).status_code, 400)
+        self.assertEqual(self._lote(delete=['1']).status_code, 400)
+        data = self._lote(update=[{'id': 999999, 'Titulo': 'X'}]).json()['update']
+        self.assertEqual(data[0]['errors'], {'id': ['Evento no encontrado.']})
+
+
+class DisponibilidadTests(ApiTestCase):
+    """
+    Free/busy devuelve bloques fusionados y create_event puede rechazar solapamientos.
+    """
+
+    def _evento(self, inicio, horas, **extra):
+        fecha = datetime(2025, 3, 3, inicio, tzinfo=dt_timezone.utc)
+        return Evento.objects.create(
+            Usuario=self.user, Titulo='Ocupado', FechaInicio=fecha,
+            FechaFin=fecha + timedelta(hours=horas), **extra
+        )
+
+    def test_bloques_fusionados(self):
+        self._evento(9, 2)
+        self._evento(10, 2)
+        self._evento(14, 1)
+        self._evento(16, 1, Estado='CANCELADO')
+        data = self.client.get('/api/freebusy/', {
+            'start': '2025-03-03T00:00:00Z', 'end': '2025-03-04T00:00:00Z',
+        }).json()
+        self.assertEqual(data['ocupado'], [
+            {'inicio': '2025-03-03T09:00:00Z', 'fin': '2025-03-03T12:00:00Z'},
+            {'inicio': '2025-03-03T14:00:00Z', 'fin': '2025-03-03T15:00:00Z'},
+        ])
+
+    def test_comprobacion_por_lotes_con_series(self):
+        self._evento(9, 1, Frecuencia='DIARIA', RepetirVeces=5)
+        with self.assertNumQueries(1):
+            data = self.client.post('/api/freebusy/check/', {'candidatos': [
+                {'FechaInicio': '2025-03-05T09:30:00Z', 'FechaFin': '2025-03-05T10:30:00Z'},
+                {'FechaInicio': '2025-03-05T10:00:00Z', 'FechaFin': '2025-03-05T11:00:00Z'},
+                {'FechaInicio': '2025-03-09T09:00:00Z'},
+            ]}, format='json').json()
+        self.assertEqual([c['conflicto'] for c in data], [True, False, False])
+
+    def test_create_event_rechaza_conflictos(self):
+        self._evento(9, 2)
+        evento = {'Titulo': 'Choca', 'FechaInicio': '2025-03-03T10:00:00Z', 'FechaFin': '2025-03-03T10:30:00Z'}
+        response = self.client.post('/api/events/create/?conflicts=reject', evento, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(len(response.json()['conflictos']), 1)
+        response = self.client.post('/api/events/create/', evento, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_ventana_acotada_y_eventos_extensos(self):
+        self._evento(9, 1)
+        largo = self._evento(8, 24 * 10)
+        serie = self._evento(7, 1, Frecuencia='SEMANAL')
+        self._evento(6, 1).delete()
+        inicio = datetime(2025, 3, 10, tzinfo=dt_timezone.utc)
+        eventos = filtrar_por_ventana(Evento.objects.filter(Usuario=self.user), inicio, inicio + timedelta(days=1))
+        self.assertEqual({evento.pk for evento in eventos}, {largo.pk, serie.pk})
+
+        if connection.vendor == 'sqlite':
+            # Los eventos cortos se buscan con un rango de FechaInicio acotado por abajo
+            # (el costo no crece con el historial) y los extensos por su propio índice
+            plan = eventos.explain()
+            self.assertIn('evento_usuario_inicio_idx (Usuario_id=? AND FechaInicio>? AND FechaInicio<?)', plan)
+            self.assertIn('evento_usuario_extenso_idx (Usuario_id=? AND Extenso=?', plan)
+
+
+class DensidadTests(ApiTestCase):
+    """
+    La vista anual recibe conteos por día/mes en la zona pedida, incluidas las series.
+    """
+
+    def test_conteos_por_dia_y_mes(self):
+        utc = dt_timezone.utc
+        # 23:30 UTC del 31 de enero ya es 1 de febrero en Madrid
+        Evento.objects.create(Usuario=self.user, Titulo='Tarde', FechaInicio=datetime(2025, 1, 31, 23, 30, tzinfo=utc))
+        Evento.objects.create(Usuario=self.user, Titulo='Mañana', FechaInicio=datetime(2025, 2, 1, 9, tzinfo=utc))
+        Evento.objects.create(
+            Usuario=self.user, Titulo='Serie', FechaInicio=datetime(2025, 2, 1, 12, tzinfo=utc),
+            Frecuencia='SEMANAL', RepetirVeces=3,
+        )
+        Evento.objects.create(Usuario=self.user, Titulo='Otro año', FechaInicio=datetime(2024, 6, 1, tzinfo=utc))
+
+        data = self.client.get('/api/events/density/', {'year': 2025, 'tz': 'Europe/Madrid'}).json()
+        self.assertEqual(data['dias'], {'2025-02-01': 3, '2025-02-08': 1, '2025-02-15': 1})
+        self.assertEqual(data['meses'], {'2025-02': 5})
+
+        data = self.client.get('/api/events/density/', {'year': 2025, 'tz': 'UTC'}).json()
+        self.assertEqual(data['meses'], {'2025-01': 1, '2025-02': 4})
+        self.assertEqual(self.client.get('/api/events/density/', {'tz': 'Marte/Base'}).status_code, 400)
+
+    def test_anios_extremos(self):
+        Evento.objects.create(
+            Usuario=self.user, Titulo='Serie', FechaInicio=datetime(2025, 2, 1, 12, tzinfo=dt_timezone.utc),
+            Frecuencia='DIARIA',
+        )
+        for anio, zona, estado in (
+            (1, 'Asia/Tokyo', 400), (9998, 'UTC', 400), (9998, 'Pacific/Kiritimati', 400),
+            (2, 'Asia/Tokyo', 200), (2, 'Pacific/Kiritimati', 200),
+            (9997, 'America/Adak', 200), (9997, 'Pacific/Kiritimati', 200),
+        ):
+            with self.subTest(anio=anio, zona=zona):
+                respuesta = self.client.get('/api/events/density/', {'year': anio, 'tz': zona})
+                self.assertEqual(respuesta.status_code, estado)
+
+
+class ZonaHorariaTests(ApiTestCase):
+    """
+    Con una zona en el perfil, los listados y las ventanas por día usan la hora local.
+    """
+
+    def test_perfil_cambia_fechas_y_ventanas(self):
+        # 03:00 UTC del 2 de marzo es todavía 1 de marzo en Managua (UTC-6)
+        Evento.objects.create(
+            Usuario=self.user, Titulo='Noche', FechaInicio=datetime(2025, 3, 2, 3, tzinfo=dt_timezone.utc)
+        )
+        self.assertEqual(self.client.get('/api/events/').json()[0]['FechaInicio'], '2025-03-02T03:00:00Z')
+
+        response = self.client.patch('/api/profile/', {'ZonaHoraria': 'America/Managua'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access']}")
+
+        with self.assertNumQueries(2):
+            data = self.client.get('/api/events/', {'start': '2025-03-01', 'end': '2025-03-02'}).json()
+        self.assertEqual([evento['FechaInicio'] for evento in data], ['2025-03-01T21:00:00-06:00'])
+        self.assertEqual(self.client.patch('/api/profile/', {'ZonaHoraria': 'Marte/Base'}, format='json').status_code, 400)
+
+
+class IcsTests(ApiTestCase):
+    """
+    Importación y exportación iCalendar: RRULE, EXDATE, VALARM y TZID sobreviven al viaje
+    de ida y vuelta; COUNT=0 se rechaza y cada lote se confirma por separado.
+    """
+
+    CALENDARIO = (
+        'BEGIN:VCALENDAR\r\nVERSION:2.0\r\n'
+        'BEGIN:VEVENT\r\n'
+        'UID:reunion@example.com\r\n'
+        'SUMMARY:Reunión\\, equipo\\; quincenal\r\n'
+        'DTSTART;TZID=Europe/Madrid:20250317T090000\r\n'
+        'DTEND;TZID=Europe/Madrid:20250317T100000\r\n'
+        'RRULE:FREQ=WEEKLY;INTERVAL=2;COUNT=4\r\n'
+        'EXDATE;TZID=Europe/Madrid:20250414T090000\r\n'
+        'BEGIN:VALARM\r\nACTION:EMAIL\r\nTRIGGER:-PT30M\r\nEND:VALARM\r\n'
+        'BEGIN:VALARM\r\nACTION:DISPLAY\r\nTRIGGER:-P1D\r\nEND:VALARM\r\n'
+        'END:VEVENT\r\n'
+        'END:VCALENDAR\r\n'
+    )
+
+    def _importar(self, texto):
+        archivo = SimpleUploadedFile('calendario.ics', texto.encode(), content_type='text/calendar')
+        return self.client.post('/api/events/ics/import/', {'file': archivo}, format='multipart')
+
+    def _inicios_en_madrid(self, evento):
+        madrid = ZoneInfo('Europe/Madrid')
+        with timezone.override(madrid):
+            ocurrencias = evento.ocurrencias(_utc(2025, 1, 1), _utc(2026, 1, 1))
+            return [timezone.localtime(inicio, madrid).strftime('%m-%d %H:%M') for inicio, _ in ocurrencias]
+
+    def _campos(self, evento):
+        return (
+            evento.Titulo, evento.FechaInicio, evento.FechaFin, evento.Frecuencia, evento.Intervalo,
+            evento.RepetirVeces, {datetime.fromisoformat(fecha) for fecha in evento.Excepciones},
+            sorted(evento.recordatorios.values_list('TipoAviso', 'TiempoAntes', 'UnidadTiempo')),
+        )
+
+    def test_ida_y_vuelta(self):
+        respuesta = self._importar(self.CALENDARIO)
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.json(), {'eventos': 1, 'recordatorios': 2, 'errores': []})
+
+        evento = Evento.objects.get()
+        self.assertEqual(evento.Titulo, 'Reunión, equipo; quincenal')
+        # TZID: las 09:00 de Madrid en invierno son las 08:00 UTC
+        self.assertEqual(evento.FechaInicio, _utc(2025, 3, 17, 8))
+        self.assertEqual((evento.Frecuencia, evento.Intervalo, evento.RepetirVeces), ('SEMANAL', 2, 4))
+        # La serie conserva la hora local al pasar al horario de verano y omite el EXDATE
+        self.assertEqual(self._inicios_en_madrid(evento), ['03-17 09:00', '03-31 09:00', '04-28 09:00'])
+        originales = self._campos(evento)
+        self.assertEqual(originales[-1], [('EMAIL', 30, 'MINUTOS'), ('NOTIFICACION_APP', 1, 'DIAS')])
+
+        respuesta = self.client.get('/api/events/ics/')
+        exportado = b''.join(respuesta.streaming_content).decode()
+        self.assertIn('RRULE:FREQ=WEEKLY;INTERVAL=2;COUNT=4\r\n', exportado)
+        self.assertIn('EXDATE:20250414T070000Z\r\n', exportado)
+        self.assertIn('TRIGGER:-PT30M\r\n', exportado)
+        self.assertIn('TRIGGER:-P1D\r\n', exportado)
+
+        Evento.objects.all().delete()
+        self.assertEqual(self._importar(exportado).json()['eventos'], 1)
+        evento = Evento.objects.get()
+        self.assertEqual(self._campos(evento), originales)
+        self.assertEqual(self._inicios_en_madrid(evento), ['03-17 09:00', '03-31 09:00', '04-28 09:00'])
+
+    def test_count_cero_se_rechaza(self):
+        texto = self.CALENDARIO.replace('COUNT=4', 'COUNT=0')
+        self.assertEqual(self._importar(texto).json()['errores'], ['RRULE con COUNT=0 (Reunión, equipo; quincenal)'])
+        self.assertFalse(Evento.objects.exists())
+
+        respuesta = self.client.post('/api/events/create/', {
+            'Titulo': 'Sin repeticiones', 'FechaInicio': '2025-03-17T09:00:00Z',
+            'Frecuencia': 'DIARIA', 'RepetirVeces': 0,
+        }, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('RepetirVeces', respuesta.json())
+
+    def test_cada_lote_se_confirma_por_separado(self):
+        evento = self.CALENDARIO[self.CALENDARIO.index('BEGIN:VEVENT'):self.CALENDARIO.index('END:VCALENDAR')]
+        texto = 'BEGIN:VCALENDAR\r\n' + evento * 3 + 'END:VCALENDAR\r\n'
+        guardar = ics._guardar_lote
+        lotes = []
+
+        def fallar_en_el_segundo(usuario, lote):
+            lotes.append(lote)
+            if len(lotes) == 2:
+                raise RuntimeError('disco lleno')
+            return guardar(usuario, lote)
+
+        with mock.patch('api.ics._guardar_lote', side_effect=fallar_en_el_segundo):
+            with self.assertRaises(RuntimeError):
+                ics.importar(self.user, texto.splitlines(keepends=True), tamano_lote=2)
+        self.assertEqual(Evento.objects.count(), 2)
+        self.assertEqual(Recordatorio.objects.count(), 4)
+
+
+class SincronizacionTests(ApiTestCase):
+    """
+    /api/sync/: delta por token, lápidas de lo borrado, resincronización completa y el
+    margen que vuelve a entregar las escrituras confirmadas tarde.
+    """
+
+    INICIO = _utc(2025, 6, 1, 12)
+
+    def _en(self, momento):
+        return mock.patch('django.utils.timezone.now', return_value=momento)
+
+    def _evento(self, titulo, momento):
+        with self._en(momento):
+            evento = Evento.objects.create(Usuario=self.user, Titulo=titulo, FechaInicio=self.INICIO + timedelta(days=7))
+            for minutos in (15, 60):
+                Recordatorio.objects.create(Evento=evento, TipoAviso='EMAIL', TiempoAntes=minutos, UnidadTiempo='MINUTOS')
+        return evento
+
+    def _sync(self, momento, desde=None):
+        with self._en(momento):
+            return sync.cambios_desde(self.user, desde)
+
+    def test_delta_y_lapidas(self):
+        borrado = self._evento('Se borra', self.INICIO)
+        borrado_id = borrado.pk
+        editado = self._evento('Se edita', self.INICIO)
+        completo = self._sync(self.INICIO + timedelta(minutes=1))
+        self.assertTrue(completo['completo'])
+        self.assertEqual(len(completo['eventos']), 2)
+        self.assertEqual(len(completo['recordatorios']), 4)
+        desde = sync.leer_token(completo['token'])
+
+        # Confirmada 2 s antes de la respuesta pero no vista por ella: el margen la recupera
+        tardio = self._evento('Confirmado tarde', self.INICIO + timedelta(minutes=1) - timedelta(seconds=2))
+        sin_cambios = self._evento('Sin cambios', self.INICIO - timedelta(minutes=5))
+        with self._en(self.INICIO + timedelta(minutes=10)):
+            editado.Titulo = 'Editado'
+            editado.save()
+            recordatorio_id = editado.recordatorios.first().pk
+            Recordatorio.objects.get(pk=recordatorio_id).delete()
+            borrado.delete()
+
+        delta = self._sync(self.INICIO + timedelta(minutes=11), desde)
+        self.assertFalse(delta['completo'])
+        self.assertEqual(sorted(fila['id'] for fila in delta['eventos']), [editado.pk, tardio.pk])
+        self.assertNotIn(sin_cambios.pk, [fila['Evento'] for fila in delta['recordatorios']])
+        # El borrado en cascada de los recordatorios lo cubre la lápida del evento
+        self.assertEqual(delta['eliminados'], {'eventos': [borrado_id], 'recordatorios': [recordatorio_id]})
+        self.assertEqual(Eliminacion.objects.count(), 2)
+
+    def test_token_viejo_o_invalido(self):
+        self._evento('Dentista', self.INICIO)
+        self._evento('Se borra', self.INICIO).delete()
+        viejo = self.INICIO - sync.RETENCION_ELIMINACIONES - timedelta(minutes=1)
+        datos = self._sync(self.INICIO, viejo)
+        self.assertTrue(datos['completo'])
+        self.assertEqual(len(datos['eventos']), 1)
+        self.assertEqual(datos['eliminados'], {'eventos': [], 'recordatorios': []})
+
+        self.assertEqual(self.client.get('/api/sync/', {'token': 'no-es-un-token'}).status_code, 400)
+        datos = self.client.get('/api/sync/').json()
+        self.assertTrue(datos['completo'])
+        datos = self.client.get('/api/sync/', {'token': datos['token']}).json()
+        self.assertFalse(datos['completo'])
+
+        self.assertEqual(sync.purgar_eliminaciones(timezone.now() + sync.RETENCION_ELIMINACIONES + timedelta(days=1)), 1)
+        self.assertFalse(Eliminacion.objects.exists())
+
+    def test_borrados_masivos_escriben_las_lapidas_de_una_vez(self):
+        ids = [self._evento(f'Evento {i}', self.INICIO).pk for i in range(30)]
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.post('/api/events/bulk/', {'delete': ids[:20]}, format='json')
+        self.assertEqual(respuesta.status_code, 200)
+        inserciones = [q['sql'] for q in consultas.captured_queries if q['sql'].startswith('INSERT INTO "api_eliminacion"')]
+        self.assertEqual(len(inserciones), 1)
+
+        modelo_admin = EventoAdmin(Evento, admin.site)
+        modelo_admin.delete_queryset(RequestFactory().post('/'), Evento.objects.filter(id__in=ids[20:]))
+        self.assertEqual(sorted(Eliminacion.objects.values_list('ObjetoId', flat=True)), ids)
+        self.assertEqual(sorted(self._sync(self.INICIO + timedelta(days=1), self.INICIO)['eliminados']['eventos']), ids)
+
+    def test_borrar_la_cuenta_no_deja_lapidas(self):
+        self._evento('Dentista', self.INICIO)
+        self.user.delete()
+        self.assertFalse(Evento.objects.exists())
+        self.assertFalse(Eliminacion.objects.exists())
+
+
+class BusquedaTests(ApiTestCase):
+    """
+    La búsqueda usa el índice de texto completo: prefijos, acentos y ranking.
+    """
+
+    def test_prefijos_ranking_y_sincronizacion(self):
+        inicio = datetime(2025, 4, 1, 9, tzinfo=dt_timezone.utc)
+        descripcion = Evento.objects.create(
+            Usuario=self.user, Titulo='Almuerzo', Descripcion='Hablar de la reunión anual', FechaInicio=inicio
+        )
+        titulo = Evento.objects.create(Usuario=self.user, Titulo='Reunión de equipo', FechaInicio=inicio)
+        otro = User.objects.create_user('luis', 'luis@example.com', 'secreta123')
+        Evento.objects.create(Usuario=otro, Titulo='Reunión ajena', FechaInicio=inicio)
+
+        data = self.client.get('/api/events/search/', {'q': 'reun'}).json()
+        self.assertEqual([evento['id'] for evento in data], [titulo.id, descripcion.id])
+
+        titulo.Titulo = 'Cena'
+        titulo.save()
+        Evento.objects.filter(pk=descripcion.pk).update(Ubicacion='Oficina central')
+        self.assertEqual([e['id'] for e in self.client.get('/api/events/search/', {'q': 'reunion'}).json()], [descripcion.id])
+        self.assertEqual([e['id'] for e in self.client.get('/api/events/search/', {'q': 'ofic cent'}).json()], [descripcion.id])
+        self.assertEqual(self.client.get('/api/events/search/', {'q': '***'}).status_code, 400)
+
+    def test_busqueda_del_admin_sin_limite_y_por_usuario(self):
+        inicio = datetime(2025, 4, 1, 9, tzinfo=dt_timezone.utc)
+        Evento.objects.bulk_create(
+            Evento(Usuario=self.user, Titulo=f'Reunión {i}', FechaInicio=inicio) for i in range(1005)
+        )
+        otro = User.objects.create_user('luisa_martinez', 'luisa@example.com', 'secreta123')
+        Evento.objects.create(Usuario=otro, Titulo='Cena', FechaInicio=inicio)
+
+        modelo_admin = EventoAdmin(Evento, admin.site)
+        request = RequestFactory().get('/admin/api/evento/')
+        resultados, _ = modelo_admin.get_search_results(request, Evento.objects.all(), 'reun')
+        self.assertEqual(resultados.count(), 1005)
+        resultados, _ = modelo_admin.get_search_results(request, Evento.objects.all(), 'luisa')
+        self.assertEqual(list(resultados.values_list('Titulo', flat=True)), ['Cena'])
+
+    def test_check_detecta_triggers_faltantes(self):
+        self.assertEqual(busqueda.comprobar_triggers(databases=['default']), [])
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER api_evento_fts_au')
+        errores = busqueda.comprobar_triggers(databases=['default'])
+        self.assertEqual([error.id for error in errores], ['api.E001'])
+        self.assertIn('api_evento_fts_au', errores[0].msg)
+
+
+class VistasAsincronasTests(ApiTestCase):
+    """
+    Lecturas con el ORM asíncrono y flujo SSE de notificaciones.
+    """
+
+    async def test_listados_asincronos(self):
+        await sync_to_async(self._crear_eventos)(3)
+        cliente = AsyncClient()
+        cabeceras = {'Authorization': f'Bearer {self.access}'}
+        response = await cliente.get('/api/async/events/', headers=cabeceras)
+        self.assertEqual(len(response.json()), 3)
+        self.assertEqual(len((await cliente.get('/api/async/reminders/', headers=cabeceras)).json()), 3)
+
+        response = await cliente.get(
+            '/api/async/events/', headers={**cabeceras, 'If-None-Match': response['ETag']}
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual((await cliente.get('/api/async/events/')).status_code, 401)
+
+    @override_settings(SSE_INTERVALO=0.01)
+    async def test_flujo_reenvia_perdidas_y_difunde_nuevas(self):
+        perdida = await Notificacion.objects.acreate(Usuario=self.user, Mensaje='Perdida')
+        flujo = notificaciones.flujo(self.user.pk, ultimo_id=perdida.pk - 1)
+        self.assertTrue((await anext(flujo)).startswith('retry:'))
+        self.assertIn('"Perdida"', await anext(flujo))
+
+        otro = await sync_to_async(User.objects.create_user)('luis', 'luis@example.com', 'secreta123')
+        await Notificacion.objects.acreate(Usuario=otro, Mensaje='Ajena')
+        nueva = await Notificacion.objects.acreate(Usuario=self.user, Mensaje='Nueva')
+        evento = await anext(flujo)
+        self.assertTrue(evento.startswith(f'id: {nueva.pk}\n'))
+        self.assertIn('"Nueva"', evento)
+        await flujo.aclose()
+
+    @override_settings(SSE_INTERVALO=0.01)
+    async def test_difusor_sobrevive_a_un_fallo_y_arranca_una_sola_tarea(self):
+        repartidor = notificaciones.Difusor()
+        with mock.patch('api.notificaciones.asyncio.create_task', wraps=asyncio.create_task) as crear:
+            colas = await asyncio.gather(*(repartidor.suscribir(self.user.pk) for _ in range(5)))
+        self.assertEqual(crear.call_count, 1)
+        tarea = repartidor._tarea
+
+        original = repartidor._repartir_nuevas
+        fallos = []
+
+        async def fallar_una_vez():
+            if not fallos:
+                fallos.append(1)
+                raise ConnectionError('base de datos caída')
+            await original()
+
+        with mock.patch.object(repartidor, '_repartir_nuevas', side_effect=fallar_una_vez):
+            with self.assertLogs('api.notificaciones', 'ERROR'):
+                await asyncio.sleep(0.05)
+            nueva = await Notificacion.objects.acreate(Usuario=self.user, Mensaje='Tras el fallo')
+            notificacion = await asyncio.wait_for(colas[0].get(), timeout=1)
+        self.assertEqual(notificacion['id'], nueva.pk)
+        self.assertFalse(tarea.done())
+        tarea.cancel()
+
+
+@override_settings(METRICAS_ACTIVAS=True, METRICAS_TOKEN=None)
+class MetricasTests(ApiTestCase):
+    """
+    Con las métricas activas cada respuesta trae Server-Timing y /api/metrics/ acumula por vista.
+    """
+
+    def setUp(self):
+        super().setUp()
+        metricas.registro.limpiar()
+
+    def test_server_timing_y_prometheus(self):
+        self._crear_eventos(2)
+        response = self.client.get('/api/events/')
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('desc="2 consultas"', response['Server-Timing'])
+
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        texto = self.client.get('/api/metrics/').content.decode()
+        self.assertIn('calender_http_requests_total{vista="event_list",metodo="GET",estado="200"} 1', texto)
+        self.assertIn('calender_db_queries_total{vista="event_list"} 2', texto)
+
+    def test_acceso_a_las_metricas(self):
+        # Sin token solo entra un usuario staff con sesión; el JWT de un usuario normal no basta
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+
+        with override_settings(METRICAS_TOKEN='s3creto'):
+            anonimo = APIClient()
+            self.assertEqual(anonimo.get('/api/metrics/').status_code, 401)
+            respuesta = anonimo.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer s3creto')
+            self.assertEqual(respuesta.status_code, 200)
+
+    async def test_cuenta_consultas_del_orm_asincrono(self):
+        await sync_to_async(self._crear_eventos)(2)
+        response = await AsyncClient().get('/api/async/events/', headers={'Authorization': f'Bearer {self.access}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('desc="0 consultas"', response['Server-Timing'])
+        texto = metricas.registro.prometheus()
+        self.assertIn('calender_http_requests_total{vista="event_list_async",metodo="GET",estado="200"} 1', texto)
+        self.assertNotIn('calender_db_queries_total{vista="event_list_async"} 0', texto)
+
+    async def test_middleware_asincrono(self):
+        async def vista(request):
+            return HttpResponse(str([evento.Titulo async for evento in Evento.objects.all()]))
+
+        middleware = metricas.MetricasMiddleware(vista)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = await middleware(RequestFactory().get('/'))
+        self.assertIn('desc="1 consultas"', response['Server-Timing'])
+
+    def test_aviso_n_mas_1(self):
+        self._crear_eventos(6)
+        # Acceder a evento.Usuario sin select_related hace una consulta por evento
+        middleware = metricas.MetricasMiddleware(
+            lambda request: HttpResponse(str([evento.Usuario.username for evento in Evento.objects.all()]))
+        )
+        with self.assertLogs('api.metricas', 'WARNING') as logs:
+            middleware(RequestFactory().get('/'))
+        self.assertIn('Posible N+1', logs.output[0])
+
+
+class FechaEnvioTests(ApiTestCase):
+    """
+    Recordatorio.FechaEnviado se calcula al guardar y se recalcula en bloque al reprogramar el evento.
+    """
+
+    def _evento(self, recordatorios, dentro=timedelta(days=3)):
+        evento = Evento.objects.create(Usuario=self.user, Titulo='Cita', FechaInicio=timezone.now() + dentro)
+        for minutos in range(1, recordatorios + 1):
+            Recordatorio.objects.create(Evento=evento, TipoAviso='EMAIL', TiempoAntes=minutos, UnidadTiempo='MINUTOS')
+        return Evento.objects.get(pk=evento.pk)
+
+    def _reprogramar(self, evento, delta):
+        evento.FechaInicio += delta
+        with CaptureQueriesContext(connection) as consultas:
+            evento.save()
+        return len(consultas)
+
+    def test_se_calcula_al_guardar(self):
+        evento = self._evento(0)
+        recordatorio = Recordatorio.objects.create(Evento=evento, TipoAviso='EMAIL', TiempoAntes=2, UnidadTiempo='HORAS')
+        self.assertEqual(recordatorio.FechaEnviado, evento.FechaInicio - timedelta(hours=2))
+        recordatorio.TiempoAntes, recordatorio.UnidadTiempo = 1, 'DIAS'
+        recordatorio.save()
+        recordatorio.refresh_from_db()
+        self.assertEqual(recordatorio.FechaEnviado, evento.FechaInicio - timedelta(days=1))
+
+    def test_reprogramar_cuesta_lo_mismo_con_muchos_recordatorios(self):
+        pocos, muchos = self._evento(2), self._evento(20)
+        consultas = self._reprogramar(pocos, timedelta(hours=1))
+        muchos.FechaInicio += timedelta(hours=1)
+        with self.assertNumQueries(consultas):
+            muchos.save()
+        fechas = set(muchos.recordatorios.values_list('FechaEnviado', 'TiempoAntes'))
+        self.assertEqual(fechas, {(muchos.FechaInicio - timedelta(minutes=m), m) for m in range(1, 21)})
+
+    def test_reprogramar_vuelve_a_pendiente(self):
+        evento = self._evento(2, dentro=timedelta(minutes=30))
+        enviado, fallido = evento.recordatorios.order_by('TiempoAntes')
+        Recordatorio.objects.filter(pk=enviado.pk).update(Estado='ENVIADO')
+        Recordatorio.objects.filter(pk=fallido.pk).update(Estado='FALLIDO')
+
+        # Hacia el pasado los avisos ya procesados no se repiten
+        self._reprogramar(evento, -timedelta(days=1))
+        self.assertEqual(sorted(evento.recordatorios.values_list('Estado', flat=True)), ['ENVIADO', 'FALLIDO'])
+
+        self._reprogramar(evento, timedelta(days=2))
+        self.assertEqual(set(evento.recordatorios.values_list('Estado', flat=True)), {'PENDIENTE'})
+        self.assertEqual(AvisoProximo.objects.filter(Evento=evento).count(), 2)
+
+
+class AvisosProximosTests(ApiTestCase):
+    """
+    La tabla AvisoProximo sigue a las escrituras, alimenta /api/reminders/upcoming/ y la cola
+    del despachador, y el comando de horizonte la completa y la poda.
+    """
+
+    def _evento(self, titulo, dentro):
+        evento = Evento.objects.create(Usuario=self.user, Titulo=titulo, FechaInicio=timezone.now() + dentro)
+        Recordatorio.objects.create(Evento=evento, TipoAviso='NOTIFICACION_APP', TiempoAntes=1, UnidadTiempo='HORAS')
+        return evento
+
+    def test_escrituras_y_lectura(self):
+        evento = self._evento('Dentista', timedelta(days=2))
+        self._evento('Lejano', timedelta(days=90))
+        self.assertEqual(AvisoProximo.objects.count(), 1)
+
+        evento.Titulo = 'Dentista (confirmado)'
+        evento.save()
+        evento.FechaInicio += timedelta(hours=3)
+        evento.save()
+        aviso = AvisoProximo.objects.get()
+        self.assertEqual(aviso.Titulo, 'Dentista (confirmado)')
+        self.assertEqual(aviso.FechaEnviado, evento.FechaInicio - timedelta(hours=1))
+
+        with self.assertNumQueries(1):
+            datos = self.client.get('/api/reminders/upcoming/').json()
+        self.assertEqual([fila['Titulo'] for fila in datos], ['Dentista (confirmado)'])
+
+        evento.delete()
+        self.assertFalse(AvisoProximo.objects.exists())
+
+    def test_despacho_horizonte_y_poda(self):
+        vencido = self._evento('Ahora', timedelta(minutes=30))
+        lejano = self._evento('Lejano', timedelta(days=60))
+        self.assertEqual(dispatch.procesar_pendientes(ahora=timezone.now()), (1, 0))
+        self.assertFalse(AvisoProximo.objects.exists())
+        self.assertEqual(vencido.recordatorios.get().Estado, 'ENVIADO')
+
+        # Pasado el tiempo, el horizonte alcanza al recordatorio lejano
+        despues = timezone.now() + timedelta(days=45)
+        self.assertEqual(avisos.extender_horizonte(despues), 1)
+        # Si nadie lo despacha a tiempo, la poda lo caduca y lo deja registrado
+        with self.assertLogs('api.dispatch', 'WARNING'):
+            self.assertEqual(avisos.podar_avisos(despues + timedelta(days=20)), 1)
+        self.assertFalse(AvisoProximo.objects.exists())
+        self.assertEqual(lejano.recordatorios.get().Estado, 'FALLIDO')
+
+    def test_horizonte_no_materializa_avisos_caducados(self):
+        viejo = self._evento('Viejo', -timedelta(days=3))
+        AvisoProximo.objects.all().delete()
+        self.assertEqual(avisos.extender_horizonte(), 0)
+        self.assertFalse(AvisoProximo.objects.exists())
+        self.assertEqual(viejo.recordatorios.get().Estado, 'PENDIENTE')
+
+    def test_worker_corre_el_horizonte_cada_hora(self):
+        reloj = [0]
+
+        def dormir(segundos):
+            if reloj[0] >= 3 * 3600:
+                raise KeyboardInterrupt
+            reloj[0] += 1800
+
+        comando = 'api.management.commands.enviar_recordatorios'
+        with mock.patch(f'{comando}.extender_horizonte', return_value=0) as extender, \
+                mock.patch(f'{comando}.time.monotonic', side_effect=lambda: reloj[0]), \
+                mock.patch(f'{comando}.time.sleep', side_effect=dormir):
+            call_command('enviar_recordatorios', intervalo=1800, stdout=StringIO())
+        # Al arrancar y a la 1 h, 2 h y 3 h de un worker que siguió corriendo
+        self.assertEqual(extender.call_count, 4)
+
+
+class DespachoTests(ApiTestCase):
+    """
+    El worker no envía avisos vencidos hace más que la gracia: los marca FALLIDO.
+    """
+
+    def test_no_envia_avisos_de_eventos_viejos(self):
+        viejo = Evento.objects.create(
+            Usuario=self.user, Titulo='Cita 2023', FechaInicio=datetime(2023, 5, 1, 9, tzinfo=dt_timezone.utc)
+        )
+        Recordatorio.objects.create(Evento=viejo, TipoAviso='EMAIL', TiempoAntes=15, UnidadTiempo='MINUTOS')
+        reciente = Evento.objects.create(
+            Usuario=self.user, Titulo='Ahora', FechaInicio=timezone.now() + timedelta(minutes=5)
+        )
+        Recordatorio.objects.create(Evento=reciente, TipoAviso='EMAIL', TiempoAntes=15, UnidadTiempo='MINUTOS')
+
+        self.assertEqual(dispatch.procesar_pendientes(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('Ahora', mail.outbox[0].subject)
+
+        with self.assertLogs('api.dispatch', 'WARNING'):
+            self.assertEqual(dispatch.caducar_vencidos(), 1)
+        self.assertEqual(viejo.recordatorios.get().Estado, 'FALLIDO')
+        self.assertEqual(dispatch.procesar_pendientes(), (0, 0))
+
+    def test_worker_sobrevive_a_errores_de_la_base_de_datos(self):
+        evento = Evento.objects.create(Usuario=self.user, Titulo='Ahora', FechaInicio=timezone.now() + timedelta(minutes=5))
+        Recordatorio.objects.create(Evento=evento, TipoAviso='EMAIL', TiempoAntes=15, UnidadTiempo='MINUTOS')
+        vueltas = []
+
+        def dormir(segundos):
+            if len(vueltas) == 2:
+                raise KeyboardInterrupt
+
+        procesar = dispatch.procesar_pendientes
+
+        def bloqueada_la_primera_vez(lote):
+            vueltas.append(lote)
+            if len(vueltas) == 1:
+                raise OperationalError('database is locked')
+            return procesar(lote)
+
+        comando = 'api.management.commands.enviar_recordatorios'
+        with mock.patch(f'{comando}.procesar_pendientes', side_effect=bloqueada_la_primera_vez), \
+                mock.patch(f'{comando}.time.sleep', side_effect=dormir), \
+                self.assertLogs(comando, 'ERROR') as logs:
+            call_command('enviar_recordatorios', stdout=StringIO())
+        self.assertIn('database is locked', logs.output[0])
+        self.assertEqual(len(mail.outbox), 1)
+
+        with mock.patch(f'{comando}.procesar_pendientes', side_effect=OperationalError('database is locked')):
+            with self.assertRaises(OperationalError):
+                call_command('enviar_recordatorios', '--una-vez', stdout=StringIO())
+
+    @override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+    def test_datos_sinteticos_sin_avisos_atrasados(self):
+        call_command('generar_datos', usuarios=2, eventos=40, recordatorios=2, stdout=StringIO(), stderr=StringIO())
+        ahora = timezone.now()
+        sinteticos = Recordatorio.objects.filter(Evento__Usuario__username__startswith='sintetico-')
+        self.assertTrue(sinteticos.filter(Estado='ENVIADO', FechaEnviado__lte=ahora).exists())
+        self.assertFalse(sinteticos.filter(Estado='PENDIENTE', FechaEnviado__lte=ahora).exists())
+        self.assertFalse(AvisoProximo.objects.filter(FechaEnviado__lte=ahora).exists())
+        self.assertEqual(dispatch.caducar_vencidos(), 0)
+
+
+@override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+class RegistroTests(ApiTestCase):
+    """
+    El correo es obligatorio y único sin distinguir mayúsculas, también con registros simultáneos.
+    """
+
+    def _registrar(self, **datos):
+        return self.client.post('/api/register/', {'username': 'nuevo', 'password': 'secreta123', **datos}, format='json')
+
+    def test_correo_obligatorio_y_unico(self):
+        respuesta = self._registrar()
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('email', respuesta.json())
+
+        respuesta = self._registrar(email=' ANA@Example.com ')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['email'], ['Ya existe una cuenta con este correo.'])
+
+        self.assertEqual(self._registrar(email='nuevo@example.com').status_code, 201)
+        self.assertEqual(User.objects.get(username='nuevo').email, 'nuevo@example.com')
+
+    def test_registro_simultaneo_con_el_mismo_correo(self):
+        # La validación de otro registro concurrente ya pasó: decide el índice único
+        with mock.patch('api.serializers.buscar_por_email', return_value=User.objects.none()):
+            respuesta = self._registrar(email='Ana@example.com')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['email'], ['Ya existe una cuenta con este correo.'])
+        self.assertFalse(User.objects.filter(username='nuevo').exists())
+
+
+@override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+class AutenticacionTests(ApiTestCase):
+    """
+    Login por correo, límites por IP y por cuenta, y el hasher con iteraciones configurables.
+    """
+
+    def _registrar(self, xff):
+        # Datos inválidos: el límite se aplica antes de validar
+        return self.client.post('/api/register/', {}, format='json', HTTP_X_FORWARDED_FOR=xff).status_code
+
+    def test_x_forwarded_for_falsificado_comparte_cubo(self):
+        estados = [self._registrar(f'198.51.100.{i}') for i in range(11)]
+        self.assertEqual(estados, [400] * 10 + [429])
+
+    def test_con_un_proxy_cuenta_la_ip_que_agrega(self):
+        cache.clear()
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}):
+            estados = [self._registrar(f'198.51.100.{i}, 203.0.113.7') for i in range(11)]
+            self.assertEqual(estados[-1], 429)
+            self.assertEqual(self._registrar('203.0.113.8'), 400)
+
+    def test_login_por_email_y_limite_por_cuenta(self):
+        backend = EmailBackend()
+        self.assertEqual(backend.authenticate(None, username='ANA@example.com', password='secreta123'), self.user)
+        self.assertIsNone(backend.authenticate(None, username='ana@example.com', password='otra'))
+        self.assertIsNone(backend.authenticate(None, username='nadie@example.com', password='secreta123'))
+
+        estados = [
+            self.client.post('/api/login/', {'email': 'Ana@example.com', 'password': 'mala'},
+                             format='json', REMOTE_ADDR=f'10.0.0.{i}').status_code
+            for i in range(6)
+        ]
+        self.assertEqual(estados, [401] * 5 + [429])
+
+    def test_registro_limitado_por_correo(self):
+        estados = [
+            self.client.post('/api/register/', {'email': f'{"Luis" if i % 2 else "luis"}@example.com'},
+                             format='json', REMOTE_ADDR=f'10.0.1.{i}').status_code
+            for i in range(4)
+        ]
+        self.assertEqual(estados, [400] * 3 + [429])
+        otro = self.client.post('/api/register/', {'email': 'otra@example.com'}, format='json', REMOTE_ADDR='10.0.1.9')
+        self.assertEqual(otro.status_code, 400)
+
+    def test_cubo_compartido_entre_hilos(self):
+        # Una caché lenta agranda la ventana entre leer y reescribir el cubo
+        class CacheLenta:
+            def __getattr__(self, nombre):
+                return getattr(cache, nombre)
+
+            def get(self, *args):
+                valor = cache.get(*args)
+                time.sleep(0.002)
+                return valor
+
+        request = RequestFactory().post('/api/login/')
+        request.data = {'email': 'ana@example.com'}
+        permitidas = []
+
+        def intentar():
+            limitador = LoginEmailThrottle()
+            limitador.cache = CacheLenta()
+            permitidas.append(limitador.allow_request(request, None))
+
+        hilos = [threading.Thread(target=intentar) for _ in range(12)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        self.assertEqual(permitidas.count(True), 5)
+
+    def test_hash_se_actualiza_al_cambiar_iteraciones(self):
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$1000$'))
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            self.assertTrue(self.user.check_password('secreta123'))
+            self.user.refresh_from_db()
+            self.assertTrue(self.user.password.startswith('pbkdf2_sha256$2000$'))
+
+
+
+class EstaticosInmutablesTests(SimpleTestCase):
+    """
+    WHITENOISE_IMMUTABLE_FILE_TEST: solo los nombres con hash se cachean como inmutables.
+    """
+
+    def _inmutable(self, url):
+        return re.search(settings.WHITENOISE_IMMUTABLE_FILE_TEST, url) is not None
+
+    def test_con_hash_de_vite_o_de_collectstatic(self):
+        self.assertTrue(self._inmutable('/static/dist/assets/index-BxK3_a9Z.js'))
+        self.assertTrue(self._inmutable('/static/dist/assets/index-Dq-1fW2c.css'))
+        self.assertTrue(self._inmutable('/static/admin/css/base.5af66c1b1797.css'))
+
+    def test_sin_hash_no_son_inmutables(self):
+        for url in (
+            '/static/admin/img/icon-unknown-alt.svg',
+            '/static/admin/fonts/Roboto-Bold-webfont.woff',
+            '/static/admin/img/tooltag-arrowright.svg',
+            '/static/dist/index.html',
+            '/static/dist/vite.svg',
+        ):
+            with self.subTest(url=url):
+                self.assertFalse(self._inmutable(url))
+
+
+@override_settings(
+    FRONTEND_DIR=None, SPA_RECHECK_SECONDS=0,
+    STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}},
+)
+class SpaTests(SimpleTestCase):
+    """
+    index.html del SPA (backend/spa.py) y etiquetas de Vite (vite_tags) sobre un BASE_DIR temporal.
+    """
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.base = Path(directorio.name)
+        self.dist = self.base / 'static' / 'dist'
+        (self.dist / 'assets').mkdir(parents=True)
+        ajustes = override_settings(BASE_DIR=self.base)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        spa._cache.update(archivo=None, revisado=0.0)
+        vite_tags._cache.update(clave=None, assets={}, revisado=None)
+
+    def _escribir(self, nombre, contenido, mtime=None):
+        ruta = self.dist / nombre
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        ruta.write_bytes(contenido)
+        if mtime is not None:
+            os.utime(ruta, (mtime, mtime))
+        return ruta
+
+    def _get(self, **cabeceras):
+        return spa.serve_spa(RequestFactory().get('/calendario/', **cabeceras))
+
+    def test_etag_y_304(self):
+        self._escribir('index.html', b'<html>v1</html>')
+        respuesta = self._get()
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.content, b'<html>v1</html>')
+        self.assertTrue(respuesta['ETag'].endswith('-identity"'))
+        self.assertIn('no-cache', respuesta['Cache-Control'])
+
+        respuesta = self._get(HTTP_IF_NONE_MATCH=respuesta['ETag'])
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(respuesta.content, b'')
+
+    def test_variante_segun_accept_encoding(self):
+        contenido = b'<html>' + b'calendario ' * 200 + b'</html>'
+        ruta = self._escribir('index.html', contenido, mtime=1_700_000_000)
+        # El .gz del build se usa si no es más antiguo que el original
+        self._escribir('index.html.gz', gzip.compress(contenido, mtime=0), mtime=1_700_000_100)
+
+        identidad = self._get()
+        comprimido = self._get(HTTP_ACCEPT_ENCODING='br;q=0, gzip')
+        self.assertEqual(comprimido['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(comprimido.content), contenido)
+        self.assertEqual(comprimido.content, (ruta.parent / 'index.html.gz').read_bytes())
+        self.assertNotEqual(comprimido['ETag'], identidad['ETag'])
+        for respuesta in (identidad, comprimido):
+            self.assertIn('Accept-Encoding', respuesta['Vary'])
+        self.assertFalse(identidad.has_header('Content-Encoding'))
+
+        if spa.brotli is not None:
+            self.assertEqual(self._get(HTTP_ACCEPT_ENCODING='gzip, br')['Content-Encoding'], 'br')
+        # El ETag de una variante no valida otra
+        respuesta = self._get(HTTP_IF_NONE_MATCH=comprimido['ETag'])
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_recarga_al_cambiar_el_mtime(self):
+        ruta = self._escribir('index.html', b'<html>v1</html>', mtime=1_700_000_000)
+        etag = self._get()['ETag']
+        self._escribir('index.html', b'<html>v2</html>', mtime=1_700_000_060)
+        respuesta = self._get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.content, b'<html>v2</html>')
+
+        # Con SPA_RECHECK_SECONDS no se vuelve a mirar el disco hasta que pasa el intervalo
+        with override_settings(SPA_RECHECK_SECONDS=3600):
+            self._get()
+            self._escribir('index.html', b'<html>v3</html>', mtime=1_700_000_120)
+            self.assertEqual(self._get().content, b'<html>v2</html>')
+        ruta.unlink()
+        self.assertEqual(self._get().status_code, 404)
+
+    def test_assets_del_manifest_o_por_glob(self):
+        self._escribir('assets/index-Glob1234.js', b'')
+        self._escribir('assets/index-Glob1234.css', b'')
+        self.assertEqual(vite_tags.vite_asset_js(), '/static/dist/assets/index-Glob1234.js')
+        self.assertEqual(vite_tags.vite_asset_css(), '/static/dist/assets/index-Glob1234.css')
+
+        self._escribir('.vite/manifest.json', json.dumps({
+            'index.html': {'file': 'assets/index-Mani5678.js', 'isEntry': True, 'css': ['assets/index-Mani5678.css']},
+        }).encode())
+        os.utime(self.dist, (1_700_000_000, 1_700_000_000))
+        self.assertEqual(vite_tags.vite_asset_js(), '/static/dist/assets/index-Mani5678.js')
+        self.assertEqual(vite_tags.vite_asset_css(), '/static/dist/assets/index-Mani5678.css')
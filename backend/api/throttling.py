@@ -0,0 +1,95 @@
+import time
+
+from rest_framework.throttling import SimpleRateThrottle
+
+# Espera máxima (segundos) por el cerrojo de un cubo antes de seguir sin él
+ESPERA_CERROJO = 0.05
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """
+    Limitador de tipo token bucket sobre la caché de Django.
+
+    La tasa 'N/periodo' define un cubo de N fichas que se rellena a N/periodo fichas
+    por segundo: admite ráfagas cortas de hasta N peticiones pero acota el ritmo sostenido.
+    Guarda solo (fichas, instante) por clave, en vez del historial de peticiones.
+
+    Leer y reescribir el cubo son dos operaciones de caché: para que dos workers que
+    comparten la caché no se pisen, se hacen bajo un cerrojo tomado con cache.add()
+    (atómico en memcached, Redis, base de datos y locmem). Si el cerrojo no se libera
+    en ESPERA_CERROJO (p. ej. un proceso murió con él tomado; caduca en 1 s) se sigue
+    sin él: en ese caso puntual el límite puede excederse en alguna petición.
+    """
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        cerrojo = f'{self.key}:cerrojo'
+        tomado = self._tomar(cerrojo)
+        try:
+            self.now = self.timer()
+            fichas, ultimo = self.cache.get(self.key, (self.num_requests, self.now))
+            relleno = (self.now - ultimo) * self.num_requests / self.duration
+            self.fichas = min(self.num_requests, fichas + relleno)
+            if self.fichas < 1:
+                return self.throttle_failure()
+
+            self.fichas -= 1
+            self.cache.set(self.key, (self.fichas, self.now), self.duration)
+            return True
+        finally:
+            if tomado:
+                self.cache.delete(cerrojo)
+
+    def _tomar(self, cerrojo):
+        limite = time.monotonic() + ESPERA_CERROJO
+        while not self.cache.add(cerrojo, 1, timeout=1):
+            if time.monotonic() >= limite:
+                return False
+            time.sleep(0.001)
+        return True
+
+    def wait(self):
+        # Segundos hasta que se recupere una ficha completa
+        return (1 - self.fichas) * self.duration / self.num_requests
+
+
+class LoginIPThrottle(TokenBucketThrottle):
+    """Intentos de login por dirección IP."""
+    scope = 'login_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class EmailThrottle(TokenBucketThrottle):
+    """Cubo por el correo del cuerpo de la petición (sin distinguir mayúsculas)."""
+
+    def get_cache_key(self, request, view):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        if not email or not isinstance(email, str):
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': email.strip().lower()}
+
+
+class LoginEmailThrottle(EmailThrottle):
+    """Intentos de login por cuenta, aunque lleguen desde muchas IPs."""
+    scope = 'login_email'
+
+
+class RegisterIPThrottle(TokenBucketThrottle):
+    """Registros por dirección IP."""
+    scope = 'register_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class RegisterEmailThrottle(EmailThrottle):
+    """Registros con un mismo correo, aunque lleguen desde muchas IPs."""
+    scope = 'register_email'
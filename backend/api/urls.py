@@ -1,11 +1,27 @@
 from django.urls import path
-from . import views
+from . import metricas, views
 
 urlpatterns = [
     # Estas URLs serán accesibles bajo el prefijo /api/
     path('reminders/', views.reminders_list, name='reminders_list'),
+    path('reminders/upcoming/', views.reminders_upcoming, name='reminders_upcoming'),
     path('register/', views.register, name='register'),
     path('login/', views.login, name='login'),
+    path('profile/', views.profile, name='profile'),
     path('events/', views.event_list, name='event_list'),
+    path('events/search/', views.event_search, name='event_search'),
+    path('events/density/', views.event_density, name='event_density'),
     path('events/create/', views.create_event, name='create_event'),
+    path('events/bulk/', views.bulk_events, name='bulk_events'),
+    path('events/ics/', views.export_ics, name='export_ics'),
+    path('events/ics/import/', views.import_ics, name='import_ics'),
+    path('freebusy/', views.freebusy, name='freebusy'),
+    path('freebusy/check/', views.freebusy_check, name='freebusy_check'),
+    path('sync/', views.sync, name='sync'),
+    path('cache/stats/', views.cache_stats, name='cache_stats'),
+    path('metrics/', metricas.metrics, name='metrics'),
+    # Vistas asíncronas (ASGI)
+    path('async/events/', views.event_list_async, name='event_list_async'),
+    path('async/reminders/', views.reminders_list_async, name='reminders_list_async'),
+    path('notifications/stream/', views.notifications_stream, name='notifications_stream'),
 ]
\ No newline at end of file
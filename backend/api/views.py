@@ -1,19 +1,87 @@
-from django.shortcuts import render, HttpResponse
-from django.http import JsonResponse
+from django.shortcuts import HttpResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
 from rest_framework.response import Response
-from rest_framework.decorators import api_view, permission_classes
-from django.contrib.auth.models import User
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, throttle_classes
 from django.contrib.auth import authenticate
-from rest_framework.permissions import IsAuthenticated # Importamos IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
-from .models import Evento, Recordatorio
+from rest_framework.permissions import IsAuthenticated, IsAdminUser # Importamos IsAuthenticated
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from .models import Evento, Perfil, Recordatorio
+from . import avisos, busqueda, cache, ics, notificaciones
+from .densidad import densidad
+from .authentication import CachedJWTAuthentication, autenticar_peticion, token_para_usuario
+from .bulk import MAX_ELEMENTOS_LOTE, procesar_lote
+from .conditional import (
+    Condicional, aversion_eventos, aversion_recordatorios, version_eventos, version_recordatorios,
+)
+from .disponibilidad import MAX_VENTANA, bloques_ocupados, conflictos, conflictos_de_evento, filtrar_por_ventana
+from .pagination import KeysetPagination
+from .recurrence import expandir_filas
+from .sync import cambios_desde, leer_token
+from .zonas import en_zona_del_usuario, zona_de_request
+from .throttling import LoginEmailThrottle, LoginIPThrottle, RegisterEmailThrottle, RegisterIPThrottle
 from .serializers import (
     UserSerializer,
     RegisterSerializer,
-    RecordatorioSerializer,
     EventoSerializer,
+    PerfilSerializer,
+    EVENTO_LIST_FIELDS,
+    RECORDATORIO_LIST_FIELDS,
+    AVISO_PROXIMO_LIST_FIELDS,
+    serialize_aviso_proximo_rows,
+    serialize_evento_rows,
+    serialize_recordatorio_rows,
 )
 
+def _parse_fecha(valor):
+    """
+    Convierte un parámetro de consulta (fecha o fecha-hora ISO 8601) en un datetime aware.
+    Devuelve None si el valor no es válido.
+    """
+    try:
+        fecha = parse_datetime(valor)
+        if fecha is None:
+            dia = parse_date(valor)
+            if dia is None:
+                return None
+            fecha = datetime.combine(dia, time.min)
+    except ValueError:
+        return None
+    if timezone.is_naive(fecha):
+        fecha = timezone.make_aware(fecha)
+    return fecha
+
+
+def _parse_ventana(params, obligatoria=False, acotada=False):
+    """
+    Lee la ventana `start`/`end` de los parámetros de consulta. Devuelve (ventana, errores);
+    la ventana es un dict con las claves 'inicio' y/o 'fin'.
+    Con `acotada`, si hay `end` también se exige `start` y la ventana no puede superar
+    MAX_VENTANA (las series se expanden dentro de ella).
+    """
+    ventana = {}
+    for param, clave in (('start', 'inicio'), ('end', 'fin')):
+        valor = params.get(param)
+        if valor:
+            fecha = _parse_fecha(valor)
+            if fecha is None:
+                return None, {param: "Fecha inválida, use el formato ISO 8601."}
+            ventana[clave] = fecha
+        elif obligatoria:
+            return None, {param: "Este parámetro es obligatorio."}
+    if 'inicio' in ventana and 'fin' in ventana and ventana['inicio'] >= ventana['fin']:
+        return None, {"detail": "`start` debe ser anterior a `end`."}
+    if acotada and 'fin' in ventana:
+        if 'inicio' not in ventana:
+            return None, {"start": "Es obligatorio si se indica `end`."}
+        if ventana['fin'] - ventana['inicio'] > MAX_VENTANA:
+            return None, {"detail": f"La ventana no puede superar {MAX_VENTANA.days} días."}
+    return ventana, None
+
+
 def home(request):
     return HttpResponse("<h1>Servidor Django funcionando correctamente ✅</h1><p>El backend está activo.</p>")
 
@@ -21,15 +89,44 @@ def home(request):
 # --- VISTA CORREGIDA ---
 @api_view(['GET']) # 1. La convertimos en una vista de API que solo acepta GET
 @permission_classes([IsAuthenticated]) # 2. Exigimos que el usuario esté autenticado
+@en_zona_del_usuario
 def reminders_list(request):
-    # 3. Ahora request.user es el usuario correcto, por lo que el filtro funciona
-    reminders = Recordatorio.objects.filter(Evento__Usuario=request.user)
-    serializer = RecordatorioSerializer(reminders, many=True)
+    # Si el cliente ya tiene la versión actual se responde 304 sin serializar nada
+    condicional = Condicional(request, version_recordatorios(request.user))
+    if condicional.no_modificado:
+        return condicional.no_modificado
+
+    # 3. request.user se construye con los claims del token (sin consultar la BD)
+    reminders = Recordatorio.objects.filter(Evento__Usuario_id=request.user.pk).values(*RECORDATORIO_LIST_FIELDS)
+
+    paginator = KeysetPagination('FechaEnviado')
+    page = paginator.paginate_queryset(reminders, request)
+    if page is not None:
+        return condicional.marcar(paginator.get_paginated_response(serialize_recordatorio_rows(page)))
+
     # 4. Usamos la respuesta estándar de DRF
-    return Response(serializer.data)
+    return condicional.marcar(Response(serialize_recordatorio_rows(reminders)))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@en_zona_del_usuario
+def reminders_upcoming(request):
+    """
+    Próximos avisos pendientes del usuario (desde ahora, en orden), con el título y el
+    inicio del evento. Se leen de la tabla materializada AvisoProximo, que solo cubre
+    HORIZONTE_AVISOS hacia adelante. `limit` (máx. 500) acota la cantidad.
+    """
+    try:
+        limite = max(1, min(int(request.query_params.get('limit', 50)), 500))
+    except ValueError:
+        return Response({"limit": "Debe ser un número."}, status=400)
+    filas = avisos.proximos(request.user.pk, limite).values(*AVISO_PROXIMO_LIST_FIELDS)
+    return Response(serialize_aviso_proximo_rows(filas))
 
 
 @api_view(['POST'])
+@throttle_classes([RegisterIPThrottle, RegisterEmailThrottle])
 def register(request):
     serializer = RegisterSerializer(data=request.data)
     if serializer.is_valid():
@@ -39,6 +136,7 @@ def register(request):
 
 
 @api_view(['POST'])
+@throttle_classes([LoginIPThrottle, LoginEmailThrottle])
 def login(request):
     email = request.data.get('email')
     password = request.data.get('password')
@@ -47,10 +145,8 @@ def login(request):
     user = authenticate(request, username=email, password=password)
 
     if user is not None:
-        refresh = RefreshToken.for_user(user)
-        # Añadimos los datos del usuario al token
-        refresh['username'] = user.username
-        refresh['email'] = user.email
+        # Añadimos los datos del usuario al token (las lecturas no vuelven a consultar la BD)
+        refresh = token_para_usuario(user)
         
         return Response({
             'refresh': str(refresh),
@@ -59,27 +155,391 @@ def login(request):
     else:
         return Response({"detail": "No se encontró una cuenta activa con las credenciales proporcionadas"}, status=401)
 
+@api_view(['GET', 'PATCH'])
+@authentication_classes([CachedJWTAuthentication])
+@permission_classes([IsAuthenticated])
+def profile(request):
+    """
+    Perfil del usuario (zona horaria). Al cambiarlo se devuelven tokens nuevos,
+    porque las lecturas toman la zona del token y no de la base de datos.
+    """
+    perfil = Perfil.objects.filter(Usuario=request.user).first() or Perfil(Usuario=request.user)
+    if request.method == 'GET':
+        return Response(PerfilSerializer(perfil).data)
+
+    serializer = PerfilSerializer(perfil, data=request.data, partial=True)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=400)
+    serializer.save()
+    refresh = token_para_usuario(request.user)
+    return Response({
+        **serializer.data,
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+    })
+
 # --- NUEVA VISTA PARA LISTAR EVENTOS ---
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@en_zona_del_usuario
 def event_list(request):
     """
-    Devuelve una lista de todos los eventos para el usuario autenticado.
+    Devuelve una lista de los eventos del usuario autenticado.
+    Con los parámetros opcionales `start` y `end` solo se devuelven los eventos
+    que se solapan con esa ventana (usa el índice Usuario + FechaInicio).
+    Con `page_size` y/o `cursor` la respuesta se pagina por cursor.
+    Cada evento referencia al usuario solo por su id.
+    Si la ventana tiene `end`, los eventos recurrentes se devuelven como una fila
+    por ocurrencia dentro de la ventana (con el id de la serie), ordenadas por
+    (inicio, id); en ese caso `start` es obligatorio y la ventana no puede superar
+    MAX_VENTANA. Admite peticiones condicionales (If-None-Match / If-Modified-Since).
+    """
+    events = Evento.objects.filter(Usuario_id=request.user.pk)
+
+    ventana, errores = _parse_ventana(request.query_params, acotada=True)
+    if errores:
+        return Response(errores, status=400)
+    events = filtrar_por_ventana(events, **ventana)
+
+    # Si el cliente ya tiene la versión actual se responde 304 sin serializar nada
+    condicional = Condicional(request, version_eventos(request.user))
+    if condicional.no_modificado:
+        return condicional.no_modificado
+
+    # El listado serializado se guarda en caché por usuario; el ETag identifica la
+    # variante (ventana, cursor...) y la versión de los datos en la base de datos
+    data = cache.obtener(
+        request.user.pk, condicional.etag,
+        lambda: _serializar_listado_eventos(request, events, ventana),
+    )
+    return condicional.marcar(Response(data))
+
+
+def _serializar_listado_eventos(request, events, ventana):
+    events = events.values(*EVENTO_LIST_FIELDS)
+
+    paginator = KeysetPagination('FechaInicio')
+    if 'fin' in ventana:
+        # Con una ventana cerrada las series se expanden a sus ocurrencias visibles. Se pagina
+        # después de expandir y ordenar, para que el cursor no salte ocurrencias
+        events = _expandir_ordenado(events, ventana)
+        page = paginator.paginate_rows(events, request)
+    else:
+        page = paginator.paginate_queryset(events, request)
+    if page is not None:
+        # El usuario se emite una sola vez por respuesta, no en cada evento
+        return paginator.get_paginated_response(
+            serialize_evento_rows(page), usuario=UserSerializer(request.user).data
+        ).data
+    return serialize_evento_rows(events)
+
+
+def _expandir_ordenado(filas, ventana):
+    return sorted(
+        expandir_filas(filas, ventana['inicio'], ventana['fin']),
+        key=lambda fila: (fila['FechaInicio'], fila['id']),
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@en_zona_del_usuario
+def event_search(request):
+    """
+    Busca `q` en el título, la descripción y la ubicación de los eventos del usuario.
+    Cada palabra se trata como prefijo; los resultados van del más relevante al menos.
+    `limit` (máx. 200) acota la cantidad de resultados.
+    """
+    consulta = request.query_params.get('q', '')
+    if not busqueda.terminos(consulta):
+        return Response({"q": "Escriba al menos una palabra."}, status=400)
+    try:
+        limite = max(1, min(int(request.query_params.get('limit', busqueda.LIMITE)), 200))
+    except ValueError:
+        return Response({"limit": "Debe ser un número."}, status=400)
+    filas = busqueda.buscar_eventos(request.user.pk, consulta, EVENTO_LIST_FIELDS, limite)
+    return Response(serialize_evento_rows(filas))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@en_zona_del_usuario
+def event_density(request):
+    """
+    Cantidad de eventos por día y por mes de un año (`year`, por defecto el actual),
+    para la vista anual. Los días se cuentan en la zona `tz` (IANA, por defecto la del usuario).
     """
-    events = Evento.objects.filter(Usuario=request.user)
-    serializer = EventoSerializer(events, many=True)
-    return Response(serializer.data)
+    try:
+        tz = ZoneInfo(request.query_params['tz']) if request.query_params.get('tz') else timezone.get_current_timezone()
+    except (ZoneInfoNotFoundError, ValueError):
+        return Response({"tz": "Zona horaria desconocida."}, status=400)
+    try:
+        anio = int(request.query_params.get('year') or timezone.localdate(timezone=tz).year)
+    except ValueError:
+        return Response({"year": "Debe ser un número."}, status=400)
+    # Un año de margen por lado: el 1 de enero del año 1 en Asia/Tokyo ya cae antes de
+    # datetime.min en UTC, y las ventanas de la consulta se extienden más allá del año
+    if not 2 <= anio <= 9997:
+        return Response({"year": "Año fuera de rango (2-9997)."}, status=400)
+
+    condicional = Condicional(request, version_eventos(request.user))
+    if condicional.no_modificado:
+        return condicional.no_modificado
+    data = cache.obtener(request.user.pk, condicional.etag, lambda: densidad(request.user.pk, anio, tz))
+    return condicional.marcar(Response(data))
 
 
 @api_view(['POST'])
+@authentication_classes([CachedJWTAuthentication])
 @permission_classes([IsAuthenticated])
+@en_zona_del_usuario
 def create_event(request):
+    """
+    Crea un evento. Con `?conflicts=reject` el evento no se crea si se solapa con
+    otros del usuario: se responde 409 con los bloques ocupados en conflicto.
+    """
     user = request.user
     data = request.data
     
     serializer = EventoSerializer(data=data)
     if serializer.is_valid():
+        if request.query_params.get('conflicts') == 'reject':
+            ocupados = conflictos_de_evento(user.pk, serializer.validated_data)
+            if ocupados:
+                return Response({
+                    "detail": "El evento se solapa con otros eventos.",
+                    "conflictos": _serializar_bloques(ocupados),
+                }, status=409)
         serializer.save(Usuario=user)
         return Response(serializer.data, status=201)
     return Response(serializer.errors, status=400)
 
+
+def _serializar_bloques(bloques):
+    return [{'inicio': inicio, 'fin': fin} for inicio, fin in bloques]
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@en_zona_del_usuario
+def freebusy(request):
+    """
+    Bloques ocupados (fusionados) del usuario entre `start` y `end`, sin detalles de
+    los eventos. Las series recurrentes se expanden; los eventos cancelados no cuentan.
+    """
+    ventana, errores = _parse_ventana(request.query_params, obligatoria=True)
+    if errores:
+        return Response(errores, status=400)
+    if ventana['fin'] - ventana['inicio'] > MAX_VENTANA:
+        return Response({"detail": f"La ventana no puede superar {MAX_VENTANA.days} días."}, status=400)
+    bloques = bloques_ocupados(request.user.pk, ventana['inicio'], ventana['fin'])
+    return Response({
+        'inicio': ventana['inicio'],
+        'fin': ventana['fin'],
+        'ocupado': _serializar_bloques(bloques),
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@en_zona_del_usuario
+def freebusy_check(request):
+    """
+    Comprueba varios horarios candidatos a la vez.
+    Cuerpo: {"candidatos": [{"FechaInicio": ..., "FechaFin": ...}, ...]}.
+    Devuelve, en el mismo orden, los bloques ocupados con los que choca cada candidato.
+    """
+    data = request.data if isinstance(request.data, dict) else {}
+    candidatos = data.get('candidatos')
+    if not isinstance(candidatos, list) or not candidatos:
+        return Response({"candidatos": "Debe ser una lista no vacía."}, status=400)
+    if len(candidatos) > MAX_ELEMENTOS_LOTE:
+        return Response({"detail": f"Máximo {MAX_ELEMENTOS_LOTE} elementos por petición."}, status=400)
+
+    intervalos = []
+    for posicion, candidato in enumerate(candidatos):
+        if not isinstance(candidato, dict):
+            return Response({"candidatos": f"Elemento {posicion}: debe ser un objeto."}, status=400)
+        inicio = _parse_fecha(str(candidato.get('FechaInicio', '')))
+        fin = _parse_fecha(str(candidato['FechaFin'])) if candidato.get('FechaFin') else None
+        if inicio is None or (candidato.get('FechaFin') and fin is None):
+            return Response({"candidatos": f"Elemento {posicion}: fecha inválida, use el formato ISO 8601."}, status=400)
+        if fin is not None and fin < inicio:
+            return Response({"candidatos": f"Elemento {posicion}: FechaFin es anterior a FechaInicio."}, status=400)
+        intervalos.append((inicio, fin))
+
+    desde = min(inicio for inicio, _ in intervalos)
+    hasta = max(fin or inicio for inicio, fin in intervalos)
+    if hasta - desde > MAX_VENTANA:
+        return Response({"detail": f"Los candidatos no pueden abarcar más de {MAX_VENTANA.days} días."}, status=400)
+
+    return Response([
+        {'conflicto': bool(bloques), 'ocupado': _serializar_bloques(bloques)}
+        for bloques in conflictos(request.user.pk, intervalos)
+    ])
+
+
+@api_view(['POST'])
+@authentication_classes([CachedJWTAuthentication])
+@permission_classes([IsAuthenticated])
+@en_zona_del_usuario
+def bulk_events(request):
+    """
+    Crea, actualiza y elimina eventos en bloque dentro de una transacción.
+    Cuerpo: {"create": [evento, ...], "update": [{"id": ..., ...}, ...], "delete": [id, ...]}.
+    Cada evento de "create" puede traer "recordatorios" ("update" no los admite).
+    Devuelve un resultado por elemento.
+    """
+    data = request.data if isinstance(request.data, dict) else {}
+    operaciones = {}
+    for clave in ('create', 'update', 'delete'):
+        valor = data.get(clave, [])
+        if not isinstance(valor, list):
+            return Response({clave: "Debe ser una lista."}, status=400)
+        operaciones[clave] = valor
+    if not any(operaciones.values()):
+        return Response({"detail": "Envíe al menos una operación en create, update o delete."}, status=400)
+    if sum(len(valor) for valor in operaciones.values()) > MAX_ELEMENTOS_LOTE:
+        return Response({"detail": f"Máximo {MAX_ELEMENTOS_LOTE} elementos por petición."}, status=400)
+    if not all(isinstance(pk, int) for pk in operaciones['delete']):
+        return Response({"delete": "Debe ser una lista de ids."}, status=400)
+    if not all(isinstance(item, dict) and isinstance(item.get('id'), int) for item in operaciones['update']):
+        return Response({"update": "Cada elemento debe ser un objeto con un `id` numérico."}, status=400)
+
+    resultados = procesar_lote(
+        request.user, operaciones['create'], operaciones['update'], operaciones['delete']
+    )
+    return Response(resultados)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_ics(request):
+    """
+    Descarga los eventos del usuario (con sus recordatorios como VALARM) en formato .ics.
+    La respuesta se transmite por partes sin cargar todos los eventos en memoria.
+    """
+    response = StreamingHttpResponse(ics.exportar(request.user), content_type='text/calendar; charset=utf-8')
+    response['Content-Disposition'] = 'attachment; filename="calendario.ics"'
+    return response
+
+
+@api_view(['POST'])
+@authentication_classes([CachedJWTAuthentication])
+@permission_classes([IsAuthenticated])
+@en_zona_del_usuario
+def import_ics(request):
+    """
+    Importa un archivo .ics enviado en el campo `file` (multipart/form-data).
+    El archivo se lee línea a línea y los eventos se insertan por lotes.
+    """
+    archivo = request.FILES.get('file')
+    if archivo is None:
+        return Response({"file": "Envíe un archivo .ics en el campo `file`."}, status=400)
+    resumen = ics.importar(request.user, archivo)
+    return Response(resumen, status=201)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@en_zona_del_usuario
+def sync(request):
+    """
+    Sincronización incremental: devuelve solo lo creado, modificado o eliminado desde
+    el `token` recibido, junto con el token para la próxima llamada.
+    Sin token se devuelve el estado completo.
+    """
+    token = request.query_params.get('token')
+    desde = None
+    if token:
+        desde = leer_token(token)
+        if desde is None:
+            return Response({"token": "Token de sincronización inválido."}, status=400)
+    return Response(cambios_desde(request.user, desde))
+
+
+@api_view(['GET'])
+@authentication_classes([CachedJWTAuthentication])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    """
+    Aciertos y fallos de la caché de listados de eventos (para monitorización).
+    """
+    return Response(cache.estadisticas())
+
+
+# --- Vistas asíncronas (ASGI) ---
+# Vistas de Django (no DRF) que usan el ORM asíncrono. La autenticación es la misma
+# JWT sin base de datos de las lecturas; la respuesta es JSON plano.
+
+def _no_autenticado():
+    return JsonResponse({"detail": "Las credenciales de autenticación no se proveyeron o son inválidas."}, status=401)
+
+
+@require_GET
+async def event_list_async(request):
+    """
+    Variante asíncrona de event_list: misma ventana `start`/`end`, expansión de series
+    y peticiones condicionales, sin paginación ni caché de listados.
+    """
+    autenticado = autenticar_peticion(request)
+    if autenticado is None:
+        return _no_autenticado()
+    request.user, request.auth = autenticado
+
+    with timezone.override(zona_de_request(request)):
+        ventana, errores = _parse_ventana(request.GET, acotada=True)
+        if errores:
+            return JsonResponse(errores, status=400)
+        condicional = Condicional(request, await aversion_eventos(request.user))
+        if condicional.no_modificado:
+            return condicional.no_modificado
+
+        events = filtrar_por_ventana(Evento.objects.filter(Usuario_id=request.user.pk), **ventana)
+        filas = [fila async for fila in events.values(*EVENTO_LIST_FIELDS)]
+        if 'fin' in ventana:
+            filas = _expandir_ordenado(filas, ventana)
+        return condicional.marcar(JsonResponse(serialize_evento_rows(filas), safe=False))
+
+
+@require_GET
+async def reminders_list_async(request):
+    """Variante asíncrona de reminders_list (con peticiones condicionales, sin paginación)."""
+    autenticado = autenticar_peticion(request)
+    if autenticado is None:
+        return _no_autenticado()
+    request.user, request.auth = autenticado
+
+    with timezone.override(zona_de_request(request)):
+        condicional = Condicional(request, await aversion_recordatorios(request.user))
+        if condicional.no_modificado:
+            return condicional.no_modificado
+        reminders = Recordatorio.objects.filter(Evento__Usuario_id=request.user.pk)
+        filas = [fila async for fila in reminders.values(*RECORDATORIO_LIST_FIELDS)]
+        return condicional.marcar(JsonResponse(serialize_recordatorio_rows(filas), safe=False))
+
+
+@require_GET
+async def notifications_stream(request):
+    """
+    Flujo Server-Sent Events con las notificaciones NOTIFICACION_APP del usuario a medida
+    que vencen (sustituye al sondeo desde el cliente). Como EventSource no envía cabeceras,
+    el token de acceso puede ir en `?token=`. Requiere un servidor ASGI.
+    """
+    autenticado = autenticar_peticion(request, parametro='token')
+    if autenticado is None:
+        return _no_autenticado()
+    usuario, _ = autenticado
+
+    try:
+        ultimo_id = int(request.headers['Last-Event-ID'])
+    except (KeyError, ValueError):
+        ultimo_id = None
+
+    response = StreamingHttpResponse(
+        notificaciones.flujo(usuario.pk, ultimo_id), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    # Evita que nginx acumule el flujo antes de enviarlo
+    response['X-Accel-Buffering'] = 'no'
+    return response
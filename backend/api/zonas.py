@@ -0,0 +1,45 @@
+from functools import lru_cache, wraps
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError, available_timezones
+
+from django.utils import timezone
+
+# Claim del token con la zona horaria del usuario (ver token_para_usuario)
+CLAIM_ZONA = 'tz'
+
+
+@lru_cache(maxsize=None)
+def zonas_validas():
+    return frozenset(available_timezones())
+
+
+@lru_cache(maxsize=None)
+def zona(nombre):
+    """
+    ZoneInfo para un nombre IANA, reutilizado entre peticiones.
+    Un nombre vacío o desconocido devuelve la zona por defecto (settings.TIME_ZONE).
+    """
+    if not nombre:
+        return timezone.get_default_timezone()
+    try:
+        return ZoneInfo(nombre)
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.get_default_timezone()
+
+
+def zona_de_request(request):
+    """Zona del usuario autenticado según el claim del token (sin consultar la base de datos)."""
+    token = getattr(request, 'auth', None)
+    return zona(token.get(CLAIM_ZONA) if token is not None else None)
+
+
+def en_zona_del_usuario(vista):
+    """
+    Activa la zona horaria del usuario durante la vista: las fechas sin zona de la
+    petición, las ventanas por día, la expansión de series y las fechas de la respuesta
+    usan esa zona. Va debajo de @api_view/@permission_classes (el usuario ya está autenticado).
+    """
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        with timezone.override(zona_de_request(request)):
+            return vista(request, *args, **kwargs)
+    return envoltura
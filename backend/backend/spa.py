@@ -0,0 +1,132 @@
+"""
+Caché en memoria del index.html del SPA.
+
+El archivo se busca y se lee una sola vez; después solo se comprueba su mtime cada
+SPA_RECHECK_SECONDS segundos (0 = en cada petición, útil en desarrollo). Se guardan
+también sus variantes comprimidas: las precomprimidas del build (index.html.br / .gz)
+si existen o, si no, las calculadas al cargarlo.
+"""
+import gzip
+import hashlib
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # dependencia opcional
+    brotli = None
+
+_lock = threading.Lock()
+_cache = {'archivo': None, 'revisado': 0.0}
+
+
+class _IndexCacheado:
+    def __init__(self, ruta, mtime, contenido):
+        self.ruta = ruta
+        self.mtime = mtime
+        self.etag = hashlib.md5(contenido, usedforsecurity=False).hexdigest()
+        self.variantes = {'identity': contenido}
+        for encoding, extension in (('br', '.br'), ('gzip', '.gz')):
+            precomprimido = _leer_si_vigente(ruta + extension, mtime)
+            if precomprimido is not None:
+                self.variantes[encoding] = precomprimido
+        if 'gzip' not in self.variantes:
+            self.variantes['gzip'] = gzip.compress(contenido, compresslevel=9)
+        if 'br' not in self.variantes and brotli is not None:
+            self.variantes['br'] = brotli.compress(contenido)
+
+
+def _leer_si_vigente(ruta, mtime_original):
+    """Lee una variante precomprimida si existe y no es más antigua que el original."""
+    try:
+        if os.path.getmtime(ruta) < mtime_original:
+            return None
+        with open(ruta, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _candidatos():
+    # Posibles ubicaciones del index.html (en orden de preferencia)
+    candidatos = [
+        settings.BASE_DIR / 'staticfiles_collected' / 'dist' / 'index.html',
+        settings.BASE_DIR / 'static' / 'dist' / 'index.html',
+    ]
+    if getattr(settings, 'FRONTEND_DIR', None):
+        candidatos.append(settings.FRONTEND_DIR / 'dist' / 'index.html')
+    return [str(ruta) for ruta in candidatos]
+
+
+def _cargar():
+    for ruta in _candidatos():
+        try:
+            mtime = os.path.getmtime(ruta)
+            with open(ruta, 'rb') as f:
+                return _IndexCacheado(ruta, mtime, f.read())
+        except OSError:
+            continue
+    return None
+
+
+def obtener_index():
+    """Devuelve el index.html cacheado (o None si no hay build), recargándolo si cambió."""
+    ahora = time.monotonic()
+    intervalo = getattr(settings, 'SPA_RECHECK_SECONDS', 60)
+    archivo = _cache['archivo']
+    if archivo is not None and ahora - _cache['revisado'] < intervalo:
+        return archivo
+
+    with _lock:
+        archivo = _cache['archivo']
+        try:
+            vigente = archivo is not None and os.path.getmtime(archivo.ruta) == archivo.mtime
+        except OSError:
+            vigente = False
+        if not vigente:
+            archivo = _cargar()
+        _cache['archivo'] = archivo
+        _cache['revisado'] = ahora
+    return archivo
+
+
+def _elegir_encoding(request, variantes):
+    aceptados = {}
+    for parte in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        nombre, _, parametros = parte.strip().partition(';')
+        calidad = 1.0
+        if parametros.strip().startswith('q='):
+            try:
+                calidad = float(parametros.strip()[2:])
+            except ValueError:
+                calidad = 0.0
+        aceptados[nombre.strip().lower()] = calidad
+    for encoding in ('br', 'gzip'):
+        if encoding in variantes and aceptados.get(encoding, 0) > 0:
+            return encoding
+    return 'identity'
+
+
+def serve_spa(request):
+    archivo = obtener_index()
+    if archivo is None:
+        return HttpResponse('index.html no encontrado', status=404)
+
+    encoding = _elegir_encoding(request, archivo.variantes)
+    # Cada codificación es una representación distinta y necesita su propio ETag
+    etag = f'"{archivo.etag}-{encoding}"'
+    response = get_conditional_response(request, etag=etag, last_modified=int(archivo.mtime))
+    if response is None:
+        response = HttpResponse(archivo.variantes[encoding], content_type='text/html')
+        if encoding != 'identity':
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    patch_vary_headers(response, ('Accept-Encoding',))
+    # index.html no lleva hash en el nombre: el navegador debe revalidarlo siempre
+    patch_cache_control(response, no_cache=True)
+    return response